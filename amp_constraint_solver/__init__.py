@@ -1,7 +1,12 @@
 r"""
 Constraint solving using domain reduction.
 
-Imports * from :py:mod:`amp_constraint_solver.constraint_solver` and :py:mod:`amp_constraint_solver.builtin_constraints`.
+Imports * from :py:mod:`amp_constraint_solver.constraint_solver`, :py:mod:`amp_constraint_solver.builtin_constraints`,
+:py:mod:`amp_constraint_solver.heuristics`, :py:mod:`amp_constraint_solver.parallel`,
+:py:mod:`amp_constraint_solver.domains`, :py:mod:`amp_constraint_solver.optimisation`,
+:py:mod:`amp_constraint_solver.asynchronous`, :py:mod:`amp_constraint_solver.cache`,
+:py:mod:`amp_constraint_solver.many`, :py:mod:`amp_constraint_solver.incremental`,
+:py:mod:`amp_constraint_solver.symmetry` and :py:mod:`amp_constraint_solver.restarts`.
 
 Usage of :py:func:`amp_constraint_solver.constraint_solver.solve`:
 
@@ -18,5 +23,15 @@ Usage of :py:func:`amp_constraint_solver.constraint_solver.solve`:
 """
 from .constraint_solver import *
 from .builtin_constraints import *
+from .heuristics import *
+from .parallel import *
+from .domains import *
+from .optimisation import *
+from .asynchronous import *
+from .cache import *
+from .many import *
+from .incremental import *
+from .symmetry import *
+from .restarts import *
 
 __version__ = "0.4.0"
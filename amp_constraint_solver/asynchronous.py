@@ -0,0 +1,329 @@
+"""
+Solving a problem from an :py:mod:`asyncio` event loop without blocking it.
+
+Usage of :py:func:`async_solve`:
+
+>>> import asyncio
+>>> from amp_constraint_solver import async_solve
+>>> async def main():
+...     async for solution in async_solve({'a': [1, 2, 3], 'b': [1, 2, 3]}, [lambda a, b: a > b]):
+...         print(solution)
+...
+>>> asyncio.run(main())
+{'a': 2, 'b': 1}
+{'a': 3, 'b': 1}
+{'a': 3, 'b': 2}
+
+"""
+from .constraint_solver import (
+    solve,
+    Constraint,
+    DomainsType,
+    SearchCheckpoint,
+    SearchHooks,
+    SearchLimitExceeded,
+    SearchLimits,
+    SearchState,
+    ValueType,
+    _run_search,
+    _start_search,
+)
+from typing import (
+    Any,
+    AsyncIterator,
+    Dict,
+    Generator,
+    Iterable,
+    List,
+    Optional,
+    Tuple,
+)
+from concurrent.futures import (
+    CancelledError as _FutureCancelledError,
+    Executor,
+    ProcessPoolExecutor as _ProcessPoolExecutor,
+    TimeoutError as _FutureTimeoutError,
+)
+from time import perf_counter as _perf_counter
+import asyncio as _asyncio
+import threading as _threading
+
+
+__all__ = ["async_solve"]
+
+
+# Marks where a search paused to hand control back to the event loop.
+_PAUSED = object()
+
+# Marks the end of the solutions streamed from a worker thread.
+_DONE = object()
+
+# How often a worker thread blocked on a full queue checks whether it's been stopped, in seconds.
+_STOP_POLL_INTERVAL = 0.05
+
+
+class _Pause(SearchHooks):
+    """Pauses a search once it's tried enough values or run for long enough since it last paused."""
+
+    def __init__(self, nodes: int, seconds: float):
+        self.nodes = nodes
+        self.seconds = seconds
+        self.restart()
+
+    def restart(self):
+        """Starts counting towards the next pause."""
+        self.left = self.nodes
+        self.deadline = _perf_counter() + self.seconds
+
+    def on_assign(self, state: SearchState, var: str, value: ValueType):
+        self.left -= 1
+        if self.left <= 0 or _perf_counter() >= self.deadline:
+            state._pause = True
+
+    def on_backtrack(self, state: SearchState, var: str):
+        if _perf_counter() >= self.deadline:
+            state._pause = True
+
+
+class _Stopped(Exception):
+    """Raised in a worker thread once the caller has stopped reading its solutions."""
+
+
+class _Stop(SearchHooks):
+    """Stops a search in a worker thread once an event is set."""
+
+    def __init__(self, event: _threading.Event):
+        self.event = event
+
+    def on_assign(self, state: SearchState, var: str, value: ValueType):
+        if self.event.is_set():
+            raise _Stopped()
+
+
+def _solutions(
+    domains: DomainsType,
+    constraints: List[Constraint],
+    options: Dict[str, Any],
+    hooks: Iterable[SearchHooks],
+    as_tuples: bool,
+    resume: Optional[SearchCheckpoint],
+) -> Generator[Any, None, None]:
+    """Yields the solutions :py:func:`amp_constraint_solver.constraint_solver.solve` would,
+       and :py:data:`_PAUSED` whenever one of the ``hooks`` pauses the search."""
+    state = _start_search(domains, constraints, extra_hooks=hooks, **options)
+    if state is None:
+        return
+    solution = state.solution_tuple if as_tuples else state.solution
+    try:
+        for count in _run_search(state, checkpoint=resume):
+            yield solution() if count else _PAUSED
+    except SearchLimitExceeded as exceeded:
+        limits = options.get("limits")
+        if limits is None or not limits.quiet:
+            raise
+        limits.exceeded = exceeded
+
+
+def _put(
+    loop: _asyncio.AbstractEventLoop,
+    queue: "_asyncio.Queue[Tuple[Any, Any]]",
+    item: Tuple[Any, Any],
+    stop: _threading.Event,
+):
+    """Puts an item on an asyncio queue from a worker thread, waiting while it's full."""
+    future = _asyncio.run_coroutine_threadsafe(queue.put(item), loop)
+    while True:
+        try:
+            return future.result(_STOP_POLL_INTERVAL)
+        except _FutureTimeoutError:
+            if stop.is_set():
+                future.cancel()
+                raise _Stopped()
+        except _FutureCancelledError:
+            raise _Stopped()
+
+
+def _stream(
+    loop: _asyncio.AbstractEventLoop,
+    queue: "_asyncio.Queue[Tuple[Any, Any]]",
+    stop: _threading.Event,
+    domains: DomainsType,
+    constraints: List[Constraint],
+    options: Dict[str, Any],
+    as_tuples: bool,
+    resume: Optional[SearchCheckpoint],
+):
+    """Searches in a worker thread, putting each solution on the queue,
+       then :py:data:`_DONE` with the exception the search raised, if any."""
+    try:
+        for solution in _solutions(
+            domains, constraints, options, [_Stop(stop)], as_tuples, resume
+        ):
+            _put(loop, queue, (solution, None), stop)
+        _put(loop, queue, (_DONE, None), stop)
+    except _Stopped:
+        pass
+    except Exception as error:
+        try:
+            _put(loop, queue, (_DONE, error), stop)
+        except _Stopped:
+            pass
+
+
+def _solve_chunk(
+    domains: DomainsType,
+    constraints: List[Constraint],
+    options: Dict[str, Any],
+    as_tuples: bool,
+    resume: Optional[SearchCheckpoint],
+    nodes: int,
+) -> Tuple[List[Any], Optional[SearchCheckpoint]]:
+    """Searches in a worker process until it's assigned ``nodes`` values,
+       returning the solutions found and a checkpoint to carry on from, or None once it's finished."""
+    limits = SearchLimits(max_nodes=nodes, quiet=True)
+    solutions = list(
+        solve(
+            domains,
+            constraints,
+            as_tuples=as_tuples,
+            limits=limits,
+            resume=resume,
+            **options,
+        )
+    )
+    if limits.exceeded is None:
+        return solutions, None
+    return solutions, limits.exceeded.checkpoint
+
+
+async def async_solve(
+    domains: DomainsType,
+    constraints: List[Constraint] = [],
+    *,
+    yield_nodes: int = 1000,
+    yield_seconds: float = 0.01,
+    executor: Executor = None,
+    queue_size: int = 64,
+    chunk_nodes: int = 100000,
+    as_tuples: bool = False,
+    resume: SearchCheckpoint = None,
+    **options,
+) -> AsyncIterator[Any]:
+    """
+        An asynchronous generator that yields the same solutions as :py:func:`amp_constraint_solver.constraint_solver.solve`,
+        without blocking the event loop it's iterated from.
+
+        By default the search runs in the event loop's thread, handing control back to the loop
+        once it's tried ``yield_nodes`` values or run for ``yield_seconds`` since it last did.
+        Cancelling the task iterating over it stops the search at the next of these points.
+
+        With an ``executor``, the search runs in it instead. Solutions from a thread are streamed
+        through a queue of at most ``queue_size`` solutions, and the thread waits while the queue
+        is full. A :py:class:`concurrent.futures.ProcessPoolExecutor` can't share a queue, so the
+        search runs in chunks of ``chunk_nodes`` assigned values, each carrying on from the
+        checkpoint of the last (see :py:class:`amp_constraint_solver.constraint_solver.SearchLimits`),
+        with the next chunk searched while the solutions of the last are read. The problem is sent
+        to a process with each chunk, so it must be picklable. Either way, the search stops once
+        the generator is closed or its task is cancelled, within a chunk for processes.
+
+        Independent components can't be searched separately, so ``decompose`` isn't supported.
+
+        :param domains: A dict of variable names to lists of possible assignments, :py:class:`amp_constraint_solver.constraint_solver.DomainsType`.
+        :param constraints: A list of :py:class:`amp_constraint_solver.constraint_solver.Constraint` functions to check possible solutions.
+        :param yield_nodes: How many values to assign between handing control back to the event loop.
+        :param yield_seconds: How long to search for between handing control back to the event loop.
+        :param executor: A :py:class:`concurrent.futures.Executor` to search in, rather than the event loop's thread.
+        :param queue_size: How many solutions a thread may find before they're read.
+        :param chunk_nodes: How many values a process assigns per chunk.
+        :param as_tuples: Whether to yield tuples of values instead of dicts.
+        :param resume: A :py:class:`amp_constraint_solver.constraint_solver.SearchCheckpoint` to carry on an earlier search from.
+        :param options: Keyword arguments passed on to :py:func:`amp_constraint_solver.constraint_solver.solve`.
+        :returns: An asynchronous generator of solutions.
+        :raise ValueError: Invalid domains or constraints, ``decompose``, or statistics, hooks or limits
+            with a process pool, which couldn't update them.
+        :raise SearchLimitExceeded: The search went over its ``limits``, unless they're quiet.
+    """
+    if options.pop("decompose", False):
+        raise ValueError("Decomposed problems can't be solved asynchronously.")
+    if executor is None:
+        pause = _Pause(yield_nodes, yield_seconds)
+        solutions = _solutions(
+            domains, constraints, options, [pause], as_tuples, resume
+        )
+        try:
+            for solution in solutions:
+                if solution is _PAUSED:
+                    await _asyncio.sleep(0)
+                    pause.restart()
+                else:
+                    yield solution
+        finally:
+            solutions.close()
+        return
+
+    loop = _asyncio.get_running_loop()
+    if isinstance(executor, _ProcessPoolExecutor):
+        if any(
+            options.get(name) for name in ("statistics", "hooks", "limits")
+        ):
+            raise ValueError(
+                "Statistics, hooks and limits can't be updated from a process pool."
+            )
+        chunk: Optional[
+            "_asyncio.Future[Tuple[List[Any], Optional[SearchCheckpoint]]]"
+        ] = loop.run_in_executor(
+            executor,
+            _solve_chunk,
+            domains,
+            constraints,
+            options,
+            as_tuples,
+            resume,
+            chunk_nodes,
+        )
+        try:
+            while chunk is not None:
+                found, checkpoint = await chunk
+                chunk = None
+                if checkpoint is not None:
+                    chunk = loop.run_in_executor(
+                        executor,
+                        _solve_chunk,
+                        domains,
+                        constraints,
+                        options,
+                        as_tuples,
+                        checkpoint,
+                        chunk_nodes,
+                    )
+                for solution in found:
+                    yield solution
+        finally:
+            if chunk is not None:
+                chunk.cancel()
+        return
+
+    queue: "_asyncio.Queue[Tuple[Any, Any]]" = _asyncio.Queue(queue_size)
+    stop = _threading.Event()
+    loop.run_in_executor(
+        executor,
+        _stream,
+        loop,
+        queue,
+        stop,
+        domains,
+        constraints,
+        options,
+        as_tuples,
+        resume,
+    )
+    try:
+        while True:
+            solution, error = await queue.get()
+            if solution is _DONE:
+                if error is not None:
+                    raise error
+                return
+            yield solution
+    finally:
+        stop.set()
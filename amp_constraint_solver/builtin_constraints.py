@@ -1,12 +1,56 @@
 """ Some built in constraints to be used in testing. """
-from .constraint_solver import Constraint
-from typing import cast as _cast, TypeVar, List, Dict, Set, Callable, Generator
+from .constraint_solver import Constraint, SearchState, scoped
+from .domains import _popcount, _numpy
+from typing import (
+    cast as _cast,
+    TypeVar,
+    List,
+    Dict,
+    Set,
+    Callable,
+    Generator,
+    Any,
+    Iterable,
+    Mapping,
+    Sequence,
+    Optional,
+    Tuple,
+)
+from collections import deque as _deque
+from array import array as _array
+from fractions import Fraction as _Fraction
+from math import ceil as _ceil, floor as _floor
+import operator as _operator
+import re as _re
+
+
+# How many masks of rows a table constraint caches, they're as large as the table has rows.
+_TABLE_CACHE_SIZE = 64
+
+# The most values left in the domains of an AllDifferent's unassigned variables for arc
+# consistency to filter them by matching, the graph has a node per value.
+_MATCHING_MAX_VALUES = 100000
+
+# Roughly how many bits of a mask can be and-ed in the time it takes to read a value of a row,
+# to choose between them when reducing domains.
+_ROW_COST = 4096
+
+_NON_ZERO_BYTE = _re.compile(b"[^\\x00]")
+
+# The positions of the set bits of each byte.
+_BITS_OF_BYTE = [
+    tuple(bit for bit in range(8) if byte >> bit & 1) for byte in range(256)
+]
 
 
 __all__ = [
     "no_duplicate_values_constraint",
     "make_vars_not_equal_constraint",
     "make_vars_not_diagonal_on_grid_constraint",
+    "AllDifferent",
+    "TableConstraint",
+    "Linear",
+    "Sum",
 ]
 
 
@@ -14,25 +58,38 @@ def no_duplicate_values_constraint(**variables) -> bool:
     """An :py:class:`amp_constraint_solver.constraint_solver.Constraint` that can be passed to :py:func:`amp_constraint_solver.constraint_solver.solve`.
        Ensures that values are assigned to only one variable at a time.
 
+       Prefer :py:class:`AllDifferent`, which the solver only checks against the variables it names
+       and can use to reduce domains.
+
        :param variables: All variables in a candidate solution.
        :returns: Whether all variables are destinct.
     """
-    for var1, value1 in variables.items():
-        for var2, value2 in variables.items():
-            if var1 != var2:
-                if value1 == value2:
-                    return False
-    return True
+    values = list(variables.values())
+    return len(set(values)) == len(values)
 
 
 def make_vars_not_equal_constraint(var1: str, var2: str) -> Constraint:
     """A function that creates a constraint that ensures two variables are different.
 
+       The constraint has a batch form, see :py:func:`amp_constraint_solver.constraint_solver.scoped`.
+
        :param var1: A variable name.
        :param var2: Another variable name.
        :returns: An :py:class:`amp_constraint_solver.constraint_solver.Constraint` that can be passed to :py:func:`amp_constraint_solver.constraint_solver.solve`.
     """
 
+    def not_equal_batch(
+        assignment: Dict[str, Any], var: str, values: Any
+    ) -> Any:
+        other = assignment[var2 if var == var1 else var1]
+        if not isinstance(other, (int, float)):
+            # A 0-d object array is compared as one value, even if it's a tuple.
+            wrapped = _numpy.empty((), dtype=object)
+            wrapped[()] = other
+            other = wrapped
+        return values != other
+
+    @scoped(var1, var2, batch=not_equal_batch)
     def not_equal(**variables) -> bool:
         f"Ensuring {var1} and {var2} are not equal."
         if all([key in variables for key in (var1, var2)]):
@@ -40,6 +97,9 @@ def make_vars_not_equal_constraint(var1: str, var2: str) -> Constraint:
                 return False
         return True
 
+    setattr(
+        not_equal, "cache_key", ("make_vars_not_equal_constraint", var1, var2)
+    )
     return not_equal
 
 
@@ -48,6 +108,8 @@ def make_vars_not_diagonal_on_grid_constraint(
 ) -> Constraint:
     """A function that creates a constraint ensures that (x1, y1) is not diagonal with (x2, y2) on a positive grid.
 
+       The constraint has a batch form, see :py:func:`amp_constraint_solver.constraint_solver.scoped`.
+
        :param x1: The variable name of the X coord of the first point.
        :param y1: The variable name of the Y coord of the first point.
        :param x2: The variable name of the X coord of the second point.
@@ -55,6 +117,17 @@ def make_vars_not_diagonal_on_grid_constraint(
        :returns: An :py:class:`amp_constraint_solver.constraint_solver.Constraint` that can be passed to :py:func:`amp_constraint_solver.constraint_solver.solve`.
     """
 
+    def not_diagonal_batch(
+        assignment: Dict[str, Any], var: str, values: Any
+    ) -> Any:
+        # The values are broadcast in place of the variable being checked.
+        first_x, first_y, second_x, second_y = [
+            values if key == var else assignment[key]
+            for key in (x1, y1, x2, y2)
+        ]
+        return abs(first_x - second_x) != abs(first_y - second_y)
+
+    @scoped(x1, y1, x2, y2, batch=not_diagonal_batch)
     def not_diagonal(**variables) -> bool:
         f"Ensure ({x1}, {y1}) is not diagonal with ({x2}, {y2})"
         variables = _cast(Dict[str, int], variables)
@@ -66,4 +139,622 @@ def make_vars_not_diagonal_on_grid_constraint(
         else:
             return True
 
+    setattr(
+        not_diagonal,
+        "cache_key",
+        ("make_vars_not_diagonal_on_grid_constraint", x1, y1, x2, y2),
+    )
     return not_diagonal
+
+
+class AllDifferent:
+    """A global :py:class:`amp_constraint_solver.constraint_solver.Constraint` that ensures a group of variables
+       are all assigned different values.
+
+       It's checked with a set each time one of its variables is assigned. With forward checking,
+       assigned values are removed from the domains of the other variables. With arc consistency,
+       domains are filtered with Régin's matching algorithm, which removes every value that
+       can't be part of an assignment of distinct values to all of the variables. If the domains
+       left hold too many values to build its graph, as with huge ranges, only assigned values are removed.
+
+       >>> from amp_constraint_solver import solve, AllDifferent
+       >>> domains = {'a': [1, 2], 'b': [1, 2], 'c': [1, 2, 3]}
+       >>> list(solve(domains, [AllDifferent(['a', 'b', 'c'])], propagation="arc_consistency"))
+       [{'a': 1, 'b': 2, 'c': 3}, {'a': 2, 'b': 1, 'c': 3}]
+
+       :param variables: The names of the variables that must be different.
+    """
+
+    partial = True
+
+    def __init__(self, variables: Iterable[str]):
+        self.scope = tuple(variables)
+
+    def __repr__(self) -> str:
+        return f"AllDifferent({list(self.scope)})"
+
+    @property
+    def cache_key(self) -> Tuple:
+        """Identifies the constraint in a :py:func:`amp_constraint_solver.cache.fingerprint`."""
+        return ("AllDifferent", self.scope)
+
+    def __call__(self, **variables) -> bool:
+        values = list(variables.values())
+        return len(set(values)) == len(values)
+
+    def propagate(self, state: SearchState) -> bool:
+        """Reduces the domains of the unassigned variables, returning False if they can't all be different."""
+        assignment = state.assignment
+        if (
+            state.propagation != "arc_consistency"
+            or sum(
+                state.domain_size(var)
+                for var in self.scope
+                if var not in assignment
+            )
+            > _MATCHING_MAX_VALUES
+        ):
+            assigned = [assignment[var] for var in self.scope if var in assignment]
+            taken = set(assigned)
+            if len(taken) < len(assigned):
+                return False
+            for var in self.scope:
+                if var not in assignment:
+                    for value in taken:
+                        if not state.remove(var, value):
+                            return False
+            return True
+
+        domains = {
+            var: [assignment[var]] if var in assignment else state.domain(var)
+            for var in self.scope
+        }
+        supported = _all_different_supports(domains)
+        if supported is None:
+            return False
+        for var in self.scope:
+            if var not in assignment:
+                if not state.restrict(var, supported[var]):
+                    return False
+        return True
+
+
+class TableConstraint:
+    """A global :py:class:`amp_constraint_solver.constraint_solver.Constraint` that a group of variables
+       take the values of one of a table of allowed tuples (an extensional constraint).
+
+       The table isn't kept as tuples. Instead, for each variable and value, the rows of the
+       table with that value are stored as the bits of an int (as in compact-table), so the
+       rows still allowed by a partial solution are found by and-ing a mask per assigned
+       variable, without scanning the table. Each column is also kept as an array of small ints,
+       so once few rows are left their values are read directly. Rows are sorted where their values
+       can be, so assigning the variables in the order given keeps the rows left close together.
+
+       It's checked each time one of its variables is assigned.
+       With forward checking, the values of unassigned variables that aren't in any row
+       allowed by the assigned values are removed from their domains. With arc consistency,
+       the rows left are also limited to the values left in unassigned variables' domains,
+       so every value left is in a row that's entirely made of values left.
+
+       >>> from amp_constraint_solver import solve, TableConstraint
+       >>> domains = {'a': [1, 2, 3], 'b': [1, 2, 3]}
+       >>> list(solve(domains, [TableConstraint(['a', 'b'], [(1, 2), (2, 3), (3, 3)])], propagation="forward_checking"))
+       [{'a': 1, 'b': 2}, {'a': 2, 'b': 3}, {'a': 3, 'b': 3}]
+
+       :param variables: The names of the variables, in the order of the values in each tuple.
+       :param tuples: The allowed tuples of values. Repeated tuples are ignored.
+       :raise ValueError: A tuple doesn't have a value for each variable.
+    """
+
+    partial = True
+
+    def __init__(self, variables: Iterable[str], tuples: Iterable[Sequence]):
+        self.scope = tuple(variables)
+        rows = list(dict.fromkeys(tuple(row) for row in tuples))
+        try:
+            # Sorted rows sharing their first values are next to each other,
+            # so the masks of partial solutions assigned in the order of the scope have few set bytes.
+            rows.sort()
+        except TypeError:
+            pass
+        for row in rows:
+            if len(row) != len(self.scope):
+                raise ValueError(
+                    f"Tuples must have a value for each of {list(self.scope)}, not {row}"
+                )
+        self.size = len(rows)
+        # The mask of every row.
+        self._all = (1 << len(rows)) - 1
+        columns = list(zip(*rows)) if rows else [() for _ in self.scope]
+        # Each column is kept as an array of the positions of its values in a list of them,
+        # to read the values of a few rows without and-ing every value's mask.
+        self._supports: Dict[str, Dict[Any, int]] = {}
+        self._columns: Dict[str, Tuple[List, _array]] = {}
+        for var, column in zip(self.scope, columns):
+            supports, codes = _index_column(column, len(rows))
+            self._supports[var] = supports
+            self._columns[var] = (list(supports), codes)
+        self._cache: Dict[Tuple[Tuple[str, Any], ...], int] = {}
+
+    def __repr__(self) -> str:
+        return f"TableConstraint({list(self.scope)}, {self.size} tuples)"
+
+    @property
+    def cache_key(self) -> Tuple:
+        """Identifies the constraint in a :py:func:`amp_constraint_solver.cache.fingerprint`,
+           by its rows, read back from its columns."""
+        columns = [
+            [values[code] for code in codes]
+            for values, codes in self._columns.values()
+        ]
+        return ("TableConstraint", self.scope, tuple(zip(*columns)))
+
+    def __call__(self, **variables) -> bool:
+        return bool(self._rows_of(tuple(variables.items())))
+
+    def _rows_of(self, assigned: Tuple[Tuple[str, Any], ...]) -> int:
+        """The mask of the rows that agree with some (variable, value) pairs.
+
+           Masks are cached by their pairs, so as a search assigns the variables one at a time,
+           each mask is found from the cached mask of the pairs before its last with one and.
+        """
+        rows = self._cache.get(assigned)
+        if rows is None:
+            if not assigned:
+                return self._all
+            var, value = assigned[-1]
+            rows = self._supports[var].get(value, 0)
+            if rows and len(assigned) > 1:
+                rows &= self._rows_of(assigned[:-1])
+            if len(self._cache) >= _TABLE_CACHE_SIZE:
+                self._cache.clear()
+            self._cache[assigned] = rows
+        return rows
+
+    def _rows_in_domain(self, var: str, domain: Sequence) -> int:
+        """The mask of the rows whose value of a variable is in its domain."""
+        supports = self._supports[var]
+        rows = 0
+        if 2 * len(domain) <= len(supports):
+            for value in domain:
+                rows |= supports.get(value, 0)
+            return rows
+        # Most values are left, so it's quicker to remove the rows of those that aren't.
+        left = set(domain)
+        for value, support in supports.items():
+            if value not in left:
+                rows |= support
+        return self._all ^ rows
+
+    def propagate(self, state: SearchState) -> bool:
+        """Removes the values of unassigned variables that aren't in any row left, returning False if no rows are left."""
+        assignment = state.assignment
+        arc_consistency = state.propagation == "arc_consistency"
+        supports = self._supports
+        unassigned = [var for var in self.scope if var not in assignment]
+        rows = self._rows_of(
+            tuple(
+                (var, assignment[var])
+                for var in self.scope
+                if var in assignment
+            )
+        )
+        if arc_consistency:
+            for var in unassigned:
+                if not rows:
+                    break
+                rows &= self._rows_in_domain(var, state.domain(var))
+        if not rows:
+            return False
+        domain_sizes = sum(state.domain_size(var) for var in unassigned)
+        if (
+            _popcount(rows) * (len(unassigned) + 1) * _ROW_COST
+            < domain_sizes * rows.bit_length()
+        ):
+            # Few rows are left, so reading their values is quicker than and-ing each value's mask.
+            numbers = _row_numbers(rows)
+            for var in unassigned:
+                values, codes = self._columns[var]
+                if not state.restrict(
+                    var, set(values[codes[number]] for number in numbers)
+                ):
+                    return False
+            return True
+        for var in unassigned:
+            var_supports = supports[var]
+            if not state.restrict(
+                var,
+                [
+                    value
+                    for value in state.domain(var)
+                    if var_supports.get(value, 0) & rows
+                ],
+            ):
+                return False
+        return True
+
+
+# How each comparison of a linear constraint is checked.
+_COMPARISONS: Dict[str, Callable[[Any, Any], bool]] = {
+    "==": _operator.eq,
+    "!=": _operator.ne,
+    "<=": _operator.le,
+    "<": _operator.lt,
+    ">=": _operator.ge,
+    ">": _operator.gt,
+}
+
+
+class Linear:
+    """A global :py:class:`amp_constraint_solver.constraint_solver.Constraint` that a weighted sum
+       of variables compares to a constant, ``sum(c * v for c, v in zip(coefficients, variables)) op rhs``.
+
+       It's checked once all of its variables are assigned. With a propagation mode, the smallest
+       and largest values left for each variable bound the sum (bounds consistency), so a partial
+       solution is rejected as soon as the sum can't satisfy the comparison, and values of
+       unassigned variables that would take the sum out of range are removed. ``!=`` only removes
+       a value once one variable is left unassigned. Range and interval domains are narrowed by
+       working out the new bounds of each variable, without looking at the values between them.
+
+       >>> from amp_constraint_solver import solve, Linear
+       >>> domains = {'a': [1, 2, 3], 'b': [1, 2, 3], 'c': [1, 2, 3]}
+       >>> list(solve(domains, [Linear([1, 1, -1], ['a', 'b', 'c'], '>', 2)], propagation="forward_checking"))
+       [{'a': 1, 'b': 3, 'c': 1}, {'a': 2, 'b': 2, 'c': 1}, {'a': 2, 'b': 3, 'c': 1}, {'a': 2, 'b': 3, 'c': 2}, {'a': 3, 'b': 1, 'c': 1}, {'a': 3, 'b': 2, 'c': 1}, {'a': 3, 'b': 2, 'c': 2}, {'a': 3, 'b': 3, 'c': 1}, {'a': 3, 'b': 3, 'c': 2}, {'a': 3, 'b': 3, 'c': 3}]
+
+       :param coefficients: The number each variable is multiplied by.
+       :param variables: The names of the variables. A variable named more than once has its coefficients added.
+       :param op: The comparison, ``"=="``, ``"!="``, ``"<="``, ``"<"``, ``">="`` or ``">"``.
+       :param rhs: The constant the sum is compared to.
+       :raise ValueError: An unknown comparison, or a coefficient missing for a variable.
+    """
+
+    def __init__(
+        self,
+        coefficients: Sequence,
+        variables: Sequence[str],
+        op: str,
+        rhs: Any,
+    ):
+        if op not in _COMPARISONS:
+            raise ValueError(
+                f"{op} is not a known comparison, use one of {list(_COMPARISONS)}."
+            )
+        if len(coefficients) != len(variables):
+            raise ValueError(
+                f"Linear constraints need a coefficient for each variable, {coefficients} {variables}"
+            )
+        terms: Dict[str, Any] = {}
+        for coefficient, var in zip(coefficients, variables):
+            terms[var] = terms.get(var, 0) + coefficient
+        self.scope = tuple(terms)
+        self.coefficients = tuple(terms.values())
+        self.op = op
+        self.rhs = rhs
+        self._compare = _COMPARISONS[op]
+
+    def __repr__(self) -> str:
+        return f"Linear({list(self.coefficients)}, {list(self.scope)}, {self.op!r}, {self.rhs!r})"
+
+    @property
+    def cache_key(self) -> Tuple:
+        """Identifies the constraint in a :py:func:`amp_constraint_solver.cache.fingerprint`."""
+        return ("Linear", self.coefficients, self.scope, self.op, self.rhs)
+
+    def __call__(self, **variables) -> bool:
+        total = sum(
+            coefficient * variables[var]
+            for var, coefficient in zip(self.scope, self.coefficients)
+        )
+        return self._compare(total, self.rhs)
+
+    def _feasible(self, low: Any, high: Any) -> bool:
+        """Whether a sum between two bounds could satisfy the comparison."""
+        rhs = self.rhs
+        op = self.op
+        if op == "<=":
+            return low <= rhs
+        if op == "<":
+            return low < rhs
+        if op == ">=":
+            return high >= rhs
+        if op == ">":
+            return high > rhs
+        if op == "==":
+            return low <= rhs <= high
+        return not low == high == rhs
+
+    def _value_limits(
+        self, coefficient: Any, rest_low: Any, rest_high: Any
+    ) -> Tuple[Any, Any]:
+        """The smallest and largest integer values of a variable that could satisfy the comparison
+           with the rest of the sum between two bounds, either of which may be None for no limit."""
+        op = self.op
+        coefficient = _Fraction(coefficient)
+        low = high = None
+        if op in ("<=", "<", "=="):
+            # The term can be at most rhs - rest_low.
+            limit = _Fraction(self.rhs - rest_low) / coefficient
+            if coefficient > 0:
+                high = _ceil(limit) - 1 if op == "<" else _floor(limit)
+            else:
+                low = _floor(limit) + 1 if op == "<" else _ceil(limit)
+        if op in (">=", ">", "=="):
+            # The term must be at least rhs - rest_high.
+            limit = _Fraction(self.rhs - rest_high) / coefficient
+            if coefficient > 0:
+                low = _floor(limit) + 1 if op == ">" else _ceil(limit)
+            else:
+                high = _ceil(limit) - 1 if op == ">" else _floor(limit)
+        return low, high
+
+    def propagate(self, state: SearchState) -> bool:
+        """Removes values of unassigned variables that can't be part of a sum satisfying the comparison,
+           returning False if the sum of the partial solution can't."""
+        assignment = state.assignment
+        fixed = 0
+        unassigned = []
+        for var, coefficient in zip(self.scope, self.coefficients):
+            if var in assignment:
+                fixed += coefficient * assignment[var]
+            else:
+                unassigned.append((var, coefficient))
+        if not unassigned:
+            return self._compare(fixed, self.rhs)
+        if self.op == "!=":
+            if len(unassigned) == 1:
+                ((var, coefficient),) = unassigned
+                if coefficient and not isinstance(state.domain(var), list):
+                    # Only one value of a range or interval domain can make the sum equal.
+                    value = _Fraction(self.rhs - fixed) / _Fraction(
+                        coefficient
+                    )
+                    if value.denominator != 1:
+                        return True
+                    return state.remove(var, int(value))
+                return state.restrict(
+                    var,
+                    [
+                        value
+                        for value in state.domain(var)
+                        if fixed + coefficient * value != self.rhs
+                    ],
+                )
+            return True
+
+        # Tighten the bounds until every value left fits, as removing values
+        # from one variable can narrow the range left for the others.
+        changed = True
+        while changed:
+            changed = False
+            terms = [
+                sorted(coefficient * value for value in state.bounds(var))
+                for var, coefficient in unassigned
+            ]
+            lows = [term_low for term_low, _ in terms]
+            highs = [term_high for _, term_high in terms]
+            low = fixed + sum(lows)
+            high = fixed + sum(highs)
+            if not self._feasible(low, high):
+                return False
+            for (var, coefficient), var_low, var_high in zip(
+                unassigned, lows, highs
+            ):
+                rest_low = low - var_low
+                rest_high = high - var_high
+                domain = state.domain(var)
+                if not isinstance(domain, list):
+                    if not coefficient:
+                        continue
+                    size = state.domain_size(var)
+                    if not state.restrict_between(
+                        var,
+                        *self._value_limits(coefficient, rest_low, rest_high),
+                    ):
+                        return False
+                    changed = changed or state.domain_size(var) < size
+                    continue
+                kept = [
+                    value
+                    for value in domain
+                    if self._feasible(
+                        rest_low + coefficient * value,
+                        rest_high + coefficient * value,
+                    )
+                ]
+                if len(kept) < len(domain):
+                    if not state.restrict(var, kept):
+                        return False
+                    changed = True
+        return True
+
+
+def Sum(variables: Sequence[str], op: str, rhs: Any) -> Linear:
+    """A :py:class:`Linear` constraint that the plain sum of some variables compares to a constant.
+
+       >>> from amp_constraint_solver import count_solutions, Sum
+       >>> count_solutions({'a': [1, 2, 3], 'b': [1, 2, 3]}, [Sum(['a', 'b'], '==', 4)], propagation="forward_checking")
+       3
+
+       :param variables: The names of the variables.
+       :param op: The comparison, as for :py:class:`Linear`.
+       :param rhs: The constant the sum is compared to.
+    """
+    return Linear([1] * len(variables), variables, op, rhs)
+
+
+def _index_column(
+    column: Sequence, size: int
+) -> Tuple[Dict[Any, int], _array]:
+    """Maps each value in a column of a table to the mask of the rows it's in,
+       and lists the position of each row's value among the values, in order of appearance."""
+    # Bits are set in a bytearray per value, as setting them in an int would copy it each time.
+    bits_of: Dict[Any, bytearray] = {}
+    position_of: Dict[Any, int] = {}
+    codes = _array("L")
+    for row, value in enumerate(column):
+        bits = bits_of.get(value)
+        if bits is None:
+            bits = bits_of[value] = bytearray((size + 7) // 8)
+            position_of[value] = len(position_of)
+        bits[row >> 3] |= 1 << (row & 7)
+        codes.append(position_of[value])
+    supports = {
+        value: int.from_bytes(bits, "little")
+        for value, bits in bits_of.items()
+    }
+    return supports, codes
+
+
+def _row_numbers(rows: int) -> List[int]:
+    """The numbers of the rows in a mask, the positions of its set bits."""
+    # Only the bytes between the lowest and highest set bits are read.
+    lowest = (rows & -rows).bit_length() - 1
+    offset = lowest - lowest % 8
+    rows >>= offset
+    data = rows.to_bytes((rows.bit_length() + 7) // 8, "little")
+    numbers: List[int] = []
+    # Searching for the non-zero bytes skips empty stretches of the mask quickly.
+    for match in _NON_ZERO_BYTE.finditer(data):
+        start = match.start()
+        base = offset + start * 8
+        numbers.extend(base + bit for bit in _BITS_OF_BYTE[data[start]])
+    return numbers
+
+
+def _maximum_matching(domains: Mapping[str, Sequence]) -> Dict[str, Any]:
+    """Matches as many variables as possible to distinct values from their domains, using augmenting paths."""
+    matching: Dict[str, Any] = {}
+    owners: Dict[Any, str] = {}
+    for var, values in domains.items():
+        for value in values:
+            if value not in owners:
+                matching[var] = value
+                owners[value] = var
+                break
+    for root in domains:
+        if root in matching:
+            continue
+        # Breadth first search for an alternating path from root to a free value.
+        reached_from: Dict[Any, str] = {}
+        visited = {root}
+        pending = _deque([root])
+        while pending:
+            var = pending.popleft()
+            for value in domains[var]:
+                if value in reached_from:
+                    continue
+                reached_from[value] = var
+                owner = owners.get(value)
+                if owner is None:
+                    # Flip the matched and unmatched edges along the path.
+                    while var != root:
+                        previous = matching[var]
+                        matching[var] = value
+                        owners[value] = var
+                        value = previous
+                        var = reached_from[value]
+                    matching[root] = value
+                    owners[value] = root
+                    pending.clear()
+                    break
+                if owner not in visited:
+                    visited.add(owner)
+                    pending.append(owner)
+    return matching
+
+
+def _strongly_connected_components(adjacency: List[List[int]]) -> List[int]:
+    """Labels each node of a directed graph with its strongly connected component, using Tarjan's
+       algorithm without recursion."""
+    count = len(adjacency)
+    index = [-1] * count
+    low = [0] * count
+    on_stack = [False] * count
+    component = [-1] * count
+    stack: List[int] = []
+    counter = 0
+    components = 0
+    for root in range(count):
+        if index[root] != -1:
+            continue
+        index[root] = low[root] = counter
+        counter += 1
+        stack.append(root)
+        on_stack[root] = True
+        work = [(root, iter(adjacency[root]))]
+        while work:
+            node, successors = work[-1]
+            for successor in successors:
+                if index[successor] == -1:
+                    index[successor] = low[successor] = counter
+                    counter += 1
+                    stack.append(successor)
+                    on_stack[successor] = True
+                    work.append((successor, iter(adjacency[successor])))
+                    break
+                if on_stack[successor]:
+                    low[node] = min(low[node], index[successor])
+            else:
+                work.pop()
+                if work:
+                    parent = work[-1][0]
+                    low[parent] = min(low[parent], low[node])
+                if low[node] == index[node]:
+                    while True:
+                        member = stack.pop()
+                        on_stack[member] = False
+                        component[member] = components
+                        if member == node:
+                            break
+                    components += 1
+    return component
+
+
+def _all_different_supports(
+    domains: Mapping[str, Sequence]
+) -> Optional[Dict[str, Set[Any]]]:
+    """Finds the values of each variable that belong to some assignment of distinct values (Régin's algorithm).
+
+       :returns: The supported values of each variable, or None if the variables can't all be different.
+    """
+    matching = _maximum_matching(domains)
+    if len(matching) < len(domains):
+        return None
+
+    # Number the variables, then the values, as nodes of the graph where matched edges
+    # run from variable to value and unmatched edges from value to variable.
+    variables = list(domains)
+    node_of: Dict[Any, int] = {}
+    for var in variables:
+        for value in domains[var]:
+            if value not in node_of:
+                node_of[value] = len(variables) + len(node_of)
+    adjacency: List[List[int]] = [[] for _ in range(len(variables) + len(node_of))]
+    for number, var in enumerate(variables):
+        adjacency[number].append(node_of[matching[var]])
+        for value in domains[var]:
+            if value != matching[var]:
+                adjacency[node_of[value]].append(number)
+
+    # Unmatched edges on an alternating path from a free value can be swapped into a matching.
+    matched_values = set(node_of[value] for value in matching.values())
+    reached = set(node for node in node_of.values() if node not in matched_values)
+    pending = list(reached)
+    while pending:
+        for successor in adjacency[pending.pop()]:
+            if successor not in reached:
+                reached.add(successor)
+                pending.append(successor)
+
+    # So can unmatched edges on an alternating cycle.
+    component = _strongly_connected_components(adjacency)
+    return {
+        var: set(
+            value
+            for value in domains[var]
+            if value == matching[var]
+            or node_of[value] in reached
+            or component[node_of[value]] == component[number]
+        )
+        for number, var in enumerate(variables)
+    }
@@ -0,0 +1,454 @@
+"""
+Caching the solutions of problems that are solved more than once.
+
+Usage of :py:class:`SolutionCache`:
+
+>>> from amp_constraint_solver import SolutionCache, keyed
+>>> cache = SolutionCache()
+>>> a_greater = keyed("a > b")(lambda a, b: a > b)
+>>> list(cache.solve({'a': [1, 2], 'b': [1, 2]}, [a_greater]))
+[{'a': 2, 'b': 1}]
+>>> list(cache.solve({'a': [1, 2], 'b': [1, 2]}, [a_greater]))
+[{'a': 2, 'b': 1}]
+>>> cache.hits, cache.misses
+(1, 1)
+
+"""
+from .constraint_solver import (
+    count_solutions,
+    is_satisfiable,
+    solve,
+    Constraint,
+    DomainsType,
+    SolutionGenerator,
+    _compile_constraint,
+    _validate_domains_and_constraints,
+)
+from .domains import Intervals, _ranges_of
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Hashable,
+    Iterator,
+    List,
+    NamedTuple,
+    Optional,
+)
+from collections import OrderedDict as _OrderedDict
+from inspect import (
+    isbuiltin as _isbuiltin,
+    isfunction as _isfunction,
+    ismodule as _ismodule,
+)
+from itertools import islice as _islice
+from time import time as _time
+import hashlib as _hashlib
+import pickle as _pickle
+import sqlite3 as _sqlite3
+from types import CodeType as _CodeType
+
+
+__all__ = ["fingerprint", "keyed", "SolutionCache"]
+
+
+# Changed whenever the fingerprint or the stored entries change, so old stores aren't misread.
+_CACHE_VERSION = 2
+
+# Options of solve that change which order solutions come in.
+_ORDER_OPTIONS = (
+    "propagation",
+    "variable_ordering",
+    "value_ordering",
+    "backjumping",
+    "decompose",
+)
+
+# Options of solve that stop a search before it's finished, so its results aren't cached.
+_UNCACHED_OPTIONS = ("limits", "resume")
+
+
+def keyed(key: Hashable) -> Callable[[Constraint], Constraint]:
+    """A decorator that identifies a constraint in a :py:func:`fingerprint` by ``key``,
+       for constraints like lambdas that can't be identified by their code.
+
+       Constraints with the same key, reading the same variables, are assumed to be the same.
+
+       :param key: A value whose ``repr`` is the same each time the constraint is made.
+       :returns: A decorator that sets the ``cache_key`` attribute of a :py:class:`amp_constraint_solver.constraint_solver.Constraint`.
+    """
+
+    def decorate(constraint: Constraint) -> Constraint:
+        setattr(constraint, "cache_key", key)
+        return constraint
+
+    return decorate
+
+
+def _code_key(code: _CodeType) -> tuple:
+    """The bytecode and constants of a function, and of the functions defined inside it."""
+    return (
+        code.co_code,
+        tuple(
+            _code_key(const) if isinstance(const, _CodeType) else const
+            for const in code.co_consts
+        ),
+    )
+
+
+def _constraint_key(constraint: Constraint) -> str:
+    """Describes a constraint by its key and the variables it reads."""
+    key = getattr(constraint, "cache_key", None)
+    if key is None:
+        name = getattr(constraint, "__qualname__", "<lambda>")
+        # Bound methods and callable objects depend on the object they're called on,
+        # which their name doesn't describe.
+        bound = getattr(constraint, "__self__", None)
+        if (
+            "<" in name
+            or not hasattr(constraint, "__module__")
+            or not (_isfunction(constraint) or _isbuiltin(constraint))
+            or not (bound is None or _ismodule(bound))
+        ):
+            raise ValueError(
+                f"{constraint} can't be identified by its code, give it a key with keyed."
+            )
+        # Functions defined at the top level of a module are identified by their name,
+        # and their code and defaults, so an edited function isn't mistaken for the old one.
+        key = ("function", constraint.__module__, name)
+        code = getattr(constraint, "__code__", None)
+        if code is not None:
+            key += (
+                _hashlib.sha256(
+                    repr(
+                        (
+                            _code_key(code),
+                            getattr(constraint, "__defaults__", None),
+                            getattr(constraint, "__kwdefaults__", None),
+                        )
+                    ).encode()
+                ).hexdigest(),
+            )
+    compiled = _compile_constraint(constraint)
+    reads = compiled.args if compiled.scope is None else compiled.scope
+    return repr((key, tuple(reads), compiled.takes_kwargs))
+
+
+def _domain_key(domain: Any) -> Any:
+    """Identifies a domain, ranges and intervals by the ranges they're made of, not each value."""
+    if isinstance(domain, (range, Intervals)):
+        return [
+            ("range", part[0], len(part), part.step)
+            for part in _ranges_of(domain)
+        ]
+    return [repr(value) for value in domain]
+
+
+def fingerprint(
+    domains: DomainsType, constraints: List[Constraint] = []
+) -> str:
+    """A digest that's the same for problems with the same solutions, between runs.
+
+       Domains are identified by the ``repr`` of their values, in order, or for ranges and
+       :py:class:`amp_constraint_solver.domains.Intervals`, by the ranges they're made of. Constraints are identified
+       by their ``cache_key`` attribute, which the constraints in
+       :py:mod:`amp_constraint_solver.builtin_constraints` have and :py:func:`keyed` sets,
+       or by the name, code and defaults of a function defined at the top level of a module,
+       along with the variables they read. Bound methods and other callable objects need a key.
+       The order of the constraints doesn't matter.
+
+       >>> from amp_constraint_solver import fingerprint, make_vars_not_equal_constraint
+       >>> fingerprint({'a': [1, 2], 'b': [1, 2]}, [make_vars_not_equal_constraint('a', 'b')]) == fingerprint(
+       ...     {'b': [1, 2], 'a': [1, 2]}, [make_vars_not_equal_constraint('a', 'b')])
+       True
+
+       :param domains: A dict of variable names to lists of possible assignments, :py:class:`amp_constraint_solver.constraint_solver.DomainsType`.
+       :param constraints: A list of :py:class:`amp_constraint_solver.constraint_solver.Constraint` functions to check possible solutions.
+       :returns: A hex digest.
+       :raise ValueError: Invalid domains or constraints, or a constraint that can't be identified.
+    """
+    _validate_domains_and_constraints(domains, constraints)
+    problem = (
+        _CACHE_VERSION,
+        sorted((var, _domain_key(domains[var])) for var in domains),
+        sorted(_constraint_key(constraint) for constraint in constraints),
+    )
+    return _hashlib.sha256(repr(problem).encode()).hexdigest()
+
+
+def _order_key(domains: DomainsType, options: Dict[str, Any]) -> str:
+    """Describes the options that decide the order solutions come in,
+       including the order of the variables in tuples."""
+    sorted_function = options.get("sorted_function", sorted)
+    settings = [
+        (
+            name,
+            getattr(options.get(name), "__qualname__", options.get(name)),
+        )
+        for name in _ORDER_OPTIONS
+    ]
+    return repr((list(sorted_function(domains.keys())), settings))
+
+
+class _CacheEntry(NamedTuple):
+    """What's known about the solutions of a problem.
+
+       ``solutions`` are the first solutions found with the options described by ``order``,
+       as tuples of values, and ``complete`` is whether they're all of them.
+    """
+
+    solution_count: Optional[int] = None
+    satisfiable: Optional[bool] = None
+    order: Optional[str] = None
+    solutions: tuple = ()
+    complete: bool = False
+
+
+class SolutionCache:
+    """Remembers the solutions of problems, so solving the same problem again doesn't search.
+
+       Problems are looked up by their :py:func:`fingerprint`, so every constraint must have a key.
+       For each problem, the number of solutions, whether there are any and the first ``keep``
+       solutions are kept. A cached problem with more than ``keep`` solutions yields the kept ones
+       straight away, then searches again for the rest. Solutions are only reused with the same
+       options for the order they come in, but counts and satisfiability are reused with any.
+
+       Entries are kept in memory for the ``max_entries`` problems used most recently. With a
+       ``path``, they're also stored in an SQLite database there, which outlives the process
+       and is shared by caches opened on it. Once the database holds more than ``max_bytes`` of
+       entries, those used least recently are removed. Entries whose values can't be pickled
+       are only kept in memory.
+
+       Statistics and hooks only see searches that are run, and searches with limits or
+       resuming from a checkpoint aren't cached.
+
+       :param max_entries: The most problems to keep in memory.
+       :param path: The path of an SQLite database to store entries in, or None.
+       :param max_bytes: The most bytes of pickled entries to store in the database.
+       :param keep: The most solutions to keep per problem.
+       :ivar hits: How many times a result was reused.
+       :ivar misses: How many times a search was run.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 128,
+        path: str = None,
+        max_bytes: int = 64 * 1024 * 1024,
+        keep: int = 100,
+    ):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.keep = keep
+        self.hits = 0
+        self.misses = 0
+        self._entries: "_OrderedDict[str, _CacheEntry]" = _OrderedDict()
+        self._database: Optional[_sqlite3.Connection] = None
+        if path is not None:
+            self._database = _sqlite3.connect(path, check_same_thread=False)
+            with self._database:
+                self._database.execute(
+                    "CREATE TABLE IF NOT EXISTS entries "
+                    "(fingerprint TEXT PRIMARY KEY, entry BLOB, size INTEGER, used REAL)"
+                )
+
+    def close(self):
+        """Closes the database, entries in memory can still be used."""
+        if self._database is not None:
+            self._database.close()
+            self._database = None
+
+    def clear(self):
+        """Forgets every entry, including those in the database."""
+        self._entries.clear()
+        if self._database is not None:
+            with self._database:
+                self._database.execute("DELETE FROM entries")
+
+    def _get(self, key: str) -> _CacheEntry:
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+            return entry
+        if self._database is None:
+            return _CacheEntry()
+        with self._database:
+            row = self._database.execute(
+                "SELECT entry FROM entries WHERE fingerprint = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return _CacheEntry()
+            self._database.execute(
+                "UPDATE entries SET used = ? WHERE fingerprint = ?",
+                (_time(), key),
+            )
+        entry = _CacheEntry(*_pickle.loads(row[0]))
+        self._remember(key, entry)
+        return entry
+
+    def _remember(self, key: str, entry: _CacheEntry):
+        """Keeps an entry in memory, forgetting the least recently used if there are too many."""
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _put(self, key: str, entry: _CacheEntry):
+        self._remember(key, entry)
+        if self._database is None:
+            return
+        try:
+            blob = _pickle.dumps(tuple(entry))
+        except (_pickle.PicklingError, AttributeError, TypeError):
+            return
+        with self._database:
+            self._database.execute(
+                "INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?)",
+                (key, blob, len(blob), _time()),
+            )
+            # Remove the least recently used entries until the rest fit.
+            total = self._database.execute(
+                "SELECT COALESCE(SUM(size), 0) FROM entries"
+            ).fetchone()[0]
+            for evicted, size in self._database.execute(
+                "SELECT fingerprint, size FROM entries ORDER BY used"
+            ).fetchall():
+                if total <= self.max_bytes:
+                    break
+                self._database.execute(
+                    "DELETE FROM entries WHERE fingerprint = ?", (evicted,)
+                )
+                total -= size
+
+    def solve(
+        self,
+        domains: DomainsType,
+        constraints: List[Constraint] = [],
+        **options,
+    ) -> SolutionGenerator:
+        """
+            A generator function that yields the same solutions as :py:func:`amp_constraint_solver.constraint_solver.solve`,
+            reusing those found by an earlier call for the same problem.
+
+            :param domains: A dict of variable names to lists of possible assignments, :py:class:`amp_constraint_solver.constraint_solver.DomainsType`.
+            :param constraints: A list of :py:class:`amp_constraint_solver.constraint_solver.Constraint` functions to check possible solutions.
+            :param options: Keyword arguments passed on to :py:func:`amp_constraint_solver.constraint_solver.solve`.
+            :returns: A generator of solutions. :py:data:`amp_constraint_solver.constraint_solver.SolutionGenerator`
+            :raise ValueError: Invalid domains or constraints, or a constraint that can't be identified.
+        """
+        if any(options.get(name) is not None for name in _UNCACHED_OPTIONS):
+            yield from solve(domains, constraints, **options)
+            return
+        key = fingerprint(domains, constraints)
+        order = _order_key(domains, options)
+        as_tuples = options.pop("as_tuples", False)
+        sorted_function = options.get("sorted_function", sorted)
+        variables = list(sorted_function(domains.keys()))
+        entry = self._get(key)
+        if entry.solution_count == 0 or entry.satisfiable is False:
+            self.hits += 1
+            return
+        found: List[Any] = []
+        solutions: Iterator[Any]
+        if entry.order == order:
+            self.hits += 1
+            found = list(entry.solutions)
+            for values in found:
+                yield values if as_tuples else dict(zip(variables, values))
+            if entry.complete:
+                return
+            # Only the first solutions were kept, the search for the rest starts again.
+            solutions = _islice(
+                solve(domains, constraints, as_tuples=True, **options),
+                len(found),
+                None,
+            )
+        else:
+            self.misses += 1
+            solutions = solve(domains, constraints, as_tuples=True, **options)
+        total = len(found)
+        complete = False
+        try:
+            for values in solutions:
+                total += 1
+                if len(found) < self.keep:
+                    found.append(values)
+                yield values if as_tuples else dict(zip(variables, values))
+            complete = True
+        finally:
+            entry = self._get(key)
+            updated = entry
+            if complete:
+                updated = updated._replace(
+                    solution_count=total, satisfiable=total > 0
+                )
+            elif found:
+                updated = updated._replace(satisfiable=True)
+            if found and (
+                entry.order != order or len(found) > len(entry.solutions)
+            ):
+                updated = updated._replace(
+                    order=order,
+                    solutions=tuple(found),
+                    complete=complete and total == len(found),
+                )
+            if updated != entry:
+                self._put(key, updated)
+
+    def count_solutions(
+        self,
+        domains: DomainsType,
+        constraints: List[Constraint] = [],
+        **options,
+    ) -> int:
+        """
+            Counts the solutions to a problem as :py:func:`amp_constraint_solver.constraint_solver.count_solutions` does,
+            reusing the count found by an earlier call for the same problem.
+
+            :param domains: A dict of variable names to lists of possible assignments, :py:class:`amp_constraint_solver.constraint_solver.DomainsType`.
+            :param constraints: A list of :py:class:`amp_constraint_solver.constraint_solver.Constraint` functions to check possible solutions.
+            :param options: Keyword arguments passed on to :py:func:`amp_constraint_solver.constraint_solver.count_solutions`.
+            :returns: The number of solutions.
+            :raise ValueError: Invalid domains or constraints, or a constraint that can't be identified.
+        """
+        if any(options.get(name) is not None for name in _UNCACHED_OPTIONS):
+            return count_solutions(domains, constraints, **options)
+        key = fingerprint(domains, constraints)
+        entry = self._get(key)
+        if entry.solution_count is not None or entry.satisfiable is False:
+            self.hits += 1
+            return entry.solution_count or 0
+        self.misses += 1
+        count = count_solutions(domains, constraints, **options)
+        self._put(
+            key, entry._replace(solution_count=count, satisfiable=count > 0)
+        )
+        return count
+
+    def is_satisfiable(
+        self,
+        domains: DomainsType,
+        constraints: List[Constraint] = [],
+        **options,
+    ) -> bool:
+        """
+            Checks whether a problem has any solutions as :py:func:`amp_constraint_solver.constraint_solver.is_satisfiable` does,
+            reusing the answer found by an earlier call for the same problem.
+
+            :param domains: A dict of variable names to lists of possible assignments, :py:class:`amp_constraint_solver.constraint_solver.DomainsType`.
+            :param constraints: A list of :py:class:`amp_constraint_solver.constraint_solver.Constraint` functions to check possible solutions.
+            :param options: Keyword arguments passed on to :py:func:`amp_constraint_solver.constraint_solver.is_satisfiable`.
+            :returns: Whether there's a solution.
+            :raise ValueError: Invalid domains or constraints, or a constraint that can't be identified.
+        """
+        if any(options.get(name) is not None for name in _UNCACHED_OPTIONS):
+            return is_satisfiable(domains, constraints, **options)
+        key = fingerprint(domains, constraints)
+        entry = self._get(key)
+        if entry.satisfiable is not None:
+            self.hits += 1
+            return entry.satisfiable
+        self.misses += 1
+        satisfiable = is_satisfiable(domains, constraints, **options)
+        self._put(key, entry._replace(satisfiable=satisfiable))
+        return satisfiable
@@ -26,7 +26,9 @@ Glossary:
 
 .. py:class:: Domain
 
-   Type annotation for a list of values that can be assigned to a variable.
+   Type annotation for a list of values that can be assigned to a variable. Ascending ranges of
+   ints and :py:class:`amp_constraint_solver.domains.Intervals` can be used instead of a list,
+   and their values are only generated as the search needs them.
 
 .. py:class:: DomainsType
 
@@ -45,7 +47,25 @@ Glossary:
 .. py:class:: SolutionGenerator
 
    The type returned by `solve`, It's a generator of dicts that map variables to values
-   (a generator of SolutionType.).
+   (a generator of SolutionType.), or of tuples of values when solving ``as_tuples``.
+
+.. py:class:: VariableOrdering
+
+   Type annotation for a function that takes a :py:class:`SearchState` and a list of the
+   unassigned variables, and returns the variable to assign next.
+   See :py:mod:`amp_constraint_solver.heuristics`.
+
+.. py:class:: ValueOrdering
+
+   Type annotation for a function that takes a :py:class:`SearchState` and a variable,
+   and returns the values left in the variable's domain in the order they should be tried.
+   See :py:mod:`amp_constraint_solver.heuristics`.
+
+.. py:class:: BatchConstraint
+
+   Type annotation for a function that takes the assignment of a :py:class:`Constraint`'s other variables,
+   a variable and a NumPy array of values for it, and returns an array of bools, true for each value
+   that satisfies the constraint. See :py:func:`scoped`.
 
 """
 from typing import (
@@ -57,114 +77,1986 @@ from typing import (
     Callable,
     Generator,
     Any,
+    NamedTuple,
+    Optional,
+    Tuple,
+    Iterable,
+    Iterator,
+    Sequence,
+    Union,
 )
-from inspect import getfullargspec as _getfullargspec
+from inspect import Parameter as _Parameter, signature as _signature
+from operator import itemgetter as _itemgetter
+from collections import deque as _deque, OrderedDict as _OrderedDict
+from time import perf_counter as _perf_counter
+import sys as _sys
+import tracemalloc as _tracemalloc
+from .domains import (
+    BitsetDomain,
+    IntervalDomain,
+    Intervals,
+    _popcount,
+    _numpy,
+)
+
+try:
+    import resource as _resource
+except ImportError:  # Only available on Unix.
+    _resource = None  # type: ignore
 
 
 __all__ = [
     "solve",
+    "count_solutions",
+    "is_satisfiable",
+    "scoped",
     "ValueType",
     "Domain",
     "DomainsType",
     "SolutionsType",
     "Constraint",
     "SolutionGenerator",
+    "SearchState",
+    "SearchHooks",
+    "SearchStatistics",
+    "ConstraintStatistics",
+    "SearchLimits",
+    "SearchLimitExceeded",
+    "SearchCheckpoint",
+    "VariableOrdering",
+    "ValueOrdering",
+    "BatchConstraint",
 ]
 
 
 ## Types
 ValueType = TypeVar("ValueType")
-Domain = List[ValueType,]
+Domain = Union[List[ValueType,], range, Intervals]
 DomainsType = Dict[str, Domain]
 SolutionsType = Dict[str, ValueType]
 Constraint = Callable[..., bool]
-SolutionGenerator = Generator[SolutionsType, None, None]
+SolutionGenerator = Generator[Union[SolutionsType, Tuple], None, None]
+VariableOrdering = Callable[["SearchState", List[str]], str]
+ValueOrdering = Callable[["SearchState", str], Iterable[ValueType]]
+BatchConstraint = Callable[[SolutionsType, str, Any], Any]
 
 
 def _validate_domain(domain: Domain):
-    """Function that checks if a list is a valid domain."""
+    """Function that checks if a list, range or :py:class:`amp_constraint_solver.domains.Intervals` is a valid domain.
+       Ranges and intervals can't repeat values, so only lists are checked for them."""
+    if isinstance(domain, (range, Intervals)):
+        if not len(domain) > 0:
+            raise ValueError("Domains cannot be empty.")
+        return
     if not isinstance(domain, list):
-        raise ValueError(f"Domain must be a list, not { type(domain) }.")
+        raise ValueError(
+            f"Domain must be a list, range or Intervals, not { type(domain) }."
+        )
     if not len(domain) == len(set(domain)):
         raise ValueError(f"Values in domain should be unique. { domain }")
     if not len(domain) > 0:
         raise ValueError("Domains cannot be empty.")
 
 
+def _constraint_parameters(constraint: Constraint) -> Tuple[List[str], bool]:
+    """Inspects the parameters a constraint is called with, leaving out ``self`` for methods
+       and callable objects, and those bound by :py:func:`functools.partial`.
+
+       :returns: The names of the positional parameters, and whether it takes ``**kwargs``.
+    """
+    args = []
+    takes_kwargs = False
+    for parameter in _signature(constraint).parameters.values():
+        if parameter.kind in (
+            _Parameter.POSITIONAL_ONLY,
+            _Parameter.POSITIONAL_OR_KEYWORD,
+        ):
+            args.append(parameter.name)
+        elif parameter.kind == _Parameter.VAR_KEYWORD:
+            takes_kwargs = True
+    return args, takes_kwargs
+
+
 def _validate_constraint(constraint: Constraint, domains: DomainsType):
     """Function that checks if a constraint is valid."""
     if not callable(constraint):
         raise ValueError(f"Constrints must be callable, {constraint}")
-    argspec = _getfullargspec(constraint)
-    for arg in argspec.args:
+    args, _ = _constraint_parameters(constraint)
+    for arg in args + list(getattr(constraint, "scope", ())):
         if not arg in domains.keys():
             raise ValueError(f"{arg} is not a known variable.")
 
 
-def _validate_domains_and_constraints(
-    domains: DomainsType, constraints: List[Constraint]
-):
-    """A function to assert that a group of domains and constraints are valid."""
-    # Assert domains are valid.
+def _validate_domains(domains: DomainsType):
+    """A function to assert that a dict of domains is valid."""
     if not isinstance(domains, Dict):
         raise ValueError("The domains arg must be a dict of str to list.")
     if not len(domains.items()) > 0:
         raise ValueError("Domains dictionary cannot be empty.")
     for domain_to_check in domains.values():
         _validate_domain(domain_to_check)
+
+
+def _validate_domains_and_constraints(
+    domains: DomainsType, constraints: List[Constraint]
+):
+    """A function to assert that a group of domains and constraints are valid."""
+    # Assert domains are valid.
+    _validate_domains(domains)
     # Assert constraints are valid
     for constraint_to_check in constraints:
         _validate_constraint(constraint_to_check, domains)
 
 
+def scoped(
+    *variables: str, partial: bool = False, batch: BatchConstraint = None
+) -> Callable[[Constraint], Constraint]:
+    """A decorator that declares which variables a constraint taking ``**kwargs`` reads.
+
+       Constraints that glob ``**kwargs`` are otherwise assumed to depend on every variable,
+       so they're re-checked with all assigned variables each time a variable is assigned.
+       A scoped constraint is checked once, with only its scope, when its last variable is assigned.
+
+       >>> from amp_constraint_solver import solve, scoped
+       >>> @scoped("a", "b")
+       ... def a_less_than_b(**variables):
+       ...     return variables["a"] < variables["b"]
+       ...
+       >>> list(solve({"a": [1, 2], "b": [1, 2], "c": [3]}, [a_less_than_b]))
+       [{'a': 1, 'b': 2, 'c': 3}]
+
+       A ``partial`` constraint can reject a partial solution before all of its scope is assigned,
+       so it's checked each time a variable in its scope is assigned, with the variables of its
+       scope that have been assigned so far.
+
+       Constraints can also be objects with ``scope`` and ``partial`` attributes,
+       and a ``propagate`` method that reduces domains, like
+       :py:class:`amp_constraint_solver.builtin_constraints.AllDifferent`.
+       When a propagation mode is chosen, ``propagate(state)`` is called with the
+       :py:class:`SearchState` instead of reducing domains by calling the constraint.
+       It should reduce domains with :py:meth:`SearchState.restrict`, and return False
+       if the partial solution can't satisfy the constraint.
+
+       If NumPy is installed, a constraint that isn't ``partial`` can also have a ``batch`` form,
+       a :py:class:`BatchConstraint` that checks every value left for the last variable of
+       its scope in one call. It's used to filter the domain of that variable as it's chosen,
+       or when forward checking, instead of calling the constraint once per value. It's only
+       used when the values left are bools or numbers, other domains are checked a value at a time.
+
+       >>> @scoped("a", "b", batch=lambda assignment, var, values: values != assignment["b" if var == "a" else "a"])
+       ... def a_not_b(**variables):
+       ...     return variables["a"] != variables["b"]
+       ...
+       >>> list(solve({"a": [1, 2], "b": [1, 2]}, [a_not_b]))
+       [{'a': 1, 'b': 2}, {'a': 2, 'b': 1}]
+
+       :param variables: The names of the variables the constraint reads.
+       :param partial: Whether the constraint can check a partial assignment of its scope.
+       :param batch: A :py:class:`BatchConstraint` that checks many values of one variable at once.
+       :returns: A decorator that sets the ``scope``, ``partial`` and ``batch`` attributes of a :py:class:`Constraint`.
+    """
+
+    def decorate(constraint: Any) -> Constraint:
+        constraint.scope = tuple(variables)
+        constraint.partial = partial
+        if batch is not None:
+            constraint.batch = batch
+        return constraint
+
+    return decorate
+
+
+class _CompiledConstraint(NamedTuple):
+    """A constraint with its calling convention resolved ahead of the search.
+
+       ``scope`` is None for constraints that glob all assigned variables as kwargs.
+       ``index`` is the constraint's position in the plan.
+    """
+
+    # Shadows tuple.index, which compiled constraints don't use.
+    index: int  # type: ignore
+    constraint: Constraint
+    args: Tuple[str, ...]
+    takes_kwargs: bool
+    scope: Optional[Tuple[str, ...]]
+    partial: bool
+    propagate: Optional[Callable[["SearchState"], bool]]
+    call: Callable[[SolutionsType], bool]
+    batch: Optional["BatchConstraint"]
+
+
+class _Plan(NamedTuple):
+    """The compiled form of a problem, built once per call to :py:func:`solve`.
+
+       ``checks[depth]`` holds the constraints to check when ``variables[depth]`` is assigned,
+       ``propagation_checks[depth]`` only the ones propagation doesn't cover.
+       Without propagation, ``batch_checks[depth]`` holds the constraints with a batch form
+       completed at a depth, which filter the domain of ``variables[depth]`` instead of being checked.
+       ``watchers`` maps each variable to the scoped constraints that read it.
+    """
+
+    variables: Tuple[str, ...]
+    constraints: List[_CompiledConstraint]
+    checks: List[List[_CompiledConstraint]]
+    propagation_checks: List[List[_CompiledConstraint]]
+    batch_checks: List[List[_CompiledConstraint]]
+    watchers: Dict[str, List[_CompiledConstraint]]
+
+
+def _make_call_shim(
+    constraint: Constraint,
+    args: Tuple[str, ...],
+    takes_kwargs: bool,
+    scope: Optional[Tuple[str, ...]],
+    partial: bool,
+) -> Callable[[SolutionsType], bool]:
+    """Builds a function that calls a constraint with a (partial) solution."""
+    if takes_kwargs and partial and scope is not None:
+        optional = tuple(var for var in scope if var not in args)
+
+        def call_partial(variables: SolutionsType) -> bool:
+            return constraint(
+                *[variables[arg] for arg in args],
+                **{
+                    key: variables[key]
+                    for key in optional
+                    if key in variables
+                },
+            )
+
+        return call_partial
+    if takes_kwargs and scope is not None:
+        keywords = tuple(var for var in scope if var not in args)
+
+        def call_scoped(variables: SolutionsType) -> bool:
+            return constraint(
+                *[variables[arg] for arg in args],
+                **{key: variables[key] for key in keywords},
+            )
+
+        return call_scoped
+    if takes_kwargs:
+        if not args:
+            return lambda variables: constraint(**variables)
+        named = frozenset(args)
+
+        def call(variables: SolutionsType) -> bool:
+            # Supply all variables not already passed positionally as kwargs.
+            return constraint(
+                *[variables[arg] for arg in args],
+                **{
+                    key: value
+                    for key, value in variables.items()
+                    if key not in named
+                },
+            )
+
+        return call
+    if not args:
+        return lambda variables: constraint()
+    if len(args) == 1:
+        (arg,) = args
+        return lambda variables: constraint(variables[arg])
+    getter = _itemgetter(*args)
+    return lambda variables: constraint(*getter(variables))
+
+
+def _compile_constraint(
+    constraint: Constraint, index: int = 0
+) -> _CompiledConstraint:
+    """Inspects a constraint once so it can be called cheaply during the search."""
+    parameters, takes_kwargs = _constraint_parameters(constraint)
+    args = tuple(parameters)
+    declared = getattr(constraint, "scope", None)
+    scope: Optional[Tuple[str, ...]]
+    if declared is not None:
+        scope = args + tuple(var for var in declared if var not in args)
+    elif takes_kwargs:
+        scope = None
+    else:
+        scope = args
+    partial = scope is not None and bool(getattr(constraint, "partial", False))
+    return _CompiledConstraint(
+        index,
+        constraint,
+        args,
+        takes_kwargs,
+        scope,
+        partial,
+        getattr(constraint, "propagate", None) if scope is not None else None,
+        _make_call_shim(constraint, args, takes_kwargs, scope, partial),
+        # Batch forms need NumPy, and all but one variable of the scope assigned.
+        getattr(constraint, "batch", None)
+        if scope and not partial and _numpy is not None
+        else None,
+    )
+
+
+def _time_constraint(
+    compiled: _CompiledConstraint, record: "ConstraintStatistics"
+) -> _CompiledConstraint:
+    """Wraps a compiled constraint's call shim and propagator to count and time their calls."""
+    call = compiled.call
+    propagate = compiled.propagate
+    batch = compiled.batch
+
+    def timed_call(variables: SolutionsType) -> bool:
+        start = _perf_counter()
+        try:
+            return call(variables)
+        finally:
+            record.seconds += _perf_counter() - start
+            record.calls += 1
+
+    def timed_propagate(state: "SearchState") -> bool:
+        # Only used when the constraint has a propagator.
+        assert propagate is not None
+        start = _perf_counter()
+        try:
+            return propagate(state)
+        finally:
+            record.seconds += _perf_counter() - start
+            record.propagations += 1
+
+    def timed_batch(assignment: SolutionsType, var: str, values: Any) -> Any:
+        assert batch is not None
+        start = _perf_counter()
+        try:
+            return batch(assignment, var, values)
+        finally:
+            record.seconds += _perf_counter() - start
+            record.calls += 1
+
+    return compiled._replace(
+        call=timed_call,
+        propagate=None if propagate is None else timed_propagate,
+        batch=None if batch is None else timed_batch,
+    )
+
+
+def _compile_plan(
+    variables: List[str],
+    constraints: List[Constraint],
+    statistics: Iterable["SearchStatistics"] = (),
+    positions: Sequence[int] = None,
+) -> _Plan:
+    """Orders the variables and indexes each constraint by the depth its scope is fully bound at.
+
+       :param positions: The position of each constraint in the whole problem, for the records
+           of ``statistics``, when the constraints are a component of it.
+    """
+    depth_of = {var: depth for depth, var in enumerate(variables)}
+    compiled_constraints = [
+        _compile_constraint(constraint, index)
+        for index, constraint in enumerate(constraints)
+    ]
+    for counter in statistics:
+        compiled_constraints = [
+            _time_constraint(
+                compiled,
+                counter.record_of(
+                    compiled
+                    if positions is None
+                    else compiled._replace(index=positions[compiled.index])
+                ),
+            )
+            for compiled in compiled_constraints
+        ]
+    checks: List[List[_CompiledConstraint]] = [[] for _ in variables]
+    propagation_checks: List[List[_CompiledConstraint]] = [
+        [] for _ in variables
+    ]
+    batch_checks: List[List[_CompiledConstraint]] = [[] for _ in variables]
+    watchers: Dict[str, List[_CompiledConstraint]] = {
+        var: [] for var in variables
+    }
+    for compiled in compiled_constraints:
+        reads = compiled.args if compiled.scope is None else compiled.scope
+        bound_at = max((depth_of[var] for var in reads), default=0)
+        if compiled.scope is None:
+            # The kwargs of an unscoped constraint grow with each assignment,
+            # so it's re-checked at every depth once its named args are bound.
+            for depth in range(bound_at, len(variables)):
+                checks[depth].append(compiled)
+                propagation_checks[depth].append(compiled)
+            continue
+        for var in compiled.scope:
+            watchers[var].append(compiled)
+        if compiled.batch is not None:
+            batch_checks[bound_at].append(compiled)
+            continue
+        if not compiled.partial:
+            checks[bound_at].append(compiled)
+            continue
+        # Partial constraints are re-checked as each variable in their scope is assigned.
+        named_at = max((depth_of[var] for var in compiled.args), default=0)
+        for depth in sorted(set(depth_of[var] for var in compiled.scope)):
+            if depth >= named_at:
+                checks[depth].append(compiled)
+                if compiled.propagate is None:
+                    propagation_checks[depth].append(compiled)
+    return _Plan(
+        tuple(variables),
+        compiled_constraints,
+        checks,
+        propagation_checks,
+        batch_checks,
+        watchers,
+    )
+
+
 def _check_constraints(
-    variables: SolutionsType, constraints: List[Constraint]
+    variables: SolutionsType, constraints: List[_CompiledConstraint]
 ) -> bool:
-    """Function to check that a list of solution constraint checks are satisfied by a solution."""
-    for constraint in constraints:
-        # Inspect the function
-        argspec = _getfullargspec(constraint)
+    """Function to check that a list of compiled constraints, whose variables are all assigned, are satisfied by a solution."""
+    for compiled in constraints:
+        # Call the constraint and return false only if the check fails.
+        if not compiled.call(variables):
+            return False
+
+    return True
+
+
+_PROPAGATION_MODES = (None, "forward_checking", "arc_consistency")
+
+# The fewest values a batch form is called with, calling NumPy costs about as much as
+# calling a constraint for each of a few values.
+_BATCH_MIN_VALUES = 8
+
+# The kinds of NumPy arrays batch forms are called with, bools and numbers. Other values, like
+# mixes of strings and ints that NumPy would turn into strings, are checked one at a time.
+_BATCH_KINDS = "biufc"
+
+# The most values of a range or interval domain a batch form is called with at once.
+_BATCH_CHUNK_SIZE = 65536
+
 
-        # Build a list of positional args that match variable names
-        args = (
-            [variables[arg] for arg in argspec.args if arg in variables]
-            if argspec.args
-            else []
+def _codec_for(domain: Domain) -> Any:
+    """The codec for the masks of a domain, ascending ranges and intervals are never listed."""
+    if isinstance(domain, Intervals) or (
+        isinstance(domain, range) and domain.step > 0
+    ):
+        return IntervalDomain(domain)
+    return BitsetDomain(domain)
+
+
+class SearchState:
+    """The mutable state of one search, passed to :py:class:`VariableOrdering` and
+       :py:class:`ValueOrdering` heuristics.
+
+       Heuristics may read :py:attr:`variables` (every variable, in the order given by
+       ``sorted_function``), :py:attr:`assignment` (the partial solution) and :py:attr:`weights`
+       (how many times each constraint has caused a failure, starting at 1), and call the methods below.
+       They must not modify any of them, or the lists returned by :py:meth:`domain`.
+
+       The values left for each variable are kept as a mask of a
+       :py:class:`amp_constraint_solver.domains.BitsetDomain`, or of an
+       :py:class:`amp_constraint_solver.domains.IntervalDomain` for range and interval domains.
+       Replaced masks are kept on a trail so reductions can be undone on backtrack.
+    """
+
+    def __init__(
+        self,
+        plan: _Plan,
+        domains: DomainsType,
+        propagation: Optional[str] = None,
+        variable_ordering: VariableOrdering = None,
+        value_ordering: ValueOrdering = None,
+    ):
+        self.plan = plan
+        self.variables = plan.variables
+        self.propagation = propagation
+        self.variable_ordering = variable_ordering
+        self.value_ordering = value_ordering
+        self._codecs = {
+            var: _codec_for(domains[var]) for var in plan.variables
+        }
+        self._masks = {var: codec.full for var, codec in self._codecs.items()}
+        self.assignment: SolutionsType = dict()
+        self.weights = [1] * len(plan.constraints)
+        self.trail: List[Tuple[str, Any]] = []
+        self.checks = (
+            plan.checks if propagation is None else plan.propagation_checks
         )
+        # Without propagation, constraints with batch forms filter domains as variables are bound.
+        self._batch_checks = (
+            plan.batch_checks
+            if propagation is None and any(plan.batch_checks)
+            else None
+        )
+        # Variables whose domains were reduced by restrict, for _propagate to re-queue.
+        self._reduced: List[str] = []
+        self._unscoped = [c for c in plan.constraints if c.scope is None]
+        # The number of unbound variables in the scope of each constraint.
+        self._unbound = [
+            len(c.scope) if c.scope is not None else 0 for c in plan.constraints
+        ]
+        # The number of scoped constraints with unbound variables.
+        self._open = sum(1 for unbound in self._unbound if unbound)
+        # Whether to explain failures, for conflict-directed backjumping.
+        self._explain = False
+        # When explaining, why each entry on the trail was added,
+        # as the constraint used and the number of variables assigned at the time.
+        self._reasons: List[Tuple[Optional[_CompiledConstraint], int]] = []
+        # When explaining, the assigned variables that caused the last failure.
+        self._conflict: Set[str] = set()
+        self._nogood_limit = 0
+        # Nogoods learnt by earlier searches of the problem, for a backjumping search to start with.
+        self._nogoods: Optional["_NogoodStore"] = None
+        # Set by hooks to make the search yield 0, handing back control.
+        self._pause = False
+
+    def domain(self, var: str) -> Domain:
+        """The values left in a variable's domain, in their original order.
+           For range and interval domains they're a range or
+           :py:class:`amp_constraint_solver.domains.Intervals`, not a list."""
+        return self._codecs[var].values_of(self._masks[var])
 
-        # If the function globs **kwargs, supply all variables not already passed as kwargs.
-        all_vars = dict(
-            [
-                (key, value)
-                for key, value in variables.items()
-                if key not in argspec.args
-            ]
-            if argspec.varkw is not None
-            else {}
+    def _size(self, var: str, mask: Any) -> int:
+        """The number of values in a mask of a variable's domain."""
+        return (
+            _popcount(mask)
+            if type(mask) is int
+            else self._codecs[var].size(mask)
         )
 
-        if len(args) < len(argspec.args):
-            # Not all needed variables are assigned a value yet.
-            continue
+    def domain_size(self, var: str) -> int:
+        """The number of values left in a variable's domain."""
+        mask = self._masks[var]
+        if type(mask) is int:
+            return _popcount(mask)
+        return self._codecs[var].size(mask)
 
-        # Call the constraint and return false only if the check fails.
-        if not constraint(*args, **all_vars):
+    def bounds(self, var: str) -> Tuple[Any, Any]:
+        """The smallest and largest values left in a variable's domain."""
+        return self._codecs[var].bounds(self._masks[var])
+
+    def degree(self, var: str) -> int:
+        """The number of scoped constraints between a variable and other unassigned variables."""
+        unbound = self._unbound
+        return sum(
+            1 for c in self.plan.watchers[var] if unbound[c.index] > 1
+        )
+
+    def weighted_degree(self, var: str) -> int:
+        """Like :py:meth:`degree`, but each constraint counts its :py:attr:`weights`."""
+        unbound = self._unbound
+        weights = self.weights
+        return sum(
+            weights[c.index]
+            for c in self.plan.watchers[var]
+            if unbound[c.index] > 1
+        )
+
+    def count_conflicts(self, var: str, value: ValueType) -> int:
+        """The number of values that assigning a value to an unassigned variable would rule out
+           for the other unassigned variables, checking each scoped constraint that would have one
+           variable left unassigned."""
+        assignment = self.assignment
+        masks = self._masks
+        assignment[var] = value
+        conflicts = 0
+        for compiled in self.plan.watchers[var]:
+            scope = compiled.args if compiled.scope is None else compiled.scope
+            others = [o for o in scope if o not in assignment]
+            if len(others) == 1:
+                (other,) = others
+                conflicts += self._size(other, masks[other]) - self._size(
+                    other, self._revise(compiled, other)
+                )
+        del assignment[var]
+        return conflicts
+
+    def solution(self) -> SolutionsType:
+        """A copy of the complete assignment, with the variables in their sorted order."""
+        if self.variable_ordering is None:
+            return dict(self.assignment)
+        assignment = self.assignment
+        return {var: assignment[var] for var in self.variables}
+
+    def solution_tuple(self) -> Tuple:
+        """The values of the complete assignment, in the sorted order of the variables."""
+        assignment = self.assignment
+        return tuple([assignment[var] for var in self.variables])
+
+    def unconstrained_combinations(self) -> int:
+        """How many ways the unassigned variables can be assigned, if no constraint reads them.
+
+           :returns: The product of the unassigned variables' domain sizes, or 0 if any constraint
+               still has unassigned variables, or if there are unscoped constraints.
+        """
+        if self._open or self._unscoped:
+            return 0
+        combinations = 1
+        assignment = self.assignment
+        for var in self.variables:
+            if var not in assignment:
+                combinations *= self.domain_size(var)
+        return combinations
+
+    def undo(self, mark: int):
+        """Restores the domains reduced since the trail was ``mark`` long."""
+        trail = self.trail
+        masks = self._masks
+        while len(trail) > mark:
+            var, mask = trail.pop()
+            masks[var] = mask
+        if self._explain:
+            del self._reasons[mark:]
+
+    def _narrow(
+        self, var: str, mask: Any, reason: _CompiledConstraint = None
+    ) -> bool:
+        """Replaces the mask of a variable with a subset of it, returning False if it's empty.
+
+           :param reason: The constraint that forward checking narrowed the domain with,
+               or None if the reduction could depend on any assigned variable.
+        """
+        if mask == self._masks[var]:
+            return True
+        if not mask:
             return False
+        self.trail.append((var, self._masks[var]))
+        self._masks[var] = mask
+        self._reduced.append(var)
+        if self._explain:
+            self._reasons.append((reason, len(self.assignment)))
+        return True
 
-    return True
+    def _pruning_conflict(self, var: str) -> Set[str]:
+        """The assigned variables whose values caused values to be removed from an unassigned variable's domain."""
+        culprits: Set[str] = set()
+        assigned: Optional[List[str]] = None
+        for (narrowed, _), (reason, assigned_count) in zip(
+            self.trail, self._reasons
+        ):
+            if narrowed != var:
+                continue
+            if reason is not None:
+                culprits.update(
+                    reason.args if reason.scope is None else reason.scope
+                )
+            elif assigned_count:
+                if assigned is None:
+                    # Variables are assigned and unassigned in stack order,
+                    # so the assignment's keys start with those assigned at the time.
+                    assigned = list(self.assignment)
+                culprits.update(assigned[:assigned_count])
+        culprits.discard(var)
+        return culprits
+
+    def _wipeout_conflict(
+        self, compiled: _CompiledConstraint, wiped: Optional[str]
+    ) -> Set[str]:
+        """The assigned variables that caused a constraint to wipe out a domain during propagation.
+
+           :param wiped: The variable forward checking wiped out, or None if it isn't known.
+        """
+        if wiped is None:
+            return set(self.assignment)
+        culprits = self._pruning_conflict(wiped)
+        scope = compiled.args if compiled.scope is None else compiled.scope
+        culprits.update(var for var in scope if var != wiped)
+        return culprits
+
+    def _revise(self, compiled: _CompiledConstraint, var: str) -> Any:
+        """Returns the mask of values of ``var`` that satisfy a constraint whose other variables are assigned."""
+        assignment = self.assignment
+        mask = self._masks[var]
+        if type(mask) is not int:
+            return self._revise_intervals(compiled, var, mask)
+        if (
+            compiled.batch is not None
+            and _popcount(mask) >= _BATCH_MIN_VALUES
+        ):
+            positions, values = self._codecs[var].arrays_of(mask)
+            if values.dtype.kind in _BATCH_KINDS:
+                satisfied = _numpy.broadcast_to(
+                    _numpy.asarray(
+                        compiled.batch(assignment, var, values), dtype=bool
+                    ),
+                    values.shape,
+                )
+                for position in positions[~satisfied].tolist():
+                    mask ^= 1 << position
+                return mask
+        call = compiled.call
+        supported = mask
+        for position, value in self._codecs[var].items_of(mask):
+            assignment[var] = value
+            if not call(assignment):
+                supported ^= 1 << position
+        del assignment[var]
+        return supported
+
+    def _revise_intervals(
+        self, compiled: _CompiledConstraint, var: str, mask: Any
+    ) -> Any:
+        """Like :py:meth:`_revise`, for the masks of range and interval domains."""
+        assignment = self.assignment
+        codec = self._codecs[var]
+        call = compiled.call
+        batch = compiled.batch
+        if codec.size(mask) < _BATCH_MIN_VALUES:
+            batch = None
+        unsupported: List[int] = []
+        # The values are checked a chunk at a time, so a huge range is never held as an array.
+        for chunk in codec.chunks_of(mask, _BATCH_CHUNK_SIZE):
+            if batch is not None:
+                positions, values = codec.arrays_of(chunk)
+                if values.dtype.kind in _BATCH_KINDS:
+                    satisfied = _numpy.broadcast_to(
+                        _numpy.asarray(
+                            batch(assignment, var, values), dtype=bool
+                        ),
+                        values.shape,
+                    )
+                    unsupported.extend(positions[~satisfied].tolist())
+                    continue
+            for position, value in codec.items_of(chunk):
+                assignment[var] = value
+                if not call(assignment):
+                    unsupported.append(position)
+            del assignment[var]
+        return codec.without(mask, unsupported)
+
+    def _revise_arc(
+        self, compiled: _CompiledConstraint, var: str, other: str
+    ) -> Any:
+        """Returns the mask of values of ``var`` that have a supporting value of ``other``."""
+        assignment = self.assignment
+        call = compiled.call
+        mask = self._masks[var]
+        if type(mask) is not int:
+            return self._revise_arc_intervals(compiled, var, other, mask)
+        other_values = self.domain(other)
+        supported = mask
+        for position, value in self._codecs[var].items_of(mask):
+            assignment[var] = value
+            for other_value in other_values:
+                assignment[other] = other_value
+                if call(assignment):
+                    break
+            else:
+                supported ^= 1 << position
+        del assignment[var]
+        del assignment[other]
+        return supported
+
+    def _revise_arc_intervals(
+        self, compiled: _CompiledConstraint, var: str, other: str, mask: Any
+    ) -> Any:
+        """Like :py:meth:`_revise_arc`, for the masks of range and interval domains.
+           A batch form checks a chunk of values against each value of ``other`` in turn,
+           until every value of the chunk has a support."""
+        assignment = self.assignment
+        call = compiled.call
+        codec = self._codecs[var]
+        other_values = self.domain(other)
+        unsupported: List[int] = []
+        for chunk in codec.chunks_of(mask, _BATCH_CHUNK_SIZE):
+            if compiled.batch is not None:
+                positions, values = codec.arrays_of(chunk)
+                if values.dtype.kind in _BATCH_KINDS:
+                    left = _numpy.ones(values.shape, dtype=bool)
+                    for other_value in other_values:
+                        assignment[other] = other_value
+                        left &= ~_numpy.asarray(
+                            compiled.batch(assignment, var, values),
+                            dtype=bool,
+                        )
+                        if not left.any():
+                            break
+                    del assignment[other]
+                    unsupported.extend(positions[left].tolist())
+                    continue
+            for position, value in codec.items_of(chunk):
+                assignment[var] = value
+                for other_value in other_values:
+                    assignment[other] = other_value
+                    if call(assignment):
+                        break
+                else:
+                    unsupported.append(position)
+            del assignment[var]
+            del assignment[other]
+        return codec.without(mask, unsupported)
+
+    def restrict(self, var: str, values: Iterable[ValueType]) -> bool:
+        """Reduces the domain of an unassigned variable to some of its values,
+           for use by a constraint's ``propagate`` method.
+
+           :param var: The variable to reduce the domain of.
+           :param values: The values to keep. Values not in the domain are ignored.
+           :returns: False if no values are left, in which case the domain isn't changed.
+        """
+        codec = self._codecs[var]
+        index = codec.index
+        return self._narrow(
+            var,
+            codec.intersect(
+                self._masks[var],
+                codec.mask_of(value for value in values if value in index),
+            ),
+        )
+
+    def restrict_between(self, var: str, low: Any, high: Any) -> bool:
+        """Reduces the domain of an unassigned variable to the values from ``low`` to ``high``
+           inclusive, like :py:meth:`restrict`. For range and interval domains this only looks at
+           the ends of the intervals left, not at each value.
+
+           :param low: The smallest value to keep, or None for no lower bound.
+           :param high: The largest value to keep, or None for no upper bound.
+           :returns: False if no values are left, in which case the domain isn't changed.
+        """
+        return self._narrow(
+            var, self._codecs[var].between(self._masks[var], low, high)
+        )
+
+    def remove(self, var: str, value: ValueType) -> bool:
+        """Removes a value from the domain of an unassigned variable, like :py:meth:`restrict`.
+
+           :returns: False if no values are left, in which case the domain isn't changed.
+        """
+        return self._narrow(
+            var, self._codecs[var].remove(self._masks[var], value)
+        )
+
+    def _propagate(self, queue: List[_CompiledConstraint]) -> bool:
+        """Prunes domains using the queued constraints, returning False if a domain is wiped out.
+
+           Constraints with a ``propagate`` method prune domains themselves.
+           For other constraints, forward checking prunes the last unassigned variable of each
+           queued constraint, and arc consistency also revises pairs of unassigned variables.
+           Arc consistency then re-queues the constraints on any variable whose domain was reduced (AC-3).
+        """
+        plan = self.plan
+        assignment = self.assignment
+        arc_consistency = self.propagation == "arc_consistency"
+        reduced = self._reduced
+        del reduced[:]
+        queued = set(compiled.index for compiled in queue)
+        pending = _deque(queue)
+        while pending:
+            compiled = pending.popleft()
+            queued.discard(compiled.index)
+            wiped = None
+            if compiled.propagate is not None:
+                consistent = compiled.propagate(self)
+            else:
+                scope = (
+                    compiled.args if compiled.scope is None else compiled.scope
+                )
+                unassigned = [var for var in scope if var not in assignment]
+                if len(unassigned) == 1:
+                    wiped = unassigned[0]
+                    consistent = self._narrow(
+                        wiped, self._revise(compiled, wiped), compiled
+                    )
+                elif len(unassigned) == 2 and arc_consistency:
+                    var, other = unassigned
+                    consistent = self._narrow(
+                        var, self._revise_arc(compiled, var, other)
+                    ) and self._narrow(
+                        other, self._revise_arc(compiled, other, var)
+                    )
+                else:
+                    continue
+            if not consistent:
+                if self._explain:
+                    self._conflict = self._wipeout_conflict(compiled, wiped)
+                self.fail(compiled)
+                return False
+            if arc_consistency:
+                for var in reduced:
+                    for watcher in plan.watchers[var]:
+                        if (
+                            watcher.index != compiled.index
+                            and watcher.index not in queued
+                        ):
+                            queued.add(watcher.index)
+                            pending.append(watcher)
+            del reduced[:]
+        return True
+
+    def fail(self, compiled: _CompiledConstraint):
+        """Records that a constraint rejected the partial solution or wiped out a domain."""
+        self.weights[compiled.index] += 1
+
+    def initialise(self) -> bool:
+        """Propagates before any variable is assigned, returning False if the problem has no solution."""
+        if self.propagation is None:
+            return True
+        queue = []
+        for compiled in self.plan.constraints:
+            if compiled.scope is None:
+                continue
+            if not compiled.scope:
+                if not compiled.call(self.assignment):
+                    self.fail(compiled)
+                    return False
+            elif (
+                len(compiled.scope) == 1
+                or compiled.propagate is not None
+                or self.propagation == "arc_consistency"
+            ):
+                queue.append(compiled)
+        return self._propagate(queue)
+
+    def select_variable(self, depth: int) -> str:
+        """Chooses the variable to assign at a depth."""
+        if self.variable_ordering is None:
+            return self.variables[depth]
+        assignment = self.assignment
+        return self.variable_ordering(
+            self, [var for var in self.variables if var not in assignment]
+        )
+
+    def order_values(self, var: str) -> Iterable[Any]:
+        """The values left for a variable, in the order they should be tried."""
+        if self.value_ordering is None:
+            return self.domain(var)
+        return self.value_ordering(self, var)
+
+    def _filter(self, var: str, batch_checks: List[_CompiledConstraint]):
+        """Removes the values of a variable being bound that fail constraints with batch forms.
+           Unlike :py:meth:`_narrow`, the domain can be left empty, so no value is tried."""
+        masks = self._masks
+        for compiled in batch_checks:
+            mask = self._revise(compiled, var)
+            if mask == masks[var]:
+                continue
+            self.trail.append((var, masks[var]))
+            masks[var] = mask
+            if self._explain:
+                self._reasons.append((compiled, len(self.assignment)))
+            if not mask:
+                self.fail(compiled)
+                return
+
+    def bind(self, var: str, depth: int) -> List[_CompiledConstraint]:
+        """Marks a variable as about to be assigned, returning the constraints it completes.
+
+           Constraints with batch forms aren't returned, without propagation they
+           filter the variable's domain here instead.
+        """
+        unbound = self._unbound
+        watchers = self.plan.watchers[var]
+        for compiled in watchers:
+            unbound[compiled.index] -= 1
+            if not unbound[compiled.index]:
+                self._open -= 1
+        if self.variable_ordering is None:
+            if self._batch_checks is not None and self._batch_checks[depth]:
+                self._filter(var, self._batch_checks[depth])
+            return self.checks[depth]
+        # The order is dynamic, so the constraints to check can't be precomputed by depth.
+        assignment = self.assignment
+        propagating = self.propagation is not None
+        checks = []
+        batch_checks = []
+        for compiled in watchers:
+            if compiled.partial:
+                if not (propagating and compiled.propagate) and all(
+                    arg == var or arg in assignment for arg in compiled.args
+                ):
+                    checks.append(compiled)
+            elif not propagating and not unbound[compiled.index]:
+                if compiled.batch is None:
+                    checks.append(compiled)
+                else:
+                    batch_checks.append(compiled)
+        for compiled in self._unscoped:
+            if all(arg == var or arg in assignment for arg in compiled.args):
+                checks.append(compiled)
+        if batch_checks:
+            self._filter(var, batch_checks)
+        return checks
+
+    def unbind(self, var: str):
+        """Reverts :py:meth:`bind` once every value of a variable has been tried."""
+        unbound = self._unbound
+        for compiled in self.plan.watchers[var]:
+            if not unbound[compiled.index]:
+                self._open += 1
+            unbound[compiled.index] += 1
+        self.assignment.pop(var, None)
+
+    def assign(
+        self,
+        var: str,
+        value: ValueType,
+        checks: List[_CompiledConstraint],
+    ) -> bool:
+        """Assigns a value to a variable, returning False if the partial solution can't be extended."""
+        assignment = self.assignment
+        assignment[var] = value
+        for compiled in checks:
+            if not compiled.call(assignment):
+                if self._explain:
+                    self._conflict = (
+                        set(assignment)
+                        if compiled.scope is None
+                        else {v for v in compiled.scope if v in assignment}
+                    )
+                self.fail(compiled)
+                return False
+        if self.propagation is None:
+            return True
+        return self._propagate(self.plan.watchers[var])
+
+
+class SearchHooks:
+    """Callbacks made during a search, see :py:func:`solve`. Subclass it and override the methods needed.
+
+       Hooks are passed the :py:class:`SearchState` of the search, which they must not modify.
+       Searches without hooks don't make these calls, so they cost nothing unless they're used.
+
+       >>> from amp_constraint_solver import solve, SearchHooks
+       >>> class PrintBacktracks(SearchHooks):
+       ...     def on_backtrack(self, state, var):
+       ...         print(f"Tried every value of {var} with {state.assignment}")
+       ...
+       >>> list(solve({'a': [1, 2], 'b': [1, 2]}, [(lambda a, b: a > b),], hooks=PrintBacktracks()))
+       Tried every value of b with {'a': 1}
+       Tried every value of b with {'a': 2}
+       Tried every value of a with {}
+       [{'a': 2, 'b': 1}]
+    """
+
+    def on_start(self, state: SearchState):
+        """Called when a search starts, before any domain is reduced."""
+
+    def on_assign(self, state: SearchState, var: str, value: ValueType):
+        """Called before a value is assigned to a variable and checked."""
+
+    def on_backtrack(self, state: SearchState, var: str):
+        """Called once every value of a variable has been tried and it's been unassigned."""
+
+    def on_solution(self, state: SearchState, count: int):
+        """Called when every variable has been assigned, or when :py:func:`count_solutions` counts
+           ``count`` solutions at once because no constraint reads the unassigned variables."""
+
+    def on_constraint_fail(self, state: SearchState, constraint: Constraint):
+        """Called when a constraint rejects the partial solution, or its propagation wipes out a domain."""
+
+
+class ConstraintStatistics:
+    """The time spent in one constraint, kept by :py:class:`SearchStatistics`.
+
+       :ivar constraint: The constraint.
+       :ivar calls: The number of times the constraint was called, including by propagation.
+       :ivar propagations: The number of times its ``propagate`` method was called.
+       :ivar failures: The number of times it rejected the partial solution or wiped out a domain.
+       :ivar seconds: The time spent in the constraint and its ``propagate`` method.
+    """
+
+    __slots__ = ("constraint", "calls", "propagations", "failures", "seconds")
+
+    def __init__(self, constraint: Constraint):
+        self.constraint = constraint
+        self.calls = 0
+        self.propagations = 0
+        self.failures = 0
+        self.seconds = 0.0
+
+    def __repr__(self) -> str:
+        return (
+            f"ConstraintStatistics({_describe(self.constraint)}, calls={self.calls}, "
+            f"propagations={self.propagations}, failures={self.failures}, seconds={self.seconds:.6f})"
+        )
+
+
+def _describe(constraint: Constraint) -> str:
+    """A readable name for a constraint, eg. to report statistics with."""
+    name = getattr(constraint, "__qualname__", None)
+    return repr(constraint) if name is None else name
+
+
+class SearchStatistics(SearchHooks):
+    """Counts the work done by the searches it's passed to, see :py:func:`solve`.
+
+       Counts add up across searches, so one object can total the work of several.
+       The time spent in each constraint is kept in :py:attr:`constraints`, which
+       makes each constraint call a little slower.
+
+       >>> from amp_constraint_solver import solve, SearchStatistics
+       >>> statistics = SearchStatistics()
+       >>> list(solve({'a': [1, 2], 'b': [1, 2]}, [(lambda a, b: a > b),], statistics=statistics))
+       [{'a': 2, 'b': 1}]
+       >>> statistics.as_dict()
+       {'nodes': 6, 'failures': 3, 'backtracks': 3, 'max_depth': 2, 'constraint_checks': 4, 'solutions': 1}
+       >>> [(record.calls, record.failures) for record in statistics.constraints]
+       [(4, 3)]
+
+       :ivar nodes: The number of values assigned to variables.
+       :ivar failures: The number of times a constraint rejected the partial solution or wiped out a domain.
+       :ivar backtracks: The number of times a variable ran out of values to try.
+       :ivar max_depth: The largest number of variables assigned at once.
+       :ivar constraint_checks: The number of times constraint functions were called,
+           including by propagation.
+       :ivar solutions: The number of solutions found.
+       :ivar constraints: A :py:class:`ConstraintStatistics` for each constraint, in the order they
+           were passed in. Searches reusing the object share them by position.
+    """
+
+    def __init__(self):
+        self.nodes = 0
+        self.failures = 0
+        self.backtracks = 0
+        self.max_depth = 0
+        self.solutions = 0
+        self.constraints: List[ConstraintStatistics] = []
+        # The record of each constraint by id, to count its failures.
+        self._records: Dict[int, ConstraintStatistics] = {}
+
+    def __repr__(self) -> str:
+        return f"SearchStatistics({self.as_dict()})"
+
+    @property
+    def constraint_checks(self) -> int:
+        return sum(record.calls for record in self.constraints)
+
+    def record_of(
+        self, compiled: _CompiledConstraint
+    ) -> ConstraintStatistics:
+        """The :py:class:`ConstraintStatistics` a compiled constraint is timed in."""
+        return self._record(compiled.index, compiled.constraint)
+
+    def _record(
+        self, position: int, constraint: Constraint
+    ) -> ConstraintStatistics:
+        """The record of the constraint at a position in the problem, made if it's new."""
+        # Constraints are recorded in order, so a new one is always next.
+        if position == len(self.constraints):
+            self.constraints.append(ConstraintStatistics(constraint))
+        record = self.constraints[position]
+        record.constraint = constraint
+        self._records[id(constraint)] = record
+        return record
+
+    def slowest(self, count: int = 5) -> List[ConstraintStatistics]:
+        """The constraints the most time was spent in, slowest first."""
+        return sorted(
+            self.constraints, key=lambda record: record.seconds, reverse=True
+        )[:count]
+
+    def as_dict(self) -> Dict[str, int]:
+        """The counts as a dict, eg. to be saved as JSON."""
+        return {
+            "nodes": self.nodes,
+            "failures": self.failures,
+            "backtracks": self.backtracks,
+            "max_depth": self.max_depth,
+            "constraint_checks": self.constraint_checks,
+            "solutions": self.solutions,
+        }
+
+    def on_assign(self, state: SearchState, var: str, value: ValueType):
+        self.nodes += 1
+        depth = len(state.assignment) + (var not in state.assignment)
+        if depth > self.max_depth:
+            self.max_depth = depth
+
+    def on_backtrack(self, state: SearchState, var: str):
+        self.backtracks += 1
+
+    def on_solution(self, state: SearchState, count: int):
+        self.solutions += count
+
+    def on_constraint_fail(self, state: SearchState, constraint: Constraint):
+        self.failures += 1
+        self._records[id(constraint)].failures += 1
+
+
+# How many nodes a SearchLimits counts between checking the slower limits.
+_LIMIT_CHECK_INTERVAL = 64
+
+
+def _memory_used() -> Optional[int]:
+    """The memory used by the process in bytes, or None if it can't be measured.
+
+       That's the memory traced by :py:mod:`tracemalloc` if it's tracing,
+       otherwise the peak resident set size.
+    """
+    if _tracemalloc.is_tracing():
+        return _tracemalloc.get_traced_memory()[0]
+    if _resource is None:
+        return None
+    peak = _resource.getrusage(_resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in kilobytes, except on macOS where it's in bytes.
+    return peak if _sys.platform == "darwin" else peak * 1024
+
+
+class SearchCheckpoint(NamedTuple):
+    """Where a search stopped, to resume it from with :py:func:`solve`.
+
+       Values are stored by their position in their variable's domain, so a checkpoint
+       can be pickled, or saved as JSON with :py:meth:`as_dict`, whatever the values are.
+       The domains pruned along the path aren't stored, resuming re-assigns the path to
+       reduce them again. A checkpoint can only be resumed with the same domains,
+       constraints and options as the search it was made by.
+
+       :ivar variables: Every variable, in the order given by ``sorted_function``.
+       :ivar domain_sizes: The size of each variable's domain, to check it's resumed for the same problem.
+       :ivar path: For each depth of the search, the variable assigned at it, the position of its value,
+           or None at the deepest depth where the next value hadn't been tried yet,
+           and the positions of the values left to try, in order.
+       :ivar weights: The :py:attr:`SearchState.weights` of the constraints, for heuristics that use them.
+    """
+
+    variables: Tuple[str, ...]
+    domain_sizes: Tuple[int, ...]
+    path: Tuple[Tuple[str, Optional[int], Tuple[int, ...]], ...]
+    weights: Tuple[int, ...]
+
+    def as_dict(self) -> Dict[str, Any]:
+        """The checkpoint as a dict of lists, eg. to be saved as JSON."""
+        return {
+            "variables": list(self.variables),
+            "domain_sizes": list(self.domain_sizes),
+            "path": [
+                [var, value, list(left)] for var, value, left in self.path
+            ],
+            "weights": list(self.weights),
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "SearchCheckpoint":
+        """Reads a checkpoint saved with :py:meth:`as_dict`."""
+        return cls(
+            tuple(data["variables"]),
+            tuple(data["domain_sizes"]),
+            tuple(
+                (var, value, tuple(left)) for var, value, left in data["path"]
+            ),
+            tuple(data["weights"]),
+        )
+
+
+class SearchLimitExceeded(Exception):
+    """Raised when a search goes over a limit of its :py:class:`SearchLimits`.
+
+       :ivar limit: The name of the limit, ``"max_nodes"``, ``"max_checks"``, ``"timeout"`` or ``"max_memory"``.
+       :ivar checkpoint: A :py:class:`SearchCheckpoint` to resume the search from, or None
+           if it can't be resumed, eg. because it was counting solutions or decomposed.
+    """
+
+    def __init__(self, limit: str, message: str):
+        super().__init__(message)
+        self.limit = limit
+        self.checkpoint: Optional[SearchCheckpoint] = None
+
+
+class SearchLimits(SearchStatistics):
+    """Stops the searches it's passed to once they've done too much work, see :py:func:`solve`.
+
+       It's a :py:class:`SearchStatistics`, so counts add up across searches, and the limits apply
+       to the totals. The clock starts when the first search does. Once a limit is gone over,
+       :py:class:`SearchLimitExceeded` is raised before the next value is assigned, or with
+       ``quiet`` set :py:func:`solve` just stops yielding solutions and the exception is kept in
+       :py:attr:`exceeded`. Either way the exception has a checkpoint to resume the search from.
+       Constraint checks and memory are only looked at every few nodes, so they can go a little over.
+
+       >>> from amp_constraint_solver import solve, SearchLimits
+       >>> limits = SearchLimits(max_nodes=6, quiet=True)
+       >>> list(solve({'a': [1, 2, 3], 'b': [1, 2, 3]}, [(lambda a, b: a > b),], limits=limits))
+       [{'a': 2, 'b': 1}]
+       >>> list(solve({'a': [1, 2, 3], 'b': [1, 2, 3]}, [(lambda a, b: a > b),],
+       ...            resume=limits.exceeded.checkpoint))
+       [{'a': 3, 'b': 1}, {'a': 3, 'b': 2}]
+
+       :param max_nodes: The most values to assign to variables.
+       :param max_checks: The most times to call constraint functions, including by propagation.
+       :param timeout: The most seconds to search for.
+       :param max_memory: The most bytes of memory the process may use, as traced by
+           :py:mod:`tracemalloc` if it's tracing, otherwise its peak resident set size.
+       :param quiet: Whether :py:func:`solve` should stop instead of raising. Counting and checking
+           satisfiability always raise, as they can't give a partial answer.
+       :ivar exceeded: The :py:class:`SearchLimitExceeded` that quietly stopped a search, or None.
+       :raise ValueError: ``max_memory`` is set but memory use can't be measured.
+    """
+
+    def __init__(
+        self,
+        *,
+        max_nodes: Optional[int] = None,
+        max_checks: Optional[int] = None,
+        timeout: Optional[float] = None,
+        max_memory: Optional[int] = None,
+        quiet: bool = False,
+    ):
+        super().__init__()
+        if max_memory is not None and _memory_used() is None:
+            raise ValueError("Memory use can't be measured on this platform.")
+        self.max_nodes = max_nodes
+        self.max_checks = max_checks
+        self.timeout = timeout
+        self.max_memory = max_memory
+        self.quiet = quiet
+        self.started: Optional[float] = None
+        self.exceeded: Optional[SearchLimitExceeded] = None
+
+    def on_start(self, state: SearchState):
+        if self.started is None:
+            self.started = _perf_counter()
+
+    def on_assign(self, state: SearchState, var: str, value: ValueType):
+        super().on_assign(state, var, value)
+        if self.max_nodes is not None and self.nodes > self.max_nodes:
+            raise SearchLimitExceeded(
+                "max_nodes", f"Assigned more than {self.max_nodes} values."
+            )
+        if (
+            self.timeout is not None
+            and self.started is not None
+            and _perf_counter() - self.started > self.timeout
+        ):
+            raise SearchLimitExceeded(
+                "timeout", f"Searched for more than {self.timeout} seconds."
+            )
+        if self.nodes % _LIMIT_CHECK_INTERVAL:
+            return
+        if (
+            self.max_checks is not None
+            and self.constraint_checks > self.max_checks
+        ):
+            raise SearchLimitExceeded(
+                "max_checks",
+                f"Checked constraints more than {self.max_checks} times.",
+            )
+        if self.max_memory is not None:
+            used = _memory_used()
+            if used is not None and used > self.max_memory:
+                raise SearchLimitExceeded(
+                    "max_memory",
+                    f"Used {used} bytes of memory, more than {self.max_memory}.",
+                )
+
+
+class _HookedSearchState(SearchState):
+    """A :py:class:`SearchState` that makes :py:class:`SearchHooks` calls,
+       so searches without hooks don't pay for them."""
+
+    def __init__(self, hooks: List[SearchHooks], *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.hooks = hooks
+
+    def fail(self, compiled: _CompiledConstraint):
+        super().fail(compiled)
+        for hooks in self.hooks:
+            hooks.on_constraint_fail(self, compiled.constraint)
+
+    def unbind(self, var: str):
+        super().unbind(var)
+        for hooks in self.hooks:
+            hooks.on_backtrack(self, var)
+
+    def assign(
+        self,
+        var: str,
+        value: ValueType,
+        checks: List[_CompiledConstraint],
+    ) -> bool:
+        for hooks in self.hooks:
+            hooks.on_assign(self, var, value)
+        return super().assign(var, value, checks)
+
+
+def _run_search(
+    state: SearchState,
+    multiply: bool = False,
+    checkpoint: SearchCheckpoint = None,
+) -> Generator[int, None, None]:
+    """Runs :py:func:`_search`, or :py:func:`_backjumping_search` if the state explains failures,
+       telling the hooks of a :py:class:`_HookedSearchState` about each solution.
+
+       Once a value has been assigned, or has failed, with :py:attr:`SearchState._pause` set,
+       the search yields 0 and carries on when next asked for a solution.
+    """
+    if state._explain:
+        counts = _backjumping_search(
+            state, multiply, state._nogood_limit, checkpoint
+        )
+    else:
+        counts = _search(state, multiply, checkpoint)
+    if not isinstance(state, _HookedSearchState):
+        return counts
+    return _report_solutions(state, counts)
+
+
+def _report_solutions(
+    state: "_HookedSearchState", counts: Generator[int, None, None]
+) -> Generator[int, None, None]:
+    for count in counts:
+        if count:
+            for hooks in state.hooks:
+                hooks.on_solution(state, count)
+        yield count
+
+
+def _resume_frames(
+    state: SearchState, checkpoint: SearchCheckpoint
+) -> List[Tuple[str, Iterator, List[_CompiledConstraint], int]]:
+    """Re-assigns the path of a checkpoint, returning the frames to carry on searching from.
+
+       The path was consistent when it was saved, so it's assigned without calling hooks.
+    """
+    codecs = state._codecs
+    if (
+        tuple(checkpoint.variables) != tuple(state.variables)
+        or tuple(checkpoint.domain_sizes)
+        != tuple(len(codecs[var].values) for var in state.variables)
+        or len(checkpoint.weights) != len(state.weights)
+    ):
+        raise ValueError("The checkpoint is for a different problem.")
+    state.weights[:] = checkpoint.weights
+    frames = []
+    for depth, (var, position, left) in enumerate(checkpoint.path):
+        values = codecs[var].values
+        checks = state.bind(var, depth)
+        frames.append(
+            (var, iter([values[p] for p in left]), checks, len(state.trail))
+        )
+        if position is not None and not SearchState.assign(
+            state, var, values[position], checks
+        ):
+            raise ValueError(
+                "The checkpoint's path isn't a partial solution of the problem."
+            )
+    return frames
+
+
+def _make_checkpoint(
+    state: SearchState,
+    frames: List[Tuple[str, Iterator, List[_CompiledConstraint], int]],
+    pending: ValueType,
+) -> SearchCheckpoint:
+    """Saves where a search stopped, as it was about to assign ``pending`` to the deepest variable."""
+    assignment = state.assignment
+    path = []
+    for depth, (var, values, _, _) in enumerate(frames):
+        index = state._codecs[var].index
+        left = [index[value] for value in values]
+        if depth == len(frames) - 1:
+            position = None
+            left.insert(0, index[pending])
+        else:
+            position = index[assignment[var]]
+        path.append((var, position, tuple(left)))
+    return SearchCheckpoint(
+        tuple(state.variables),
+        tuple(len(state._codecs[var].values) for var in state.variables),
+        tuple(path),
+        tuple(state.weights),
+    )
+
+
+def _search(
+    state: SearchState,
+    multiply: bool = False,
+    checkpoint: SearchCheckpoint = None,
+) -> Generator[int, None, None]:
+    """A generator that extends the partial solution in ``state`` depth first,
+       yielding each time all variables have been assigned.
+
+       The search keeps its own stack of frames instead of recursing, so a solution is yielded
+       straight to the caller and problems can have more variables than the recursion limit.
+       Each frame holds the variable assigned at that depth, an iterator over the values left to try,
+       the constraints the variable completes and the length of the trail before it was assigned.
+
+       :param multiply: Whether to stop extending a partial solution once no constraint reads
+           the unassigned variables, and yield how many solutions it stands for.
+       :param checkpoint: A :py:class:`SearchCheckpoint` to carry on from, instead of starting afresh.
+       :returns: A generator of the number of solutions each yield stands for, 1 unless ``multiply`` is set.
+    """
+    variable_count = len(state.variables)
+    frames: List[Tuple[str, Iterator, List[_CompiledConstraint], int]] = []
+    if checkpoint is not None:
+        frames = _resume_frames(state, checkpoint)
+    # A resumed search carries on with the next value of its deepest variable.
+    extend = not frames
+    value = None
+    try:
+        while True:
+            if extend:
+                depth = len(frames)
+                combinations = (
+                    state.unconstrained_combinations()
+                    if multiply and depth < variable_count
+                    else 0
+                )
+                if depth == variable_count:
+                    # All variables have been assigned and checked.
+                    yield 1
+                elif combinations:
+                    # The rest of the variables can take any of their values.
+                    yield combinations
+                else:
+                    # Choose the next variable to extend the partial solution with.
+                    current_var = state.select_variable(depth)
+                    # Binding can filter the domain, so values are ordered after it.
+                    checks = state.bind(current_var, depth)
+                    values: Iterator = iter(
+                        state.order_values(current_var)
+                    )
+                    frames.append(
+                        (current_var, values, checks, len(state.trail))
+                    )
+            extend = True
+
+            # Assign the next value of the deepest variable that has one left,
+            # backtracking past variables that have run out of values.
+            while frames:
+                current_var, values, checks, mark = frames[-1]
+                for value in values:
+                    # Values that fail and variables backtracked from can pause the search too.
+                    if state._pause:
+                        state._pause = False
+                        yield 0
+                    state.undo(mark)
+                    if state.assign(current_var, value, checks):
+                        break
+                else:
+                    state.undo(mark)
+                    state.unbind(current_var)
+                    frames.pop()
+                    continue
+                break
+            else:
+                return
+            if state._pause:
+                state._pause = False
+                yield 0
+    except SearchLimitExceeded as exceeded:
+        # Limits are checked before a value is assigned, so it's tried first on resuming.
+        if not multiply:
+            exceeded.checkpoint = _make_checkpoint(state, frames, value)
+        raise
+
+
+# How many nogoods a backjumping search remembers by default.
+_NOGOOD_LIMIT = 1000
+
+# The most variables a nogood is learnt with, larger ones rarely come up again and are slow to check.
+_NOGOOD_MAX_SIZE = 8
+
+
+class _NogoodStore:
+    """Remembers assignments proven to have no solution, evicting the least recently used.
+
+       Nogoods are indexed by each of their (variable, value) pairs, so checking an assignment
+       only looks at the nogoods it could complete.
+    """
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self._nogoods: "_OrderedDict[frozenset, None]" = _OrderedDict()
+        # Dicts are used as ordered sets, so searches are repeatable.
+        self._index: Dict[Tuple[str, Any], Dict[frozenset, None]] = {}
+
+    def __len__(self) -> int:
+        return len(self._nogoods)
+
+    def learn(self, nogood: Dict[str, ValueType]):
+        """Remembers that a partial solution can't be extended to a solution."""
+        if not nogood or len(nogood) > _NOGOOD_MAX_SIZE or self.limit <= 0:
+            return
+        key = frozenset(nogood.items())
+        if key in self._nogoods:
+            self._nogoods.move_to_end(key)
+            return
+        if len(self._nogoods) >= self.limit:
+            evicted, _ = self._nogoods.popitem(last=False)
+            for pair in evicted:
+                keys = self._index[pair]
+                del keys[evicted]
+                if not keys:
+                    del self._index[pair]
+        self._nogoods[key] = None
+        for pair in key:
+            self._index.setdefault(pair, {})[key] = None
+
+    def violated(
+        self, assignment: SolutionsType, var: str, value: ValueType
+    ) -> Optional[Set[str]]:
+        """Finds a nogood that assigning a value to a variable would complete.
+
+           :returns: The variables of the nogood, or None if no nogood would be completed.
+        """
+        keys = self._index.get((var, value))
+        if not keys:
+            return None
+        for key in keys:
+            if all(
+                other == var
+                or (other in assignment and assignment[other] == other_value)
+                for other, other_value in key
+            ):
+                self._nogoods.move_to_end(key)
+                return {other for other, _ in key}
+        return None
+
+
+def _backjumping_search(
+    state: SearchState,
+    multiply: bool = False,
+    nogood_limit: int = _NOGOOD_LIMIT,
+    checkpoint: SearchCheckpoint = None,
+) -> Generator[int, None, None]:
+    """Like :py:func:`_search`, but backjumps over variables that can't resolve a failure (CBJ).
+
+       Each frame keeps a conflict set, the earlier variables that caused its values to fail.
+       Once every value of a variable has failed, the assignment of its conflict set can't be
+       extended to a solution, so it's learnt as a nogood and the search jumps straight back
+       to the last variable in it, passing on the rest of the conflict set. Variables that
+       had a solution below their current value are backtracked from one level at a time.
+       So are the variables of a resumed checkpoint, as their conflict sets weren't saved.
+       Nogoods are added to the state's store if it has one, so later searches can reuse them.
+    """
+    variable_count = len(state.variables)
+    assignment = state.assignment
+    nogoods = state._nogoods
+    if nogoods is None:
+        nogoods = _NogoodStore(nogood_limit)
+    frames: List[Tuple[str, Iterator, List[_CompiledConstraint], int]] = []
+    conflicts: List[Set[str]] = []
+    solved: List[bool] = []
+    depth_of: Dict[str, int] = {}
+    if checkpoint is not None:
+        frames = _resume_frames(state, checkpoint)
+        conflicts = [set() for _ in frames]
+        solved = [True for _ in frames]
+        depth_of = {frame[0]: depth for depth, frame in enumerate(frames)}
+    extend = not frames
+    value = None
+    try:
+        while True:
+            if extend:
+                depth = len(frames)
+                combinations = (
+                    state.unconstrained_combinations()
+                    if multiply and depth < variable_count
+                    else 0
+                )
+                if depth == variable_count or combinations:
+                    yield combinations or 1
+                    # Solutions don't fail, so there's no conflict to jump back over.
+                    solved[:] = [True] * depth
+                else:
+                    current_var = state.select_variable(depth)
+                    # Binding can filter the domain, so values are ordered after it.
+                    checks = state.bind(current_var, depth)
+                    values: Iterator = iter(
+                        state.order_values(current_var)
+                    )
+                    frames.append(
+                        (current_var, values, checks, len(state.trail))
+                    )
+                    conflicts.append(set())
+                    solved.append(False)
+                    depth_of[current_var] = depth
+            extend = True
+
+            while frames:
+                current_var, values, checks, mark = frames[-1]
+                conflict = conflicts[-1]
+                for value in values:
+                    if state._pause:
+                        state._pause = False
+                        yield 0
+                    state.undo(mark)
+                    culprits = nogoods.violated(
+                        assignment, current_var, value
+                    )
+                    if culprits is None:
+                        if state.assign(current_var, value, checks):
+                            break
+                        culprits = state._conflict
+                    conflict.update(culprits)
+                else:
+                    state.undo(mark)
+                    if solved[-1]:
+                        target = len(frames) - 2
+                    else:
+                        # Values removed before the variable was assigned failed too.
+                        conflict.update(state._pruning_conflict(current_var))
+                        conflict.discard(current_var)
+                        nogoods.learn(
+                            {var: assignment[var] for var in conflict}
+                        )
+                        target = max(
+                            (depth_of[var] for var in conflict), default=-1
+                        )
+                        if target >= 0:
+                            conflicts[target].update(conflict)
+                            conflicts[target].discard(frames[target][0])
+                    state.unbind(current_var)
+                    frames.pop()
+                    conflicts.pop()
+                    solved.pop()
+                    # Unassign the variables jumped over.
+                    while len(frames) > target + 1:
+                        state.undo(frames[-1][3])
+                        state.unbind(frames[-1][0])
+                        frames.pop()
+                        conflicts.pop()
+                        solved.pop()
+                    continue
+                break
+            else:
+                return
+            if state._pause:
+                state._pause = False
+                yield 0
+    except SearchLimitExceeded as exceeded:
+        if not multiply:
+            exceeded.checkpoint = _make_checkpoint(state, frames, value)
+        raise
+
+
+def _find_components(
+    variables: List[str], constraints: List[Constraint]
+) -> List[Tuple[List[str], List[int]]]:
+    """Splits a problem into groups of variables that aren't linked by any chain of constraints.
+
+       Variables are linked by the scopes of constraints, and unscoped constraints link every variable.
+
+       :returns: The variables and the positions of the constraints of each component,
+           in the order of their first variable.
+    """
+    parent = {var: var for var in variables}
+
+    def find(var: str) -> str:
+        while parent[var] != var:
+            parent[var] = parent[parent[var]]
+            var = parent[var]
+        return var
+
+    scopes = []
+    for constraint in constraints:
+        compiled = _compile_constraint(constraint)
+        scope = variables if compiled.scope is None else compiled.scope
+        scopes.append(scope)
+        for var in scope[1:]:
+            parent[find(var)] = find(scope[0])
+
+    components: Dict[str, Tuple[List[str], List[int]]] = {}
+    for var in variables:
+        components.setdefault(find(var), ([], []))[0].append(var)
+    for index, scope in enumerate(scopes):
+        # Constraints on no variables are checked with the first component.
+        root = find(scope[0] if scope else variables[0])
+        components[root][1].append(index)
+    return list(components.values())
+
+
+class _Component(NamedTuple):
+    """An independent part of a problem, found by :py:func:`_decompose`."""
+
+    variables: List[str]
+    domains: DomainsType
+    constraints: List[Constraint]
+    # The position of each constraint in the whole problem.
+    positions: List[int]
+
+
+def _decompose(
+    domains: DomainsType,
+    constraints: List[Constraint],
+    sorted_function,
+    statistics: Iterable[SearchStatistics] = (),
+) -> Tuple[List[str], List[_Component]]:
+    """Validates a problem and splits it into the components found by :py:func:`_find_components`.
+
+       Each of the ``statistics`` gets a record for every constraint first, as the components
+       are compiled out of order.
+
+       :returns: All the variables in order, and each component.
+    """
+    _validate_domains_and_constraints(domains, constraints)
+    for counter in statistics:
+        for position, constraint in enumerate(constraints):
+            counter._record(position, constraint)
+    variables = list(sorted_function(domains.keys()))
+    return (
+        variables,
+        [
+            _Component(
+                component_variables,
+                {var: domains[var] for var in component_variables},
+                [constraints[index] for index in indices],
+                indices,
+            )
+            for component_variables, indices in _find_components(
+                variables, constraints
+            )
+        ],
+    )
+
+
+def _fixed_order(variables: List[str]) -> Callable[[Iterable[str]], List[str]]:
+    """A ``sorted_function`` that orders a component's variables as they are in the whole problem."""
+    return lambda keys: list(variables)
+
+
+class _CachedSolutions:
+    """An iterable of the solutions of a generator that can be iterated many times,
+       only running the generator as far as it's needed."""
+
+    def __init__(self, solutions: Iterator[Tuple]):
+        self._solutions: Optional[Iterator[Tuple]] = solutions
+        self._cache: List[Tuple] = []
+
+    def __iter__(self) -> Iterator[Tuple]:
+        cache = self._cache
+        index = 0
+        while True:
+            if index < len(cache):
+                yield cache[index]
+                index += 1
+                continue
+            if self._solutions is None:
+                return
+            for solution in self._solutions:
+                cache.append(solution)
+                break
+            else:
+                self._solutions = None
+
+    def empty(self) -> bool:
+        """Whether there are no solutions, running the generator to the first one if needed."""
+        for _ in self:
+            return False
+        return True
+
+    def once(self) -> Iterator[Tuple]:
+        """Iterates over the solutions without caching any more of them."""
+        yield from self._cache
+        if self._solutions is not None:
+            yield from self._solutions
+
+
+def _component_product(
+    variables: List[str], components: List[Tuple[List[str], Iterable]]
+) -> Generator[Tuple, None, None]:
+    """Lazily combines the tuple solutions of each component into tuples of every variable's values,
+       the first component's values changing slowest.
+
+       :param variables: All the variables, in the order of the combined tuples.
+       :param components: The variables of each component, and its solutions as tuples in that order.
+    """
+    position_of = {var: position for position, var in enumerate(variables)}
+    positions = [
+        [position_of[var] for var in component_variables]
+        for component_variables, _ in components
+    ]
+    cached = [_CachedSolutions(iter(solutions)) for _, solutions in components]
+    # Find any component without solutions before combining the others.
+    if any(component.empty() for component in cached):
+        return
+    values: List[Any] = [None] * len(variables)
+    # The first component is only iterated once, so its solutions aren't kept.
+    iterators = [cached[0].once()]
+    while iterators:
+        index = len(iterators) - 1
+        for solution in iterators[-1]:
+            for position, value in zip(positions[index], solution):
+                values[position] = value
+            break
+        else:
+            iterators.pop()
+            continue
+        if index + 1 == len(cached):
+            yield tuple(values)
+        else:
+            iterators.append(iter(cached[index + 1]))
+
+
+def _start_search(
+    domains: DomainsType,
+    constraints: List[Constraint],
+    *,
+    sorted_function=sorted,
+    propagation: str = None,
+    variable_ordering: VariableOrdering = None,
+    value_ordering: ValueOrdering = None,
+    statistics: SearchStatistics = None,
+    hooks: SearchHooks = None,
+    limits: SearchLimits = None,
+    backjumping: bool = False,
+    nogood_limit: int = _NOGOOD_LIMIT,
+    extra_hooks: Iterable[SearchHooks] = (),
+    plans: Dict[Tuple[str, ...], _Plan] = None,
+    positions: Sequence[int] = None,
+) -> Optional[SearchState]:
+    """Validates and compiles a problem, returning the state to search it from,
+       or None if propagation shows it has no solutions.
+
+       ``extra_hooks`` are called after ``hooks``, for callers that watch the search themselves.
+       ``positions`` are those of the constraints in the whole problem, when it's a component of one.
+       Problems with the same constraints, options and variables share a plan, so with a dict of
+       ``plans`` by variable order, a problem whose variables have a plan only has its domains
+       validated, and new plans are added to it.
+    """
+    # Assert args are valid
+    _validate_domains(domains)
+    if propagation not in _PROPAGATION_MODES:
+        raise ValueError(f"{propagation} is not a known propagation mode.")
+
+    counters = [c for c in (statistics, limits) if c is not None]
+    variables = tuple(sorted_function(domains.keys()))
+    plan = None if plans is None else plans.get(variables)
+    if plan is None:
+        for constraint in constraints:
+            _validate_constraint(constraint, domains)
+        plan = _compile_plan(
+            list(variables), constraints, counters, positions
+        )
+        if plans is not None:
+            plans[variables] = plan
+    all_hooks = counters + ([] if hooks is None else [hooks])
+    all_hooks += extra_hooks
+    state: SearchState
+    if not all_hooks:
+        state = SearchState(
+            plan, domains, propagation, variable_ordering, value_ordering
+        )
+    else:
+        state = _HookedSearchState(
+            all_hooks,
+            plan,
+            domains,
+            propagation,
+            variable_ordering,
+            value_ordering,
+        )
+        for hook in all_hooks:
+            hook.on_start(state)
+    state._explain = backjumping
+    state._nogood_limit = nogood_limit
+    return state if state.initialise() else None
 
 
 def solve(
     domains: DomainsType,
     constraints: List[Constraint] = [],
     *,
-    _sorted_variables=None,
-    _current_solution: SolutionsType = None,
-    _depth: int = 0,
     sorted_function=sorted,
+    propagation: str = None,
+    variable_ordering: VariableOrdering = None,
+    value_ordering: ValueOrdering = None,
+    as_tuples: bool = False,
+    statistics: SearchStatistics = None,
+    hooks: SearchHooks = None,
+    limits: SearchLimits = None,
+    resume: SearchCheckpoint = None,
+    backjumping: bool = False,
+    nogood_limit: int = _NOGOOD_LIMIT,
+    decompose: bool = False,
 ) -> SolutionGenerator:
     """
-        A recursive generator function that yields solutions to a constraint solving problem,
+        A generator function that yields solutions to a constraint solving problem,
         using domain reduction.
 
         eg.
@@ -173,40 +2065,284 @@ def solve(
         >>> list(solve({'a': [1, 2], 'b': [1, 2]}, [(lambda a, b: a > b),]))
         [{'a': 2, 'b': 1}]
 
+        Domains are only reduced as variables are assigned when a propagation mode is chosen.
+        ``"forward_checking"`` removes values that conflict with the assignments made so far
+        from the domains of unassigned variables. ``"arc_consistency"`` also removes values
+        that have no support in the domain of another unassigned variable of a constraint
+        (maintaining arc consistency with AC-3). Either way, the search backtracks as soon as
+        any domain is empty. Only scoped constraints (see :py:func:`scoped`) are used to reduce
+        domains, unscoped ones are checked as usual.
+
+        >>> list(solve({'a': [1, 2, 3], 'b': [1, 2, 3]}, [(lambda a, b: a > b + 1),], propagation="arc_consistency"))
+        [{'a': 3, 'b': 1}]
+
+        By default variables are assigned in the order given by ``sorted_function``.
+        A ``variable_ordering`` heuristic chooses the next variable at each step instead,
+        see :py:mod:`amp_constraint_solver.heuristics`. Heuristics that look at domain
+        sizes need a propagation mode to see domains shrink.
+
+        Solutions can be yielded as tuples of values, in the order given by ``sorted_function``,
+        which are cheaper to build and store than dicts.
+
+        >>> list(solve({'a': [1, 2], 'b': [1, 2]}, [(lambda a, b: a > b),], as_tuples=True))
+        [(2, 1)]
+
+        With ``decompose``, variables that aren't linked by any chain of constraints are split
+        into independent components, each searched separately. Solutions are combined lazily as
+        they're yielded, instead of the search repeating one component's subtree for each
+        solution of another. Solutions come in a different order, with the first component's
+        values changing slowest, and constraints that take ``**kwargs`` without a scope link
+        every variable.
+
+        >>> list(solve({'a': [1, 2], 'b': [1, 2], 'c': [1, 2], 'd': [1, 2]},
+        ...            [(lambda a, b: a > b), (lambda c, d: c > d)], decompose=True))
+        [{'a': 2, 'b': 1, 'c': 2, 'd': 1}]
+
+        With ``backjumping``, once every value of a variable has failed the search jumps straight
+        back to the last variable that caused one of the failures (conflict-directed backjumping),
+        rather than trying the other values of the variables in between. The assignments that
+        caused the failures are remembered as nogoods, up to ``nogood_limit`` of them, and values
+        that would complete one are skipped. Failures are attributed using the scopes of constraints,
+        so unscoped constraints, arc consistency and ``propagate`` methods blame every assigned variable.
+
+        Searches with ``limits`` stop once they've assigned too many values, checked constraints too
+        many times, run for too long or used too much memory, see :py:class:`SearchLimits`. The
+        :py:class:`SearchLimitExceeded` raised has a checkpoint of where the search stopped, which
+        a later call with the same arguments can ``resume`` from, yielding the solutions that
+        weren't yet yielded. Decomposed searches can't be resumed, so a resumed search isn't decomposed.
 
         :param domains: A dict of variable names to lists of possible assignments, :py:class:`DomainsType`.
         :param constraints: A list of :py:class:`Constraint` functions to check possible solutions.
         :param sorted_function: Can be used to override what order variables are assigned in.
+        :param propagation: None, ``"forward_checking"`` or ``"arc_consistency"``.
+        :param variable_ordering: A :py:class:`VariableOrdering` to choose the next variable with.
+        :param value_ordering: A :py:class:`ValueOrdering` to choose the order values are tried in.
+        :param as_tuples: Whether to yield tuples of values instead of dicts.
+        :param statistics: A :py:class:`SearchStatistics` to count the work done by the search in.
+        :param hooks: A :py:class:`SearchHooks` to call as the search runs.
+        :param limits: A :py:class:`SearchLimits` to stop the search once it's done too much work.
+        :param resume: A :py:class:`SearchCheckpoint` to carry on an earlier search from, see below.
+        :param backjumping: Whether to use conflict-directed backjumping, see below.
+        :param nogood_limit: How many nogoods a backjumping search remembers.
+        :param decompose: Whether to solve independent parts of the problem separately, see below.
         :returns: A generator of candidate solutions. :py:data:`SolutionGenerator`
-        :raise ValueError: Invalid domains or constraints. See :py:mod:`amp_constraint_solver.test_constraint_solver`
+        :raise ValueError: Invalid domains or constraints, or a checkpoint for a different problem.
+            See :py:mod:`amp_constraint_solver.test_constraint_solver`
+        :raise SearchLimitExceeded: The search went over its ``limits``, unless they're quiet.
     """
-    if _current_solution is None:
-        _current_solution = dict()
+    options = dict(
+        propagation=propagation,
+        variable_ordering=variable_ordering,
+        value_ordering=value_ordering,
+        statistics=statistics,
+        hooks=hooks,
+        limits=limits,
+        backjumping=backjumping,
+        nogood_limit=nogood_limit,
+    )
+    if decompose and resume is None:
+        variables, components = _decompose(
+            domains,
+            constraints,
+            sorted_function,
+            _counters(options),
+        )
+        if len(components) > 1:
+            solutions = _component_product(
+                variables,
+                [
+                    (
+                        component.variables,
+                        _search_solutions(
+                            component.domains,
+                            component.constraints,
+                            True,
+                            None,
+                            sorted_function=_fixed_order(component.variables),
+                            positions=component.positions,
+                            **options,
+                        ),
+                    )
+                    for component in components
+                ],
+            )
+            try:
+                if as_tuples:
+                    yield from solutions
+                else:
+                    for values in solutions:
+                        yield dict(zip(variables, values))
+            except SearchLimitExceeded as exceeded:
+                # The checkpoint is only of one component's search.
+                exceeded.checkpoint = None
+                raise
+            if limits is not None and limits.exceeded is not None:
+                limits.exceeded.checkpoint = None
+            return
+    yield from _search_solutions(
+        domains,
+        constraints,
+        as_tuples,
+        resume,
+        sorted_function=sorted_function,
+        **options,
+    )
 
-    if _depth == 0:
-        # Assert args are valid
-        _validate_domains_and_constraints(domains, constraints)
 
-    if _depth == len(domains):
-        # Base case, all variables have been assigned and checked.
-        yield _current_solution
+def _search_solutions(
+    domains: DomainsType,
+    constraints: List[Constraint],
+    as_tuples: bool,
+    resume: Optional[SearchCheckpoint],
+    **options,
+) -> SolutionGenerator:
+    """Searches a problem without decomposing it, yielding the solutions :py:func:`solve` does.
+
+       :param options: Keyword arguments for :py:func:`_start_search`.
+    """
+    state = _start_search(domains, constraints, **options)
+    if state is None:
         return
+    solution = state.solution_tuple if as_tuples else state.solution
+    try:
+        for _ in _run_search(state, checkpoint=resume):
+            yield solution()
+    except SearchLimitExceeded as exceeded:
+        limits = options.get("limits")
+        if limits is None or not limits.quiet:
+            raise
+        limits.exceeded = exceeded
+
+
+def _checking_options(options: Dict[str, Any]) -> Dict[str, Any]:
+    """The options of :py:func:`solve` that apply to counting or checking for solutions,
+       leaving out ``as_tuples``, which only changes how solutions are yielded.
+
+       :raise ValueError: ``resume``, which only :py:func:`solve` supports.
+    """
+    if options.get("resume") is not None:
+        raise ValueError(
+            "resume isn't supported when counting or checking for solutions."
+        )
+    return {
+        name: value
+        for name, value in options.items()
+        if name not in ("as_tuples", "resume")
+    }
+
+
+def _counters(options: Dict[str, Any]) -> List[SearchStatistics]:
+    """The statistics and limits among the options of a search."""
+    return [
+        options[name]
+        for name in ("statistics", "limits")
+        if options.get(name) is not None
+    ]
+
+
+def count_solutions(
+    domains: DomainsType,
+    constraints: List[Constraint] = [],
+    *,
+    decompose: bool = True,
+    **options,
+) -> int:
+    """
+        Counts the solutions to a constraint solving problem without building them.
+
+        The independent components of the problem (see :py:func:`solve`) are counted
+        separately and their counts multiplied. Once no constraint reads the variables
+        left to assign, the solutions below a partial solution are counted by multiplying
+        the sizes of their domains.
+
+        >>> from amp_constraint_solver import count_solutions
+        >>> count_solutions({'a': [1, 2], 'b': [1, 2], 'c': list(range(1000))}, [(lambda a, b: a > b),])
+        1000
 
-    # Recursive case, choose the next variable in order and iterate over all values.
-    sorted_variables = _sorted_variables or sorted_function(domains.keys())
-    current_var = sorted_variables[_depth]
-    current_domain = domains[current_var]
-
-    for value in current_domain:
-        # Create a new partial solution and check against constraints.
-        current_solution = dict(_current_solution)
-        current_solution[current_var] = value
-        if _check_constraints(current_solution, constraints):
-            # Recurse to the next variable with the new partial solution.
-            yield from solve(
-                domains,
-                constraints,
-                _sorted_variables=sorted_variables,
-                _current_solution=current_solution,
-                _depth=_depth + 1,
+        :param domains: A dict of variable names to lists of possible assignments, :py:class:`DomainsType`.
+        :param constraints: A list of :py:class:`Constraint` functions to check possible solutions.
+        :param decompose: Whether to count independent components separately.
+        :param options: Keyword arguments as for :py:func:`solve`, except ``resume``.
+        :returns: The number of solutions.
+        :raise ValueError: Invalid domains or constraints, or ``resume``.
+    """
+    options = _checking_options(options)
+    if decompose:
+        sorted_function = options.pop("sorted_function", sorted)
+        _, components = _decompose(
+            domains, constraints, sorted_function, _counters(options)
+        )
+        if len(components) > 1:
+            total = 1
+            # Small components are counted first, in case one has no solutions.
+            for component in sorted(
+                components, key=lambda component: len(component.variables)
+            ):
+                total *= count_solutions(
+                    component.domains,
+                    component.constraints,
+                    decompose=False,
+                    sorted_function=_fixed_order(component.variables),
+                    positions=component.positions,
+                    **options,
+                )
+                if not total:
+                    break
+            return total
+        options["sorted_function"] = sorted_function
+    state = _start_search(domains, constraints, **options)
+    if state is None:
+        return 0
+    return sum(_run_search(state, multiply=True))
+
+
+def is_satisfiable(
+    domains: DomainsType,
+    constraints: List[Constraint] = [],
+    *,
+    decompose: bool = True,
+    **options,
+) -> bool:
+    """
+        Checks whether a constraint solving problem has any solutions, stopping at the first one.
+
+        The independent components of the problem (see :py:func:`solve`) are checked separately.
+
+        >>> from amp_constraint_solver import is_satisfiable
+        >>> is_satisfiable({'a': [1, 2], 'b': [1, 2]}, [(lambda a, b: a > b),])
+        True
+
+        :param domains: A dict of variable names to lists of possible assignments, :py:class:`DomainsType`.
+        :param constraints: A list of :py:class:`Constraint` functions to check possible solutions.
+        :param decompose: Whether to check independent components separately.
+        :param options: Keyword arguments as for :py:func:`solve`, except ``resume``.
+        :returns: Whether there's a solution.
+        :raise ValueError: Invalid domains or constraints, or ``resume``.
+    """
+    options = _checking_options(options)
+    if decompose:
+        sorted_function = options.pop("sorted_function", sorted)
+        _, components = _decompose(
+            domains, constraints, sorted_function, _counters(options)
+        )
+        if len(components) > 1:
+            return all(
+                is_satisfiable(
+                    component.domains,
+                    component.constraints,
+                    decompose=False,
+                    sorted_function=_fixed_order(component.variables),
+                    positions=component.positions,
+                    **options,
+                )
+                for component in sorted(
+                    components, key=lambda component: len(component.variables)
+                )
             )
+        options["sorted_function"] = sorted_function
+    state = _start_search(domains, constraints, **options)
+    if state is None:
+        return False
+    for _ in _run_search(state, multiply=True):
+        return True
+    return False
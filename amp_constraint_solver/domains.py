@@ -0,0 +1,513 @@
+"""
+Compact representations of the values left in a domain during a search.
+
+A :py:class:`BitsetDomain` numbers the values of a variable's domain by their position in the list,
+so the values left can be stored as the set bits of an int. Removing a value clears one bit,
+counting the values left is a popcount, and saving or restoring a domain on backtrack is
+just keeping a reference to an int.
+
+Domains too big to list, like ``range(10 ** 9)``, are numbered the same way by an
+:py:class:`IntervalDomain`, which stores the values left as intervals of positions. A range or
+:py:class:`Intervals` can be a domain, and its values are only generated as the search needs them.
+
+>>> from amp_constraint_solver.domains import BitsetDomain
+>>> domain = BitsetDomain(['red', 'green', 'blue'])
+>>> mask = domain.remove(domain.full, 'green')
+>>> domain.values_of(mask), domain.size(mask)
+(['red', 'blue'], 2)
+
+"""
+from typing import Any, Dict, Iterable, Iterator, List, Sequence, Tuple
+from bisect import bisect_right as _bisect_right
+from collections.abc import Sequence as _Sequence
+from fractions import Fraction as _Fraction
+from math import ceil as _ceil, floor as _floor, inf as _INFINITY
+
+try:
+    import numpy as _numpy
+except ImportError:  # NumPy is optional, it's only needed for batch constraints.
+    _numpy = None  # type: ignore
+
+
+__all__ = ["BitsetDomain", "IntervalDomain", "Intervals"]
+
+
+# How many decoded masks each domain remembers, masks tend to recur across a search.
+_DECODED_CACHE_SIZE = 1024
+
+
+def _count_bits(mask: int) -> int:
+    """Counts the set bits of an int."""
+    return bin(mask).count("1")
+
+
+# int.bit_count is only available from Python 3.10.
+_popcount = getattr(int, "bit_count", _count_bits)
+
+
+class BitsetDomain:
+    """Maps the values of a domain to bits of an int, so subsets of it can be stored as masks.
+
+       Masks list values in the same order as the domain they were made from.
+
+       :param values: The values of the domain, which must be unique and hashable.
+    """
+
+    __slots__ = (
+        "values",
+        "index",
+        "full",
+        "_values_of",
+        "_items_of",
+        "_arrays_of",
+    )
+
+    def __init__(self, values: Sequence):
+        self.values: List = list(values)
+        self.index: Dict[Any, int] = {
+            value: position for position, value in enumerate(self.values)
+        }
+        self.full: int = (1 << len(self.values)) - 1
+        self._values_of: Dict[int, List] = {self.full: self.values}
+        self._items_of: Dict[int, List[Tuple[int, Any]]] = {}
+        self._arrays_of: Dict[int, Tuple[Any, Any]] = {}
+
+    def __repr__(self) -> str:
+        return f"BitsetDomain({self.values})"
+
+    def size(self, mask: int) -> int:
+        """The number of values in a mask."""
+        return _popcount(mask)
+
+    def values_of(self, mask: int) -> List:
+        """The values in a mask, in domain order. The list mustn't be modified."""
+        values = self._values_of.get(mask)
+        if values is None:
+            # The binary string of a mask, reversed, lines up with the values from bit 0.
+            values = [
+                value
+                for value, bit in zip(self.values, reversed(bin(mask)))
+                if bit == "1"
+            ]
+            if len(self._values_of) >= _DECODED_CACHE_SIZE:
+                self._values_of.clear()
+                self._values_of[self.full] = self.values
+            self._values_of[mask] = values
+        return values
+
+    def items_of(self, mask: int) -> List[Tuple[int, Any]]:
+        """The bit positions and values in a mask, in domain order. The list mustn't be modified."""
+        items = self._items_of.get(mask)
+        if items is None:
+            items = [
+                (position, value)
+                for position, (value, bit) in enumerate(
+                    zip(self.values, reversed(bin(mask)))
+                )
+                if bit == "1"
+            ]
+            if len(self._items_of) >= _DECODED_CACHE_SIZE:
+                self._items_of.clear()
+            self._items_of[mask] = items
+        return items
+
+    def arrays_of(self, mask: int) -> Tuple[Any, Any]:
+        """The bit positions and values in a mask as NumPy arrays, in domain order.
+           The arrays mustn't be modified. Only available if NumPy is installed."""
+        arrays = self._arrays_of.get(mask)
+        if arrays is None:
+            items = self.items_of(mask)
+            positions = _numpy.array(
+                [position for position, _ in items], dtype=_numpy.intp
+            )
+            try:
+                values = _numpy.array([value for _, value in items])
+            except ValueError:
+                # Ragged values, like tuples of different lengths, can't be an array of them.
+                values = None
+            if values is None or values.ndim != 1:
+                # Values like tuples would become extra dimensions of the array.
+                values = _numpy.empty(len(items), dtype=object)
+                for number, (_, value) in enumerate(items):
+                    values[number] = value
+            if len(self._arrays_of) >= _DECODED_CACHE_SIZE:
+                self._arrays_of.clear()
+            arrays = self._arrays_of[mask] = (positions, values)
+        return arrays
+
+    def mask_of(self, values: Iterable) -> int:
+        """The mask of some values of the domain."""
+        index = self.index
+        mask = 0
+        for value in values:
+            mask |= 1 << index[value]
+        return mask
+
+    def contains(self, mask: int, value: Any) -> bool:
+        """Whether a value is in a mask."""
+        position = self.index.get(value)
+        return position is not None and bool(mask >> position & 1)
+
+    def remove(self, mask: int, value: Any) -> int:
+        """The mask without a value."""
+        position = self.index.get(value)
+        if position is None:
+            return mask
+        return mask & ~(1 << position)
+
+    def intersect(self, mask: int, other: int) -> int:
+        """The values in both of two masks."""
+        return mask & other
+
+    def without(self, mask: int, positions: Iterable[int]) -> int:
+        """The mask without the values at some bit positions."""
+        for position in positions:
+            mask &= ~(1 << position)
+        return mask
+
+    def bounds(self, mask: int) -> Tuple[Any, Any]:
+        """The smallest and largest values in a non-empty mask."""
+        values = self.values_of(mask)
+        return min(values), max(values)
+
+    def between(self, mask: int, low: Any, high: Any) -> int:
+        """The values of a mask from ``low`` to ``high`` inclusive, either of which may be None for no bound."""
+        return self.mask_of(
+            value
+            for value in self.values_of(mask)
+            if (low is None or low <= value)
+            and (high is None or value <= high)
+        )
+
+
+class Intervals(_Sequence):
+    """An ascending sequence of integers made of ranges, like the time slots of a week,
+       that can be a domain without its values being materialised.
+
+       Its length is known straight away, and indexing and ``in`` take time logarithmic in the
+       number of ranges. The ranges can come from a generator, so only the ranges are ever built.
+
+       >>> from amp_constraint_solver.domains import Intervals
+       >>> slots = Intervals(range(day * 96 + 36, day * 96 + 68) for day in range(5))
+       >>> len(slots), slots[32], 100 in slots, 230 in slots
+       (160, 132, False, True)
+
+       :param ranges: The ranges, or pairs of their starts and stops, ascending and not overlapping.
+           Empty ranges are left out.
+       :raise ValueError: Ranges that overlap, aren't ascending or count down.
+    """
+
+    __slots__ = ("ranges", "_starts", "_offsets")
+
+    def __init__(self, ranges: Iterable[Any]):
+        parts: List[range] = []
+        for part in ranges:
+            if not isinstance(part, range):
+                part = range(*part)
+            if not part:
+                continue
+            if part.step < 0:
+                raise ValueError(f"Intervals can't count down. {part}")
+            if parts and part[0] <= parts[-1][-1]:
+                raise ValueError(
+                    f"Intervals must be ascending and not overlap. {parts[-1]} {part}"
+                )
+            parts.append(part)
+        self.ranges: Tuple[range, ...] = tuple(parts)
+        self._starts = [part[0] for part in parts]
+        # The position of the first value of each range, and the length.
+        self._offsets = [0]
+        for part in parts:
+            self._offsets.append(self._offsets[-1] + len(part))
+
+    def __repr__(self) -> str:
+        return f"Intervals({list(self.ranges)})"
+
+    def __len__(self) -> int:
+        return self._offsets[-1]
+
+    def __iter__(self) -> Iterator[int]:
+        for part in self.ranges:
+            yield from part
+
+    def __eq__(self, other: Any) -> bool:
+        if not isinstance(other, Intervals):
+            return NotImplemented
+        return self.ranges == other.ranges or (
+            len(self) == len(other)
+            and all(a == b for a, b in zip(self, other))
+        )
+
+    # Equal intervals can be made of different ranges, like lists they aren't hashable.
+    __hash__ = None  # type: ignore
+
+    def __getitem__(self, item: Any) -> Any:
+        if isinstance(item, slice):
+            start, stop, step = item.indices(len(self))
+            if step != 1:
+                raise ValueError(
+                    "Intervals can only be sliced with a step of 1."
+                )
+            return Intervals(self._slices(start, stop))
+        if item < 0:
+            item += len(self)
+        if not 0 <= item < len(self):
+            raise IndexError("Intervals index out of range.")
+        part = _bisect_right(self._offsets, item) - 1
+        return self.ranges[part][item - self._offsets[part]]
+
+    def _slices(self, start: int, stop: int) -> Iterator[range]:
+        """The parts of the ranges from position ``start`` to ``stop``."""
+        offsets = self._offsets
+        for part in range(_bisect_right(offsets, start) - 1, len(self.ranges)):
+            if offsets[part] >= stop:
+                return
+            yield self.ranges[part][
+                max(start - offsets[part], 0) : stop - offsets[part]
+            ]
+
+    def _part_of(self, value: Any) -> int:
+        """The position of the range that would hold a value, or -1 if it's before them all."""
+        try:
+            return _bisect_right(self._starts, value) - 1
+        except TypeError:
+            return -1
+
+    def __contains__(self, value: Any) -> bool:
+        part = self._part_of(value)
+        return part >= 0 and value in self.ranges[part]
+
+    def index(self, value: Any, start: int = 0, stop: int = None) -> int:
+        """The position of a value.
+
+           :raise ValueError: The value isn't in the intervals.
+        """
+        part = self._part_of(value)
+        if part < 0 or value not in self.ranges[part]:
+            raise ValueError(f"{value} is not in the intervals.")
+        return self._offsets[part] + self.ranges[part].index(value)
+
+
+def _ranges_of(values: Any) -> Tuple[range, ...]:
+    """The ranges of a range or :py:class:`Intervals`."""
+    return (values,) if isinstance(values, range) else values.ranges
+
+
+# The ints a NumPy int64 can hold, arange turns bigger ones into floats.
+_INT64_MIN, _INT64_MAX = -(2 ** 63), 2 ** 63 - 1
+
+
+def _range_array(part: range) -> Any:
+    """The values of a non-empty range as a NumPy array, of objects if they don't fit in an int64."""
+    low, high = sorted((part[0], part[-1]))
+    if _INT64_MIN <= low and high <= _INT64_MAX:
+        return _numpy.arange(
+            part.start, part.stop, part.step, dtype=_numpy.int64
+        )
+    values = _numpy.empty(len(part), dtype=object)
+    values[:] = list(part)
+    return values
+
+
+class _Positions:
+    """Looks up the positions of the values of a lazy domain, like the index dict of a :py:class:`BitsetDomain`."""
+
+    __slots__ = ("values",)
+
+    def __init__(self, values: Any):
+        self.values = values
+
+    def __contains__(self, value: Any) -> bool:
+        return value in self.values
+
+    def __getitem__(self, value: Any) -> int:
+        return self.values.index(value)
+
+    def get(self, value: Any, default: Any = None) -> Any:
+        return self.values.index(value) if value in self.values else default
+
+
+# The masks of an IntervalDomain, the (start, stop) intervals of the positions of the values left.
+IntervalMask = Tuple[Tuple[int, int], ...]
+
+
+class IntervalDomain:
+    """Like :py:class:`BitsetDomain`, but for ascending ranges and :py:class:`Intervals`,
+       whose values are never materialised.
+
+       The values left are stored as a tuple of intervals of positions in the domain, ascending
+       and not touching, so removing a value splits an interval and narrowing a domain to the
+       values between two bounds only looks at the ends of intervals. An empty mask is an empty tuple.
+
+       >>> from amp_constraint_solver.domains import IntervalDomain
+       >>> domain = IntervalDomain(range(0, 10 ** 7))
+       >>> mask = domain.remove(domain.between(domain.full, 10, 19), 15)
+       >>> mask, domain.size(mask), list(domain.values_of(mask))
+       (((10, 15), (16, 20)), 9, [10, 11, 12, 13, 14, 16, 17, 18, 19])
+
+       :param values: A range with a positive step, or :py:class:`Intervals`.
+    """
+
+    __slots__ = ("values", "index", "full")
+
+    def __init__(self, values: Any):
+        self.values = values
+        self.index = _Positions(values)
+        self.full: IntervalMask = ((0, len(values)),)
+
+    def __repr__(self) -> str:
+        return f"IntervalDomain({self.values})"
+
+    def size(self, mask: IntervalMask) -> int:
+        """The number of values in a mask."""
+        return sum(stop - start for start, stop in mask)
+
+    def values_of(self, mask: IntervalMask) -> Any:
+        """The values in a mask, in domain order, as a range or :py:class:`Intervals`."""
+        if mask == self.full:
+            return self.values
+        parts = [self.values[start:stop] for start, stop in mask]
+        if len(parts) == 1:
+            return parts[0]
+        return Intervals(
+            part for values in parts for part in _ranges_of(values)
+        )
+
+    def items_of(self, mask: IntervalMask) -> Iterator[Tuple[int, Any]]:
+        """The positions and values in a mask, in domain order."""
+        for start, stop in mask:
+            yield from zip(range(start, stop), self.values[start:stop])
+
+    def arrays_of(self, mask: IntervalMask) -> Tuple[Any, Any]:
+        """The positions and values in a mask as NumPy arrays, in domain order, worked out
+           from the ranges without listing the values. Only available if NumPy is installed."""
+        positions = [
+            _numpy.arange(start, stop, dtype=_numpy.intp)
+            for start, stop in mask
+        ]
+        values = [
+            _range_array(part)
+            for start, stop in mask
+            for part in _ranges_of(self.values[start:stop])
+        ]
+        empty = [_numpy.empty(0, dtype=_numpy.intp)]
+        return (
+            _numpy.concatenate(positions or empty),
+            _numpy.concatenate(values or empty),
+        )
+
+    def chunks_of(
+        self, mask: IntervalMask, size: int
+    ) -> Iterator[IntervalMask]:
+        """Splits a mask into masks of at most ``size`` values, in domain order."""
+        chunk: List[Tuple[int, int]] = []
+        left = size
+        for start, stop in mask:
+            while start < stop:
+                end = min(stop, start + left)
+                chunk.append((start, end))
+                left -= end - start
+                start = end
+                if not left:
+                    yield tuple(chunk)
+                    chunk, left = [], size
+        if chunk:
+            yield tuple(chunk)
+
+    def mask_of(self, values: Iterable) -> IntervalMask:
+        """The mask of some values of the domain."""
+        index = self.index
+        intervals: List[Tuple[int, int]] = []
+        for position in sorted(set(index[value] for value in values)):
+            if intervals and intervals[-1][1] == position:
+                intervals[-1] = (intervals[-1][0], position + 1)
+            else:
+                intervals.append((position, position + 1))
+        return tuple(intervals)
+
+    def contains(self, mask: IntervalMask, value: Any) -> bool:
+        """Whether a value is in a mask."""
+        position = self.index.get(value)
+        if position is None:
+            return False
+        interval = _bisect_right(mask, (position, _INFINITY)) - 1
+        return interval >= 0 and position < mask[interval][1]
+
+    def remove(self, mask: IntervalMask, value: Any) -> IntervalMask:
+        """The mask without a value."""
+        position = self.index.get(value)
+        if position is None:
+            return mask
+        return self.without(mask, [position])
+
+    def intersect(
+        self, mask: IntervalMask, other: IntervalMask
+    ) -> IntervalMask:
+        """The values in both of two masks."""
+        intervals = []
+        i = j = 0
+        while i < len(mask) and j < len(other):
+            start = max(mask[i][0], other[j][0])
+            stop = min(mask[i][1], other[j][1])
+            if start < stop:
+                intervals.append((start, stop))
+            if mask[i][1] < other[j][1]:
+                i += 1
+            else:
+                j += 1
+        return tuple(intervals)
+
+    def without(
+        self, mask: IntervalMask, positions: Iterable[int]
+    ) -> IntervalMask:
+        """The mask without the values at some ascending positions."""
+        intervals = list(mask)
+        # Positions are removed from the intervals at or after the last one split.
+        interval = 0
+        for position in positions:
+            while (
+                interval < len(intervals)
+                and intervals[interval][1] <= position
+            ):
+                interval += 1
+            if interval == len(intervals):
+                break
+            start, stop = intervals[interval]
+            if position < start:
+                continue
+            split = [
+                part
+                for part in ((start, position), (position + 1, stop))
+                if part[0] < part[1]
+            ]
+            intervals[interval : interval + 1] = split
+            interval += len(split) - 1
+        return tuple(intervals)
+
+    def bounds(self, mask: IntervalMask) -> Tuple[Any, Any]:
+        """The smallest and largest values in a non-empty mask."""
+        return self.values[mask[0][0]], self.values[mask[-1][1] - 1]
+
+    def between(self, mask: IntervalMask, low: Any, high: Any) -> IntervalMask:
+        """The values of a mask from ``low`` to ``high`` inclusive, either of which may be None for no bound."""
+        intervals: List[Tuple[int, int]] = []
+        offset = 0
+        for part in _ranges_of(self.values):
+            first, last = 0, len(part)
+            if low is not None:
+                steps = _Fraction(low - part.start) / part.step
+                first = min(max(_ceil(steps), 0), last)
+            if high is not None:
+                steps = _Fraction(high - part.start) / part.step
+                last = max(min(_floor(steps) + 1, last), first)
+            if (
+                first < last
+                and intervals
+                and intervals[-1][1] == offset + first
+            ):
+                # Ranges next to each other give one interval of positions.
+                intervals[-1] = (intervals[-1][0], offset + last)
+            elif first < last:
+                intervals.append((offset + first, offset + last))
+            offset += len(part)
+        return self.intersect(mask, tuple(intervals))
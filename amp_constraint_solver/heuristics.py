@@ -0,0 +1,98 @@
+"""
+Variable and value ordering heuristics that can be passed to :py:func:`amp_constraint_solver.constraint_solver.solve`.
+
+Variable orderings are :py:class:`amp_constraint_solver.constraint_solver.VariableOrdering` functions,
+they're called at every step of the search with the unassigned variables and choose which to assign next.
+Ties are broken by the order the variables are given in.
+
+>>> from amp_constraint_solver import solve, minimum_remaining_values
+>>> constraints = [lambda a, b: a < b, lambda b, c: b < c]
+>>> for solution in solve({'a': [1, 2, 3], 'b': [1, 2, 3], 'c': [1, 2, 3]}, constraints,
+...                       propagation="forward_checking", variable_ordering=minimum_remaining_values):
+...     print(solution)
+...
+{'a': 1, 'b': 2, 'c': 3}
+
+Value orderings are :py:class:`amp_constraint_solver.constraint_solver.ValueOrdering` functions,
+they're called once a variable has been chosen and return its values in the order to try them.
+"""
+from .constraint_solver import SearchState, ValueType
+from typing import List
+
+
+__all__ = [
+    "minimum_remaining_values",
+    "maximum_degree",
+    "minimum_remaining_values_then_degree",
+    "domain_over_weighted_degree",
+    "least_constraining_value",
+]
+
+
+def minimum_remaining_values(state: SearchState, variables: List[str]) -> str:
+    """Chooses the variable with the fewest values left in its domain (MRV, "fail first").
+
+       :param state: The :py:class:`amp_constraint_solver.constraint_solver.SearchState` of the search.
+       :param variables: The unassigned variables.
+       :returns: The variable to assign next.
+    """
+    return min(variables, key=state.domain_size)
+
+
+def maximum_degree(state: SearchState, variables: List[str]) -> str:
+    """Chooses the variable involved in the most constraints with other unassigned variables.
+
+       :param state: The :py:class:`amp_constraint_solver.constraint_solver.SearchState` of the search.
+       :param variables: The unassigned variables.
+       :returns: The variable to assign next.
+    """
+    return max(variables, key=state.degree)
+
+
+def minimum_remaining_values_then_degree(
+    state: SearchState, variables: List[str]
+) -> str:
+    """Chooses the variable with the fewest values left, breaking ties by :py:func:`maximum_degree`.
+
+       :param state: The :py:class:`amp_constraint_solver.constraint_solver.SearchState` of the search.
+       :param variables: The unassigned variables.
+       :returns: The variable to assign next.
+    """
+    return min(
+        variables,
+        key=lambda var: (state.domain_size(var), -state.degree(var)),
+    )
+
+
+def domain_over_weighted_degree(
+    state: SearchState, variables: List[str]
+) -> str:
+    """Chooses the variable with the smallest ratio of domain size to weighted degree (dom/wdeg).
+
+       Each time a constraint rejects a value or empties a domain its weight goes up,
+       so the search is drawn towards the variables in the hardest part of the problem.
+
+       :param state: The :py:class:`amp_constraint_solver.constraint_solver.SearchState` of the search.
+       :param variables: The unassigned variables.
+       :returns: The variable to assign next.
+    """
+    return min(
+        variables,
+        key=lambda var: state.domain_size(var)
+        / max(state.weighted_degree(var), 1),
+    )
+
+
+def least_constraining_value(
+    state: SearchState, var: str
+) -> List[ValueType]:
+    """Tries the values that rule out the fewest values of other unassigned variables first.
+
+       :param state: The :py:class:`amp_constraint_solver.constraint_solver.SearchState` of the search.
+       :param var: The variable that's about to be assigned.
+       :returns: The variable's remaining values, least constraining first.
+    """
+    return sorted(
+        state.domain(var),
+        key=lambda value: state.count_conflicts(var, value),
+    )
@@ -0,0 +1,296 @@
+"""
+Solving a problem again after small edits, reusing what was worked out before them.
+
+Usage of :py:class:`Solver`:
+
+>>> from amp_constraint_solver import Solver
+>>> solver = Solver({'a': [1, 2, 3], 'b': [1, 2, 3]}, [lambda a, b: a > b])
+>>> list(solver.solve())
+[{'a': 2, 'b': 1}, {'a': 3, 'b': 1}, {'a': 3, 'b': 2}]
+>>> solver.restrict('b', [2, 3])
+>>> list(solver.solve())
+[{'a': 3, 'b': 2}]
+
+"""
+from .constraint_solver import (
+    Constraint,
+    Domain,
+    DomainsType,
+    SearchLimitExceeded,
+    SolutionGenerator,
+    ValueType,
+    _Plan,
+    _check_constraints,
+    _compile_constraint,
+    _run_search,
+    _start_search,
+    _validate_constraint,
+    _validate_domain,
+    _validate_domains_and_constraints,
+)
+from .domains import Intervals
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+
+__all__ = ["Solver"]
+
+
+def _copy_domain(domain: Any) -> Any:
+    """A copy of a domain, ranges and intervals can't be changed so they're kept as they are."""
+    if isinstance(domain, (range, Intervals)):
+        return domain
+    return list(domain)
+
+
+def _restricted(domain: Any, allowed: Set) -> Any:
+    """The values of a domain that are in ``allowed``, in the domain's order.
+       Ranges and intervals are only listed if values are removed, and then only the values kept."""
+    if isinstance(domain, (range, Intervals)):
+        positions = sorted(
+            set(domain.index(value) for value in allowed if value in domain)
+        )
+        if len(positions) == len(domain):
+            return domain
+        return [domain[position] for position in positions]
+    return [value for value in domain if value in allowed]
+
+
+class Solver:
+    """Holds a problem that's edited and solved repeatedly, like a model in an interactive planner.
+
+       Edits only throw away what they can have made wrong:
+
+       * The constraints are compiled once, and again after constraints are added or removed.
+       * The domains reduced by propagation before the search starts are kept. Restricting a domain
+         or adding a constraint only removes solutions, so the next search starts from the kept
+         domains. Widening a domain or removing a constraint starts again from the full domains.
+       * The solutions found are kept, up to ``keep`` of them. Those an edit rules out are dropped,
+         and the rest are yielded straight away by the next :py:meth:`solve`. If every solution
+         was found and the edits since have only removed solutions, no search is needed at all.
+         Otherwise the search runs again, skipping the solutions already yielded.
+
+       Kept solutions come in the order they were found, so after edits that need a search, solutions
+       can come in a different order to :py:func:`amp_constraint_solver.constraint_solver.solve`.
+
+       Range and interval domains are kept as they are, so their values are never listed until
+       an edit removes some of them.
+
+       :param domains: A dict of variable names to lists of possible assignments, :py:class:`amp_constraint_solver.constraint_solver.DomainsType`.
+       :param constraints: A list of :py:class:`amp_constraint_solver.constraint_solver.Constraint` functions to check possible solutions.
+       :param keep: The most solutions to keep between searches.
+       :param options: Keyword arguments as for :py:func:`amp_constraint_solver.constraint_solver.solve`,
+           except ``decompose`` and ``resume``.
+       :raise ValueError: Invalid domains or constraints, or an unsupported option.
+    """
+
+    def __init__(
+        self,
+        domains: DomainsType,
+        constraints: List[Constraint] = [],
+        *,
+        keep: int = 10000,
+        **options,
+    ):
+        for name in ("decompose", "resume"):
+            if options.pop(name, None):
+                raise ValueError(f"{name} isn't supported by a Solver.")
+        _validate_domains_and_constraints(domains, constraints)
+        self.keep = keep
+        self._as_tuples = options.pop("as_tuples", False)
+        self._options = options
+        self._domains = {
+            var: _copy_domain(values) for var, values in domains.items()
+        }
+        self._constraints = list(constraints)
+        self.variables = list(
+            options.get("sorted_function", sorted)(domains.keys())
+        )
+        self._position = {var: i for i, var in enumerate(self.variables)}
+        self._plans: Dict[Tuple[str, ...], _Plan] = {}
+        # The domains left after propagating the constraints before the search, once known.
+        self._reduced: Optional[DomainsType] = None
+        # Solutions known to satisfy the problem as it is, as tuples in the order of the variables.
+        self._known: List[Tuple] = []
+        # Whether the known solutions are all of them.
+        self._complete = False
+
+    @property
+    def domains(self) -> DomainsType:
+        """A copy of the domains of the problem, as edited."""
+        return {
+            var: _copy_domain(values) for var, values in self._domains.items()
+        }
+
+    @property
+    def constraints(self) -> List[Constraint]:
+        """A copy of the constraints of the problem, as edited."""
+        return list(self._constraints)
+
+    def _index_of(self, var: str) -> int:
+        if var not in self._position:
+            raise ValueError(f"{var} is not a known variable.")
+        return self._position[var]
+
+    def restrict(self, var: str, values: Iterable[ValueType]):
+        """Removes the values of a variable's domain that aren't in ``values``.
+
+           :param var: The name of the variable.
+           :param values: The values it may still take. Values not in its domain are ignored.
+           :raise ValueError: An unknown variable.
+        """
+        index = self._index_of(var)
+        allowed = set(values)
+        self._domains[var] = _restricted(self._domains[var], allowed)
+        if self._reduced is not None:
+            self._reduced[var] = _restricted(self._reduced[var], allowed)
+        self._known = [
+            solution for solution in self._known if solution[index] in allowed
+        ]
+
+    def set_domain(self, var: str, values: Domain):
+        """Replaces a variable's domain, which may add values to it.
+
+           :param var: The name of the variable.
+           :param values: Its new domain.
+           :raise ValueError: An unknown variable or an invalid domain.
+        """
+        index = self._index_of(var)
+        _validate_domain(values)
+        domain = self._domains[var]
+        if isinstance(values, (range, Intervals)):
+            if type(values) is type(domain) and values == domain:
+                return
+            # Ranges are only checked against the values kept in the solutions, not listed.
+            allowed: Any = values
+        else:
+            allowed = set(values)
+            kept = _restricted(domain, allowed)
+            if len(kept) == len(values) and all(
+                a == b for a, b in zip(kept, values)
+            ):
+                # Only removing values is a restriction.
+                self.restrict(var, values)
+                return
+        self._domains[var] = _copy_domain(values)
+        self._reduced = None
+        self._known = [
+            solution for solution in self._known if solution[index] in allowed
+        ]
+        self._complete = False
+
+    def add_constraint(self, constraint: Constraint):
+        """Adds a constraint to the problem.
+
+           :param constraint: A :py:class:`amp_constraint_solver.constraint_solver.Constraint`.
+           :raise ValueError: An invalid constraint.
+        """
+        _validate_constraint(constraint, self._domains)
+        self._constraints.append(constraint)
+        self._plans.clear()
+        compiled = [_compile_constraint(constraint)]
+        self._known = [
+            solution
+            for solution in self._known
+            if _check_constraints(
+                dict(zip(self.variables, solution)), compiled
+            )
+        ]
+
+    def remove_constraint(self, constraint: Constraint):
+        """Removes a constraint from the problem.
+
+           :param constraint: A constraint that was passed to or added to the solver.
+           :raise ValueError: The constraint isn't part of the problem.
+        """
+        for i, existing in enumerate(self._constraints):
+            if existing is constraint:
+                del self._constraints[i]
+                break
+        else:
+            raise ValueError(
+                f"{constraint} is not a constraint of the problem."
+            )
+        self._plans.clear()
+        self._reduced = None
+        self._complete = False
+
+    def _start(self):
+        """Starts a search of the problem as it is, or returns None if it has no solutions."""
+        domains = self._domains if self._reduced is None else self._reduced
+        if not all(domains.values()):
+            return None
+        state = _start_search(
+            domains, self._constraints, plans=self._plans, **self._options
+        )
+        if state is not None:
+            self._reduced = {var: state.domain(var) for var in self.variables}
+        return state
+
+    def _output(self, values: Tuple) -> Any:
+        return values if self._as_tuples else dict(zip(self.variables, values))
+
+    def solve(self) -> SolutionGenerator:
+        """
+            A generator function that yields the solutions to the problem as it is.
+
+            :returns: A generator of solutions. :py:data:`amp_constraint_solver.constraint_solver.SolutionGenerator`
+        """
+        known = list(self._known)
+        for values in known:
+            yield self._output(values)
+        if self._complete:
+            return
+        state = self._start()
+        if state is None:
+            self._known, self._complete = [], True
+            return
+        # The search finds the known solutions again, they've already been yielded.
+        yielded: Set[Tuple] = set(known)
+        found = known
+        total = len(known)
+        complete = False
+        try:
+            for _ in _run_search(state):
+                values = state.solution_tuple()
+                if values in yielded:
+                    continue
+                total += 1
+                if len(found) < self.keep:
+                    found.append(values)
+                yield self._output(values)
+            complete = True
+        except SearchLimitExceeded as exceeded:
+            limits = self._options.get("limits")
+            if limits is None or not limits.quiet:
+                raise
+            limits.exceeded = exceeded
+        finally:
+            self._known = found
+            self._complete = complete and total <= self.keep
+
+    def count_solutions(self) -> int:
+        """Counts the solutions to the problem as it is, without building them if they aren't known.
+
+           :returns: The number of solutions.
+        """
+        if self._complete:
+            return len(self._known)
+        state = self._start()
+        if state is None:
+            self._known, self._complete = [], True
+            return 0
+        return sum(_run_search(state, multiply=True))
+
+    def is_satisfiable(self) -> bool:
+        """Checks whether the problem as it is has any solutions.
+
+           :returns: Whether there's a solution.
+        """
+        if self._known or self._complete:
+            return bool(self._known)
+        state = self._start()
+        if state is not None:
+            for _ in _run_search(state, multiply=True):
+                return True
+        self._known, self._complete = [], True
+        return False
@@ -0,0 +1,171 @@
+"""
+Solving many problems that share their constraints and differ in their domains.
+
+Usage of :py:func:`solve_many`:
+
+>>> from amp_constraint_solver import solve_many
+>>> problems = {'first': {'a': [1, 2], 'b': [1, 2]}, 'second': {'a': [1, 2, 3], 'b': [1]}}
+>>> for problem_id, solutions in solve_many(problems, [lambda a, b: a > b]):
+...     print(problem_id, solutions)
+...
+first [{'a': 2, 'b': 1}]
+second [{'a': 2, 'b': 1}, {'a': 3, 'b': 1}]
+
+"""
+from .constraint_solver import (
+    Constraint,
+    DomainsType,
+    SearchLimitExceeded,
+    _Plan,
+    _run_search,
+    _start_search,
+)
+from . import parallel as _parallel
+from typing import (
+    Any,
+    Dict,
+    Hashable,
+    Iterable,
+    Iterator,
+    List,
+    Mapping,
+    Optional,
+    Tuple,
+    Union,
+)
+from concurrent.futures import Future as _Future, as_completed as _as_completed
+from itertools import islice as _islice
+import os as _os
+
+
+__all__ = ["solve_many"]
+
+
+# How many problems to send to a worker process at a time by default.
+_CHUNK_SIZE = 64
+
+# The plans compiled in a worker process, by variable order.
+_worker_plans: Dict[Tuple[str, ...], _Plan] = {}
+
+
+def _solve_problems(
+    problems: Iterable[Tuple[Hashable, DomainsType]],
+    constraints: List[Constraint],
+    options: Dict[str, Any],
+    plans: Dict[Tuple[str, ...], _Plan],
+) -> Iterator[Tuple[Hashable, List[Any]]]:
+    """Yields each problem's id and solutions, compiling the constraints once per variable order."""
+    as_tuples = options.get("as_tuples", False)
+    limit = options.get("limit")
+    limits = options.get("limits")
+    search_options = {
+        name: value
+        for name, value in options.items()
+        if name not in ("as_tuples", "limit")
+    }
+    for problem_id, domains in problems:
+        state = _start_search(
+            domains, constraints, plans=plans, **search_options
+        )
+        solutions: List[Any] = []
+        if state is not None:
+            solution = state.solution_tuple if as_tuples else state.solution
+            try:
+                solutions = [
+                    solution()
+                    for _ in _islice(_run_search(state), limit)
+                ]
+            except SearchLimitExceeded as exceeded:
+                if limits is None or not limits.quiet:
+                    raise
+                # Checkpoints are of a single problem, so can't resume a batch.
+                exceeded.checkpoint = None
+                limits.exceeded = exceeded
+        yield problem_id, solutions
+
+
+def _solve_chunk(
+    chunk: List[Tuple[Hashable, DomainsType]]
+) -> List[Tuple[Hashable, List[Any]]]:
+    """Solves a chunk of problems in a worker process, reusing the plans of earlier chunks."""
+    _, constraints, options = _parallel._worker_problem
+    return list(_solve_problems(chunk, constraints, options, _worker_plans))
+
+
+def _chunks(
+    problems: Iterable[Tuple[Hashable, DomainsType]], size: int
+) -> Iterator[List[Tuple[Hashable, DomainsType]]]:
+    iterator = iter(problems)
+    chunk = list(_islice(iterator, size))
+    while chunk:
+        yield chunk
+        chunk = list(_islice(iterator, size))
+
+
+def solve_many(
+    problems: Union[
+        Mapping[Hashable, DomainsType], Iterable[Tuple[Hashable, DomainsType]]
+    ],
+    constraints: List[Constraint] = [],
+    *,
+    limit: Optional[int] = None,
+    workers: int = None,
+    chunk_size: int = _CHUNK_SIZE,
+    ordered: bool = False,
+    **options,
+) -> Iterator[Tuple[Hashable, List[Any]]]:
+    """
+        Solves many problems with the same constraints, yielding each problem's id with a list
+        of the solutions :py:func:`amp_constraint_solver.constraint_solver.solve` would find.
+
+        The constraints are validated and compiled once for each order of variables, rather than
+        once per problem, so problems with the same variables only have their domains validated.
+
+        With ``workers``, chunks of ``chunk_size`` problems are solved in a pool of worker
+        processes. The constraints are sent to each worker once (see
+        :py:func:`amp_constraint_solver.parallel.parallel_solve`), and each worker compiles them
+        once. Results come as each chunk finishes, unless they're ``ordered``.
+
+        Statistics and limits count the work of every problem, and a quiet limit leaves the
+        problems after it's gone over without solutions. Independent components can't be
+        searched separately, so ``decompose`` isn't supported.
+
+        :param problems: A dict of problem ids to domains, or an iterable of pairs of them.
+        :param constraints: A list of :py:class:`amp_constraint_solver.constraint_solver.Constraint` functions shared by every problem.
+        :param limit: The most solutions to find per problem, or None for all of them.
+        :param workers: The number of worker processes, or None to solve the problems in this process.
+        :param chunk_size: How many problems to send to a worker at a time.
+        :param ordered: Whether to yield results in the order of the problems when using workers.
+        :param options: Keyword arguments as for :py:func:`amp_constraint_solver.constraint_solver.solve`.
+        :returns: An iterator of pairs of problem ids and lists of solutions.
+        :raise ValueError: Invalid domains or constraints, ``decompose``, or statistics, hooks or
+            limits with workers, which couldn't update them.
+        :raise SearchLimitExceeded: The search went over its ``limits``, unless they're quiet.
+    """
+    if options.pop("decompose", False):
+        raise ValueError("Decomposed problems can't be solved in batches.")
+    if isinstance(problems, Mapping):
+        problems = problems.items()
+    options["limit"] = limit
+    if workers is None:
+        yield from _solve_problems(problems, constraints, options, {})
+        return
+
+    if any(options.get(name) for name in ("statistics", "hooks", "limits")):
+        raise ValueError(
+            "Statistics, hooks and limits can't be updated from worker processes."
+        )
+    # The problems' domains are sent with each chunk instead.
+    executor = _parallel._make_executor(
+        ({}, constraints, options), workers or _os.cpu_count() or 1
+    )
+    futures: List[_Future] = []
+    try:
+        futures = [
+            executor.submit(_solve_chunk, chunk)
+            for chunk in _chunks(problems, chunk_size)
+        ]
+        for future in futures if ordered else _as_completed(futures):
+            yield from future.result()
+    finally:
+        _parallel._shutdown(executor, futures)
@@ -0,0 +1,216 @@
+"""
+Finding the best solutions to a problem by branch and bound.
+
+Usage of :py:func:`minimize`:
+
+>>> from amp_constraint_solver import minimize
+>>> for solution in minimize({'a': [1, 2, 3], 'b': [1, 2, 3]}, [lambda a, b: a != b], lambda a, b: 2 * a - b):
+...     print(solution)
+...
+{'a': 1, 'b': 2}
+{'a': 1, 'b': 3}
+
+Each solution yielded is better than the last, so the last is optimal, and callers
+can stop early once a solution is good enough.
+
+.. py:class:: Objective
+
+   Type annotation for a function that's called like a :py:class:`amp_constraint_solver.constraint_solver.Constraint`,
+   but returns the value of a solution rather than bool.
+
+.. py:class:: Bound
+
+   Type annotation for a function that takes the assigned variables of a partial solution as kwargs,
+   and returns a bound of the objective of any solution extending it.
+
+"""
+from .constraint_solver import (
+    solve,
+    scoped,
+    Constraint,
+    DomainsType,
+    SolutionGenerator,
+    _compile_constraint,
+    _validate_constraint,
+    _validate_domains_and_constraints,
+)
+from typing import Any, Callable, List, Optional
+
+
+__all__ = ["minimize", "maximize", "Objective", "Bound"]
+
+
+## Types
+Objective = Callable[..., Any]
+Bound = Callable[..., Any]
+
+
+class _Incumbent:
+    """The value of the best solution found so far, shared by the pruning constraints of a search."""
+
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value: Optional[Any] = None
+
+    def beaten_by(self, value: Any) -> bool:
+        """Whether a value is better than the best solution so far."""
+        return self.value is None or value < self.value
+
+
+def _make_objective_constraint(
+    objective: Objective, variables: List[str], incumbent: _Incumbent
+) -> Constraint:
+    """Creates a constraint that an objective beats the best solution so far,
+       checked as soon as the variables the objective reads are assigned."""
+    compiled = _compile_constraint(objective)
+    call = compiled.call
+    scope = variables if compiled.scope is None else compiled.scope
+
+    @scoped(*scope)
+    def improves(**values) -> bool:
+        return incumbent.beaten_by(call(values))
+
+    return improves
+
+
+def _make_bound_constraint(
+    bound: Bound, variables: List[str], incumbent: _Incumbent
+) -> Constraint:
+    """Creates a constraint that the bound of a partial solution could beat the best solution so far,
+       checked as each variable is assigned."""
+
+    @scoped(*variables, partial=True)
+    def could_improve(**values) -> bool:
+        return incumbent.beaten_by(bound(**values))
+
+    return could_improve
+
+
+def _optimise(
+    domains: DomainsType,
+    constraints: List[Constraint],
+    objective: Objective,
+    bound: Optional[Bound],
+    sign: int,
+    options: dict,
+) -> SolutionGenerator:
+    """Yields solutions that improve on the last, minimizing ``sign * objective``."""
+    # Assert args are valid
+    _validate_domains_and_constraints(domains, constraints)
+    _validate_constraint(objective, domains)
+    if bound is not None and not callable(bound):
+        raise ValueError(f"Bounds must be callable, {bound}")
+
+    variables = list(options.get("sorted_function", sorted)(domains.keys()))
+    incumbent = _Incumbent()
+    call = _compile_constraint(objective).call
+    if sign > 0:
+        signed_objective = objective
+        signed_bound = bound
+    else:
+        signed_objective = _negate(objective)
+        signed_bound = None if bound is None else _negate_bound(bound)
+    pruning = [
+        _make_objective_constraint(signed_objective, variables, incumbent)
+    ]
+    if signed_bound is not None:
+        pruning.append(
+            _make_bound_constraint(signed_bound, variables, incumbent)
+        )
+
+    for solution in solve(domains, list(constraints) + pruning, **options):
+        # Solutions are tuples when solving as_tuples.
+        values = (
+            dict(zip(variables, solution))
+            if isinstance(solution, tuple)
+            else solution
+        )
+        value = sign * call(values)
+        # Solutions combined from independent components may not have been checked against the latest value.
+        if incumbent.beaten_by(value):
+            incumbent.value = value
+            yield solution
+
+
+def _negate(objective: Objective) -> Objective:
+    """Wraps an objective to return the negated value, keeping the variables it's called with."""
+    compiled = _compile_constraint(objective)
+    call = compiled.call
+    if compiled.scope is None:
+        return lambda **values: -call(values)
+
+    @scoped(*compiled.scope)
+    def negated(**values):
+        return -call(values)
+
+    return negated
+
+
+def _negate_bound(bound: Bound) -> Bound:
+    """Wraps a bound to return the negated value."""
+    return lambda **values: -bound(**values)
+
+
+def minimize(
+    domains: DomainsType,
+    constraints: List[Constraint],
+    objective: Objective,
+    *,
+    bound: Bound = None,
+    **options,
+) -> SolutionGenerator:
+    """
+        A generator function that yields solutions with ever lower values of an objective,
+        the last being a solution with the lowest value.
+
+        Subtrees that can't beat the best solution found so far are pruned. The objective
+        is called like a :py:class:`amp_constraint_solver.constraint_solver.Constraint`, so an objective
+        that names its variables is checked as soon as they're assigned, while one that takes
+        ``**kwargs`` is checked once every variable is assigned. A ``bound`` lets subtrees be pruned
+        sooner, it's called with the assigned variables as kwargs, and must return a value no greater
+        than the objective of any solution extending them.
+
+        >>> from amp_constraint_solver import minimize
+        >>> list(minimize({'a': [3, 2, 1], 'b': [3, 2, 1]}, [], lambda a, b: a + b,
+        ...               bound=lambda **assigned: sum(assigned.values())))
+        [{'a': 3, 'b': 3}, {'a': 3, 'b': 2}, {'a': 3, 'b': 1}, {'a': 2, 'b': 1}, {'a': 1, 'b': 1}]
+
+        :param domains: A dict of variable names to lists of possible assignments, :py:class:`amp_constraint_solver.constraint_solver.DomainsType`.
+        :param constraints: A list of :py:class:`amp_constraint_solver.constraint_solver.Constraint` functions to check possible solutions.
+        :param objective: An :py:class:`Objective` returning the value to minimize.
+        :param bound: A :py:class:`Bound` returning a lower bound of the objective of a partial solution.
+        :param options: Keyword arguments passed on to :py:func:`amp_constraint_solver.constraint_solver.solve`.
+        :returns: A generator of improving solutions. :py:data:`amp_constraint_solver.constraint_solver.SolutionGenerator`
+        :raise ValueError: Invalid domains, constraints or objective.
+    """
+    return _optimise(domains, constraints, objective, bound, 1, options)
+
+
+def maximize(
+    domains: DomainsType,
+    constraints: List[Constraint],
+    objective: Objective,
+    *,
+    bound: Bound = None,
+    **options,
+) -> SolutionGenerator:
+    """
+        A generator function that yields solutions with ever higher values of an objective,
+        the last being a solution with the highest value. Like :py:func:`minimize`, except that
+        ``bound`` must return an upper bound of the objective.
+
+        >>> from amp_constraint_solver import maximize
+        >>> solutions = list(maximize({'a': [1, 2, 3], 'b': [1, 2, 3]}, [lambda a, b: a != b], lambda a, b: a * b))
+        >>> solutions[-1]
+        {'a': 2, 'b': 3}
+
+        :param domains: A dict of variable names to lists of possible assignments, :py:class:`amp_constraint_solver.constraint_solver.DomainsType`.
+        :param constraints: A list of :py:class:`amp_constraint_solver.constraint_solver.Constraint` functions to check possible solutions.
+        :param objective: An :py:class:`Objective` returning the value to maximize.
+        :param bound: A :py:class:`Bound` returning an upper bound of the objective of a partial solution.
+        :param options: Keyword arguments passed on to :py:func:`amp_constraint_solver.constraint_solver.solve`.
+        :returns: A generator of improving solutions. :py:data:`amp_constraint_solver.constraint_solver.SolutionGenerator`
+        :raise ValueError: Invalid domains, constraints or objective.
+    """
+    return _optimise(domains, constraints, objective, bound, -1, options)
@@ -0,0 +1,235 @@
+"""
+Solving a problem across a pool of processes.
+
+Usage of :py:func:`parallel_solve`:
+
+>>> from amp_constraint_solver import parallel_solve
+>>> for solution in parallel_solve({'a': [1, 2, 3], 'b': [1, 2, 3]}, [lambda a, b: a > b], workers=2, ordered=True):
+...     print(solution)
+...
+{'a': 2, 'b': 1}
+{'a': 3, 'b': 1}
+{'a': 3, 'b': 2}
+
+"""
+from .constraint_solver import (
+    solve,
+    Constraint,
+    DomainsType,
+    SolutionsType,
+    SolutionGenerator,
+    _compile_constraint,
+    _component_product,
+    _find_components,
+    _fixed_order,
+    _validate_domains_and_constraints,
+)
+from typing import cast as _cast, Any, Dict, Iterator, List, Tuple
+from concurrent.futures import (
+    Future as _Future,
+    ProcessPoolExecutor as _ProcessPoolExecutor,
+    as_completed as _as_completed,
+)
+import multiprocessing as _multiprocessing
+import pickle as _pickle
+import os as _os
+import sys as _sys
+
+
+__all__ = ["parallel_solve"]
+
+
+# How many subtrees to aim for per worker, so that uneven subtrees even out.
+_TASKS_PER_WORKER = 4
+
+# The problem being solved, set once in each worker process by _initialise_worker.
+_worker_problem: Tuple[DomainsType, List[Constraint], Dict[str, Any]]
+
+
+def _initialise_worker(problem):
+    """Unpacks the problem shipped to a worker process."""
+    global _worker_problem
+    if isinstance(problem, bytes):
+        problem = _pickle.loads(problem)
+    _worker_problem = problem
+
+
+def _solve_subtree(prefix: SolutionsType) -> List[Any]:
+    """Solves the part of the problem where the variables in prefix have their given values."""
+    domains, constraints, options = _worker_problem
+    subtree = dict(domains)
+    subtree.update((var, [value]) for var, value in prefix.items())
+    return list(solve(subtree, constraints, **options))
+
+
+def _solve_component(
+    variables: List[str], constraint_indices: List[int]
+) -> List[Any]:
+    """Solves an independent component of the problem, returning its solutions as tuples."""
+    domains, constraints, options = _worker_problem
+    return list(
+        solve(
+            {var: domains[var] for var in variables},
+            [constraints[index] for index in constraint_indices],
+            **dict(
+                options, sorted_function=_fixed_order(variables), as_tuples=True
+            ),
+        )
+    )
+
+
+def _results(future: _Future) -> Iterator:
+    """Iterates over the result of a future once it's needed."""
+    yield from future.result()
+
+
+def _make_executor(
+    problem: Tuple[DomainsType, List[Constraint], Dict[str, Any]],
+    workers: int,
+) -> _ProcessPoolExecutor:
+    """Creates a process pool whose workers each receive the problem once."""
+    try:
+        payload = _pickle.dumps(problem)
+    except (_pickle.PicklingError, AttributeError, TypeError):
+        # Lambdas and closures can't be pickled, but forked workers inherit them.
+        if "fork" not in _multiprocessing.get_all_start_methods():
+            raise ValueError(
+                "Constraints must be picklable to solve in parallel on this platform."
+            )
+        return _ProcessPoolExecutor(
+            workers,
+            mp_context=_multiprocessing.get_context("fork"),
+            initializer=_initialise_worker,
+            initargs=(problem,),
+        )
+    return _ProcessPoolExecutor(
+        workers, initializer=_initialise_worker, initargs=(payload,)
+    )
+
+
+def _shutdown(executor: _ProcessPoolExecutor, futures: List[_Future]):
+    """Shuts a pool down without waiting for the tasks it's running,
+       so a generator closed early returns straight away."""
+    for future in futures:
+        future.cancel()
+    if _sys.version_info >= (3, 9):
+        executor.shutdown(wait=False, cancel_futures=True)
+    else:
+        executor.shutdown(wait=False)
+
+
+def _split(
+    domains: DomainsType,
+    constraints: List[Constraint],
+    variables: List[str],
+    split_depth: int,
+) -> Iterator[SolutionsType]:
+    """Yields the consistent assignments of the first split_depth variables, in search order."""
+    prefix_vars = set(variables[:split_depth])
+    prefix_constraints = []
+    for constraint in constraints:
+        compiled = _compile_constraint(constraint)
+        reads = compiled.args if compiled.scope is None else compiled.scope
+        if prefix_vars.issuperset(reads):
+            prefix_constraints.append(constraint)
+    return _cast(
+        Iterator[SolutionsType],
+        solve(
+            {var: domains[var] for var in variables[:split_depth]},
+            prefix_constraints,
+            sorted_function=lambda keys: variables[:split_depth],
+        ),
+    )
+
+
+def parallel_solve(
+    domains: DomainsType,
+    constraints: List[Constraint] = [],
+    *,
+    workers: int = None,
+    split_depth: int = None,
+    ordered: bool = False,
+    decompose: bool = False,
+    **options,
+) -> SolutionGenerator:
+    """
+        A generator function that yields the same solutions as :py:func:`amp_constraint_solver.constraint_solver.solve`,
+        searching parts of the problem in parallel worker processes.
+
+        The search tree is split by the values of the first ``split_depth`` variables (in the order
+        given by ``sorted_function``), and each consistent assignment of them is solved as a separate task.
+        By default the split is just deep enough to give each worker a few tasks, so that
+        uneven subtrees even out.
+
+        With ``decompose``, a problem made of independent components (see :py:func:`amp_constraint_solver.constraint_solver.solve`)
+        is split into one task per component instead, and their solutions are combined as they're yielded.
+
+        The problem is sent to each worker once. Constraints that can't be pickled, like lambdas,
+        are inherited by forking the workers instead, where the platform supports it.
+        Closing the generator early cancels the tasks that haven't started, and doesn't wait
+        for those still running.
+
+        :param domains: A dict of variable names to lists of possible assignments, :py:class:`amp_constraint_solver.constraint_solver.DomainsType`.
+        :param constraints: A list of :py:class:`amp_constraint_solver.constraint_solver.Constraint` functions to check possible solutions.
+        :param workers: The number of worker processes, defaults to the number of CPUs.
+        :param split_depth: The number of variables whose values the problem is split by.
+        :param ordered: Whether to yield solutions in the order :py:func:`amp_constraint_solver.constraint_solver.solve` would
+            with a static variable order, rather than as soon as each task finishes.
+        :param decompose: Whether to solve independent components of the problem as separate tasks.
+        :param options: Keyword arguments passed on to :py:func:`amp_constraint_solver.constraint_solver.solve`,
+            except ``statistics``, ``hooks`` and ``limits``, which workers can't update.
+        :returns: A generator of solutions. :py:data:`amp_constraint_solver.constraint_solver.SolutionGenerator`
+        :raise ValueError: Invalid domains or constraints, constraints that can't be sent to workers,
+            or statistics, hooks or limits.
+    """
+    # Assert args are valid
+    _validate_domains_and_constraints(domains, constraints)
+    if any(options.get(name) for name in ("statistics", "hooks", "limits")):
+        raise ValueError(
+            "Statistics, hooks and limits can't be updated from worker processes."
+        )
+    workers = workers or _os.cpu_count() or 1
+    variables = list(options.get("sorted_function", sorted)(domains.keys()))
+    if split_depth is None:
+        split_depth = 1
+        tasks = len(domains[variables[0]])
+        while (
+            tasks < workers * _TASKS_PER_WORKER
+            and split_depth < len(variables) - 1
+        ):
+            tasks *= len(domains[variables[split_depth]])
+            split_depth += 1
+    split_depth = max(1, min(split_depth, len(variables)))
+    components = _find_components(variables, constraints) if decompose else []
+
+    executor = _make_executor((domains, constraints, options), workers)
+    futures: List[_Future] = []
+    try:
+        if len(components) > 1:
+            futures = [
+                executor.submit(_solve_component, *component)
+                for component in components
+            ]
+            solutions = _component_product(
+                variables,
+                [
+                    (component_variables, _results(future))
+                    for (component_variables, _), future in zip(
+                        components, futures
+                    )
+                ],
+            )
+            if options.get("as_tuples", False):
+                yield from solutions
+            else:
+                for values in solutions:
+                    yield dict(zip(variables, values))
+            return
+        futures = [
+            executor.submit(_solve_subtree, prefix)
+            for prefix in _split(domains, constraints, variables, split_depth)
+        ]
+        for future in futures if ordered else _as_completed(futures):
+            yield from future.result()
+    finally:
+        _shutdown(executor, futures)
@@ -0,0 +1,455 @@
+"""
+Restarting searches that get stuck, and racing differently configured searches.
+
+A depth first search that makes a bad choice near the root can spend a very long time below it,
+when a search that chose differently would finish quickly. :py:func:`solve_with_restarts` breaks
+ties between variables and values at random, and starts the search again once it's failed
+enough times, keeping what it's learnt. :py:func:`portfolio_solve` runs several configurations
+of it in their own processes, and returns the first solution one of them finds.
+
+Usage of :py:func:`solve_with_restarts`:
+
+>>> from amp_constraint_solver import solve_with_restarts
+>>> solutions = solve_with_restarts({'a': [1, 2, 3], 'b': [1, 2, 3]}, [lambda a, b: a > b], seed=1)
+>>> sorted(solution['a'] for solution in solutions if solution['b'] == 1)
+[2, 3]
+
+"""
+from .constraint_solver import (
+    Constraint,
+    DomainsType,
+    SearchHooks,
+    SearchLimitExceeded,
+    SearchState,
+    SolutionGenerator,
+    ValueOrdering,
+    ValueType,
+    VariableOrdering,
+    _NogoodStore,
+    _Plan,
+    _run_search,
+    _start_search,
+    _validate_domains_and_constraints,
+)
+from .heuristics import domain_over_weighted_degree, minimum_remaining_values
+from typing import (
+    cast as _cast,
+    Any,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Set,
+    Tuple,
+)
+import multiprocessing as _multiprocessing
+import multiprocessing.connection as _connection
+import multiprocessing.context as _context
+import pickle as _pickle
+import random as _random
+
+
+__all__ = ["Luby", "Geometric", "solve_with_restarts", "portfolio_solve"]
+
+
+# How many values each search of a portfolio assigns in its first round, by default.
+_NODE_BUDGET = 1000
+
+
+def _luby(i: int) -> int:
+    """The i-th term of the Luby sequence, counting from 1."""
+    while True:
+        k = 1
+        while (1 << k) - 1 < i:
+            k += 1
+        if (1 << k) - 1 == i:
+            return 1 << (k - 1)
+        i -= (1 << (k - 1)) - 1
+
+
+class Luby:
+    """A restart schedule of ``scale`` times the terms of the Luby sequence, 1, 1, 2, 1, 1, 2, 4, 1, ...
+       failures, which is within a constant factor of the best schedule for any problem.
+
+       >>> from amp_constraint_solver import Luby
+       >>> from itertools import islice
+       >>> list(islice(Luby(10), 8))
+       [10, 10, 20, 10, 10, 20, 40, 10]
+
+       :param scale: The number of failures the first search is allowed.
+    """
+
+    def __init__(self, scale: int = 100):
+        self.scale = scale
+
+    def __repr__(self) -> str:
+        return f"Luby({self.scale})"
+
+    def __iter__(self) -> Iterator[int]:
+        i = 1
+        while True:
+            yield self.scale * _luby(i)
+            i += 1
+
+
+class Geometric:
+    """A restart schedule that allows ``scale`` failures, then ``factor`` times as many each time.
+
+       :param scale: The number of failures the first search is allowed.
+       :param factor: How much the number of failures grows by for each search.
+    """
+
+    def __init__(self, scale: int = 100, factor: float = 1.5):
+        self.scale = scale
+        self.factor = factor
+
+    def __repr__(self) -> str:
+        return f"Geometric({self.scale}, {self.factor})"
+
+    def __iter__(self) -> Iterator[int]:
+        limit = float(self.scale)
+        while True:
+            yield int(limit)
+            limit *= self.factor
+
+
+# The configurations a portfolio races by default.
+_PORTFOLIO: Tuple[Dict[str, Any], ...] = (
+    {},
+    {
+        "propagation": "forward_checking",
+        "variable_ordering": domain_over_weighted_degree,
+    },
+    {
+        "propagation": "forward_checking",
+        "variable_ordering": minimum_remaining_values,
+        "schedule": Geometric(),
+    },
+    {
+        "propagation": "forward_checking",
+        "variable_ordering": domain_over_weighted_degree,
+        "backjumping": True,
+    },
+)
+
+
+class _Restart(Exception):
+    """Raised to abandon a search that's failed as many times as its schedule allows."""
+
+
+class _FailureLimit(SearchHooks):
+    """Restarts a search once it's failed ``limit`` times, before its next value is assigned."""
+
+    def __init__(self):
+        self.limit: Optional[int] = None
+        self.failures = 0
+
+    def on_assign(self, state: SearchState, var: str, value: ValueType):
+        if self.limit is not None and self.failures >= self.limit:
+            raise _Restart()
+
+    def on_constraint_fail(self, state: SearchState, constraint: Constraint):
+        self.failures += 1
+
+
+class _Budget(SearchHooks):
+    """Pauses a search each time it's assigned ``limit`` values in total."""
+
+    def __init__(self):
+        self.limit: Optional[int] = None
+        self.nodes = 0
+
+    def on_assign(self, state: SearchState, var: str, value: ValueType):
+        self.nodes += 1
+        if self.limit is not None and self.nodes >= self.limit:
+            state._pause = True
+
+
+def _random_variables(
+    ordering: Optional[VariableOrdering], random: _random.Random
+) -> VariableOrdering:
+    """Breaks the ties of a variable ordering at random, or chooses at random without one."""
+
+    def choose(state: SearchState, variables: List[str]) -> str:
+        variables = list(variables)
+        random.shuffle(variables)
+        return variables[0] if ordering is None else ordering(state, variables)
+
+    return choose
+
+
+def _random_values(
+    ordering: Optional[ValueOrdering], random: _random.Random
+) -> ValueOrdering:
+    """Tries values in a random order, unless there's a value ordering."""
+
+    def order(state: SearchState, var: str) -> Iterable[ValueType]:
+        if ordering is not None:
+            return ordering(state, var)
+        values = list(state.domain(var))
+        random.shuffle(values)
+        return values
+
+    return order
+
+
+def _restart_search(
+    domains: DomainsType,
+    constraints: List[Constraint],
+    options: Dict[str, Any],
+    extra_hooks: Iterable[SearchHooks] = (),
+) -> Iterator[Optional[Tuple]]:
+    """Searches again each time the schedule's number of failures is reached,
+       yielding each solution once as a tuple, or None when paused by a hook."""
+    options = dict(options)
+    seed = options.pop("seed", 0)
+    schedule = options.pop("schedule", None)
+    limits = iter(Luby() if schedule is None else schedule)
+    if seed is not None:
+        random = _random.Random(seed)
+        options["variable_ordering"] = _random_variables(
+            options.get("variable_ordering"), random
+        )
+        options["value_ordering"] = _random_values(
+            options.get("value_ordering"), random
+        )
+    failures = _FailureLimit()
+    hooks = [failures] + list(extra_hooks)
+    plans: Dict[Tuple[str, ...], _Plan] = {}
+    weights: Optional[List[int]] = None
+    nogoods: Optional[_NogoodStore] = None
+    # Later searches find the solutions of earlier ones again.
+    yielded: Set[Tuple] = set()
+    while True:
+        failures.limit = next(limits, None)
+        failures.failures = 0
+        state = _start_search(
+            domains, constraints, plans=plans, extra_hooks=hooks, **options
+        )
+        if state is None:
+            return
+        # Constraint weights and nogoods hold for the whole problem, so they're carried over.
+        if weights is not None:
+            state.weights[:] = weights
+        if nogoods is None:
+            nogoods = _NogoodStore(state._nogood_limit)
+        state._nogoods = nogoods
+        try:
+            for count in _run_search(state):
+                if not count:
+                    yield None
+                    continue
+                values = state.solution_tuple()
+                if values not in yielded:
+                    yielded.add(values)
+                    yield values
+            return
+        except _Restart:
+            weights = list(state.weights)
+
+
+def solve_with_restarts(
+    domains: DomainsType,
+    constraints: List[Constraint] = [],
+    *,
+    seed: Optional[int] = 0,
+    schedule: Iterable[int] = None,
+    as_tuples: bool = False,
+    **options,
+) -> SolutionGenerator:
+    """
+        A generator function that yields the solutions to a problem, restarting the search
+        each time it's failed as many times as the next number of the ``schedule``.
+
+        Ties between variables chosen by ``variable_ordering``, and between the values of a
+        variable, are broken at random, so each search goes a different way. Without a
+        ``variable_ordering`` variables are chosen at random, and with a ``value_ordering``
+        its order is kept. Failures are counted as for :py:attr:`amp_constraint_solver.constraint_solver.SearchStatistics.failures`.
+
+        Constraint weights are carried over from one search to the next, so
+        :py:func:`amp_constraint_solver.heuristics.domain_over_weighted_degree` keeps learning
+        where the problem is hardest, as are the nogoods learnt with ``backjumping``.
+        Each solution is yielded once, though later searches find it again. Once the schedule
+        runs out the last search runs to the end, and schedules that grow, like :py:class:`Luby`,
+        eventually allow a search enough failures to finish, so every solution is found.
+
+        The searches only depend on the ``seed``, so solutions come in the same order each time.
+
+        :param domains: A dict of variable names to lists of possible assignments, :py:class:`amp_constraint_solver.constraint_solver.DomainsType`.
+        :param constraints: A list of :py:class:`amp_constraint_solver.constraint_solver.Constraint` functions to check possible solutions.
+        :param seed: The seed of the random tie breaking, or None to break ties as :py:func:`amp_constraint_solver.constraint_solver.solve` does.
+        :param schedule: The number of failures allowed for each search, :py:class:`Luby` by default.
+        :param as_tuples: Whether to yield tuples of values instead of dicts.
+        :param options: Keyword arguments as for :py:func:`amp_constraint_solver.constraint_solver.solve`,
+            except ``decompose`` and ``resume``.
+        :returns: A generator of solutions. :py:data:`amp_constraint_solver.constraint_solver.SolutionGenerator`
+        :raise ValueError: Invalid domains or constraints, or an unsupported option.
+        :raise SearchLimitExceeded: The searches went over their ``limits``, unless they're quiet.
+    """
+    for name in ("decompose", "resume"):
+        if options.pop(name, None):
+            raise ValueError(f"{name} isn't supported with restarts.")
+    variables = list(options.get("sorted_function", sorted)(domains.keys()))
+    limits = options.get("limits")
+    searches = _restart_search(
+        domains, constraints, dict(options, seed=seed, schedule=schedule)
+    )
+    try:
+        for values in searches:
+            if values is not None:
+                yield values if as_tuples else dict(zip(variables, values))
+    except SearchLimitExceeded as exceeded:
+        # The checkpoint is only of the last search.
+        exceeded.checkpoint = None
+        if limits is None or not limits.quiet:
+            raise
+        limits.exceeded = exceeded
+
+
+def _portfolio_worker(connection: _connection.Connection, problem):
+    """Runs one configuration of a portfolio, searching until it's assigned the number
+       of values it's sent, then sending back a solution or whether it finished or paused."""
+    if isinstance(problem, bytes):
+        problem = _pickle.loads(problem)
+    domains, constraints, options = problem
+    variables = list(options.get("sorted_function", sorted)(domains.keys()))
+    budget = _Budget()
+    searches = _restart_search(domains, constraints, options, [budget])
+    try:
+        while True:
+            budget.limit = connection.recv()
+            for values in searches:
+                if values is not None:
+                    connection.send(("solution", dict(zip(variables, values))))
+                    return
+                if budget.limit is not None and budget.nodes >= budget.limit:
+                    break
+            else:
+                connection.send(("finished", None))
+                return
+            connection.send(("paused", None))
+    except EOFError:
+        return
+    except Exception as error:
+        connection.send(("error", error))
+
+
+def portfolio_solve(
+    domains: DomainsType,
+    constraints: List[Constraint] = [],
+    configurations: Optional[List[Dict[str, Any]]] = None,
+    *,
+    seed: int = 0,
+    node_budget: int = _NODE_BUDGET,
+    deterministic: bool = True,
+    as_tuples: bool = False,
+    **options,
+) -> Any:
+    """
+        Races configurations of :py:func:`solve_with_restarts` in their own processes,
+        returning the first solution found, or None if the problem has no solutions.
+
+        Each configuration is a dict of keyword arguments for :py:func:`solve_with_restarts`,
+        added to ``options``, and the one at position ``i`` is seeded with ``seed + i``.
+        By default the portfolio has a search without propagation, and searches with
+        forward checking choosing variables by
+        :py:func:`amp_constraint_solver.heuristics.domain_over_weighted_degree` or
+        :py:func:`amp_constraint_solver.heuristics.minimum_remaining_values` with a
+        :py:class:`Geometric` schedule, and with ``backjumping``.
+
+        So that the same solution is returned each time, the searches run in rounds: each assigns
+        up to ``node_budget`` values, then twice as many again each round, and the solution of the
+        first configuration to find one in the earliest round is returned. The searches wait for
+        each other at the end of each round, which costs at most about twice the work of the
+        winner. Without ``deterministic``, the solution first sent back is returned, which is
+        quicker but depends on how the processes were scheduled.
+
+        A search that finishes without a solution proves there isn't one, so the others are stopped.
+        Statistics, hooks and limits can't be updated from the processes, so they aren't supported.
+
+        :param domains: A dict of variable names to lists of possible assignments, :py:class:`amp_constraint_solver.constraint_solver.DomainsType`.
+        :param constraints: A list of :py:class:`amp_constraint_solver.constraint_solver.Constraint` functions to check possible solutions.
+        :param configurations: The configurations to race, or None for the default portfolio.
+        :param seed: The seed of the first configuration.
+        :param node_budget: How many values each search assigns in the first round.
+        :param deterministic: Whether to run in rounds, so the result only depends on the ``seed``.
+        :param as_tuples: Whether to return a tuple of values instead of a dict.
+        :param options: Keyword arguments as for :py:func:`solve_with_restarts` shared by every configuration.
+        :returns: A solution, or None.
+        :raise ValueError: Invalid domains or constraints, an unsupported option, or constraints
+            that can't be sent to another process on this platform.
+    """
+    _validate_domains_and_constraints(domains, constraints)
+    if configurations is None:
+        configurations = list(_PORTFOLIO)
+    problems = []
+    for i, configuration in enumerate(configurations):
+        merged = dict(options, seed=seed + i)
+        merged.update(configuration)
+        for name in ("statistics", "hooks", "limits", "decompose", "resume"):
+            if merged.get(name):
+                raise ValueError(f"{name} isn't supported in a portfolio.")
+        merged.pop("as_tuples", None)
+        problems.append((domains, constraints, merged))
+
+    payloads: List[Any]
+    context: _context.BaseContext
+    try:
+        payloads = [_pickle.dumps(problem) for problem in problems]
+        context = _multiprocessing.get_context()
+    except (_pickle.PicklingError, AttributeError, TypeError):
+        # Lambdas and closures can't be pickled, but forked workers inherit them.
+        if "fork" not in _multiprocessing.get_all_start_methods():
+            raise ValueError(
+                "Constraints must be picklable to solve in parallel on this platform."
+            )
+        payloads = problems
+        context = _multiprocessing.get_context("fork")
+
+    connections: List[_connection.Connection] = []
+    processes = []
+    try:
+        for payload in payloads:
+            connection, worker_connection = context.Pipe()
+            process = context.Process(
+                target=_portfolio_worker,
+                args=(worker_connection, payload),
+                daemon=True,
+            )
+            process.start()
+            worker_connection.close()
+            connections.append(connection)
+            processes.append(process)
+
+        if deterministic:
+            budget = node_budget
+            results: List[Tuple[str, Any]] = []
+            while all(kind == "paused" for kind, _ in results):
+                for connection in connections:
+                    connection.send(budget)
+                results = [connection.recv() for connection in connections]
+                budget *= 2
+            kind, solution = next(
+                result for result in results if result[0] != "paused"
+            )
+        else:
+            for connection in connections:
+                connection.send(None)
+            ready = _cast(
+                _connection.Connection, _connection.wait(connections)[0]
+            )
+            kind, solution = ready.recv()
+        if kind == "error":
+            raise solution
+    finally:
+        for connection in connections:
+            connection.close()
+        for process in processes:
+            process.terminate()
+            process.join()
+
+    if solution is None or not as_tuples:
+        return solution
+    variables = options.get("sorted_function", sorted)(domains.keys())
+    return tuple(solution[var] for var in variables)
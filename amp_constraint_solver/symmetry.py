@@ -0,0 +1,505 @@
+"""
+Searching for one solution of each set of solutions that are the same up to a symmetry.
+
+Problems often have interchangeable parts, like identical machines, staff with the same skills,
+or colours that could be swapped for each other. Every solution then has many equivalent ones,
+one for each way of swapping the parts (its orbit), and the search finds them all.
+A symmetry is declared as :py:class:`InterchangeableVariables` or :py:class:`InterchangeableValues`,
+or found by :py:func:`detect_symmetries`, and :py:func:`symmetry_breakers` adds constraints so only
+one solution of each orbit is searched for. :py:func:`expand_solutions` gives the rest back.
+
+Usage of :py:func:`solve_up_to_symmetry`:
+
+>>> from amp_constraint_solver import solve_up_to_symmetry, AllDifferent
+>>> domains = {'a': [1, 2, 3], 'b': [1, 2, 3]}
+>>> list(solve_up_to_symmetry(domains, [AllDifferent(['a', 'b'])]))
+[{'a': 1, 'b': 2}]
+>>> len(list(solve_up_to_symmetry(domains, [AllDifferent(['a', 'b'])], expand=True)))
+6
+
+"""
+from .constraint_solver import (
+    Constraint,
+    DomainsType,
+    SolutionGenerator,
+    ValueType,
+    _compile_constraint,
+    scoped,
+    solve,
+)
+from .builtin_constraints import AllDifferent, Linear
+from .builtin_constraints import no_duplicate_values_constraint
+from typing import (
+    Any,
+    Callable,
+    Collection,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    NamedTuple,
+    Optional,
+    Sequence,
+    Set,
+    Tuple,
+    Union,
+)
+from collections import Counter as _Counter
+
+
+__all__ = [
+    "InterchangeableVariables",
+    "InterchangeableValues",
+    "detect_symmetries",
+    "symmetry_breakers",
+    "expand_solutions",
+    "solve_up_to_symmetry",
+]
+
+
+class InterchangeableVariables(NamedTuple):
+    """Declares that any two groups of variables can swap their values, and a solution stays a solution.
+
+       For the 4 queens problem, the pieces ``[('x1', 'y1'), ('x2', 'y2'), ('x3', 'y3'), ('x4', 'y4')]``.
+       The variables in the same position of each group must have the same domain.
+
+       :ivar groups: The groups of variables, each a sequence of names, or a name for groups of one variable.
+    """
+
+    groups: Sequence[Union[str, Sequence[str]]]
+
+
+class InterchangeableValues(NamedTuple):
+    """Declares that values can be swapped for each other in the values of some variables,
+       and a solution stays a solution, like the colours of a map.
+
+       Every value must be in the domain of every variable, in the same order.
+
+       :ivar variables: The variables the values are swapped in.
+       :ivar values: The values that can be swapped.
+    """
+
+    variables: Sequence[str]
+    values: Collection[Any]
+
+
+Symmetry = Union[InterchangeableVariables, InterchangeableValues]
+
+# Parts of a builtin constraint that permuting variables maps to each other,
+# each some variables and what else the constraint ties to them.
+_Parts = Tuple[Tuple[Tuple[str, ...], Any], ...]
+
+# Kinds of builtin constraints that hold whatever values are swapped for each other.
+_VALUE_SYMMETRIC = ("AllDifferent", "make_vars_not_equal_constraint")
+
+
+def _groups_of(symmetry: InterchangeableVariables) -> List[Tuple[str, ...]]:
+    return [
+        (group,) if isinstance(group, str) else tuple(group)
+        for group in symmetry.groups
+    ]
+
+
+def _shape(
+    constraint: Constraint, variables: Sequence[str]
+) -> Optional[Tuple[str, Any, _Parts]]:
+    """Describes a builtin constraint as its kind, its other parameters and its parts,
+       or returns None for constraints that aren't known to have symmetries."""
+    if constraint is no_duplicate_values_constraint:
+        return ("AllDifferent", None, tuple(((v,), None) for v in variables))
+    if isinstance(constraint, AllDifferent):
+        parts = tuple(((v,), None) for v in constraint.scope)
+        return ("AllDifferent", None, parts)
+    if isinstance(constraint, Linear):
+        parts = tuple(
+            ((v,), coefficient)
+            for v, coefficient in zip(
+                constraint.scope, constraint.coefficients
+            )
+        )
+        return ("Linear", (constraint.op, constraint.rhs), parts)
+    key = getattr(constraint, "cache_key", None)
+    if not isinstance(key, tuple) or not key:
+        return None
+    if key[0] == "make_vars_not_equal_constraint":
+        return (key[0], None, (((key[1],), None), ((key[2],), None)))
+    if key[0] == "make_vars_not_diagonal_on_grid_constraint":
+        return (key[0], None, ((key[1:3], None), (key[3:5], None)))
+    return None
+
+
+def _permuted(
+    shape: Tuple[str, Any, _Parts], mapping: Dict[str, str]
+) -> Tuple[str, Any, frozenset]:
+    """A shape with its variables mapped, comparable whatever the order of its parts."""
+    kind, parameters, parts = shape
+    return (
+        kind,
+        parameters,
+        frozenset(
+            (tuple(mapping.get(v, v) for v in group), other)
+            for group, other in parts
+        ),
+    )
+
+
+def detect_symmetries(
+    domains: DomainsType, constraints: List[Constraint]
+) -> List[Symmetry]:
+    """Finds symmetries of a problem that only has builtin constraints, see :py:mod:`amp_constraint_solver.builtin_constraints`.
+
+       Variables are interchangeable if swapping them maps the constraints to themselves,
+       as do the points of :py:func:`amp_constraint_solver.builtin_constraints.make_vars_not_diagonal_on_grid_constraint`
+       constraints. Values are interchangeable if every constraint is an
+       :py:class:`amp_constraint_solver.builtin_constraints.AllDifferent`, a
+       :py:func:`amp_constraint_solver.builtin_constraints.no_duplicate_values_constraint`
+       or from :py:func:`amp_constraint_solver.builtin_constraints.make_vars_not_equal_constraint`,
+       for the values in every domain. Variables read by other constraints aren't swapped.
+
+       :param domains: A dict of variable names to lists of possible assignments, :py:class:`amp_constraint_solver.constraint_solver.DomainsType`.
+       :param constraints: A list of :py:class:`amp_constraint_solver.constraint_solver.Constraint` functions.
+       :returns: The symmetries found, which may be none.
+    """
+    variables = sorted(domains)
+    shapes = []
+    fixed: Set[str] = set()
+    value_symmetric = bool(constraints)
+    for constraint in constraints:
+        shape = _shape(constraint, variables)
+        value_symmetric = value_symmetric and (
+            shape is not None and shape[0] in _VALUE_SYMMETRIC
+        )
+        if shape is None:
+            compiled = _compile_constraint(constraint)
+            if compiled.scope is None and compiled.takes_kwargs:
+                return []
+            fixed.update(
+                compiled.args if compiled.scope is None else compiled.scope
+            )
+        else:
+            shapes.append(shape)
+    counts = _Counter(_permuted(shape, {}) for shape in shapes)
+
+    def swappable(first: Tuple[str, ...], second: Tuple[str, ...]) -> bool:
+        if set(first) & set(second) or any(
+            domains[a] != domains[b] for a, b in zip(first, second)
+        ):
+            return False
+        mapping = dict(zip(first, second))
+        mapping.update(zip(second, first))
+        return counts == _Counter(
+            _permuted(shape, mapping) for shape in shapes
+        )
+
+    # Candidates are single variables, then the points of diagonal constraints.
+    candidates: List[Tuple[str, ...]] = [(v,) for v in variables]
+    for kind, _, parts in shapes:
+        if kind == "make_vars_not_diagonal_on_grid_constraint":
+            candidates.extend(
+                group for group, _ in parts if group not in candidates
+            )
+    # Swaps with the first group of a class generate every swap in it.
+    classes: List[List[Tuple[str, ...]]] = []
+    for group in candidates:
+        if fixed.intersection(group):
+            continue
+        for members in classes:
+            if len(members[0]) == len(group) and swappable(members[0], group):
+                members.append(group)
+                break
+        else:
+            classes.append([group])
+    symmetries: List[Symmetry] = [
+        InterchangeableVariables(members)
+        for members in classes
+        if len(members) > 1
+    ]
+
+    if value_symmetric:
+        common = [
+            value
+            for value in domains[variables[0]]
+            if all(value in domains[var] for var in variables)
+        ]
+        orders = {
+            tuple(value for value in domains[var] if value in common)
+            for var in variables
+        }
+        if len(common) > 1 and len(orders) == 1:
+            symmetries.append(InterchangeableValues(variables, common))
+    return symmetries
+
+
+def _lex_breaker(
+    first: Tuple[str, ...],
+    second: Tuple[str, ...],
+    position: Dict[str, int],
+    ranks: Dict[str, Dict[ValueType, int]],
+) -> Constraint:
+    """A constraint that the solution comes no later than the one with two groups swapped,
+       comparing values in the variable order by their positions in their domains."""
+    swap = dict(zip(first, second))
+    swap.update(zip(second, first))
+    variables = sorted(swap, key=position.__getitem__)
+
+    @scoped(*variables, partial=True)
+    def lex_leader(**values) -> bool:
+        for var in variables:
+            other = swap[var]
+            if var not in values or other not in values:
+                return True
+            rank = ranks[var]
+            if values[var] != values[other]:
+                return rank[values[var]] < rank[values[other]]
+        return True
+
+    setattr(
+        lex_leader, "cache_key", ("lex_leader", tuple(first), tuple(second))
+    )
+    return lex_leader
+
+
+def _precedence_breaker(
+    variables: List[str], values: List[ValueType]
+) -> Constraint:
+    """A constraint that each value is only used once the ones before it have been,
+       in the variable order."""
+    rank = {value: i for i, value in enumerate(values)}
+
+    @scoped(*variables, partial=True)
+    def value_precedence(**assigned) -> bool:
+        following = 0
+        for var in variables:
+            if var not in assigned:
+                return True
+            i = rank.get(assigned[var])
+            if i is not None:
+                if i > following:
+                    return False
+                if i == following:
+                    following += 1
+        return True
+
+    setattr(
+        value_precedence,
+        "cache_key",
+        ("value_precedence", tuple(variables), tuple(values)),
+    )
+    return value_precedence
+
+
+def _validate_symmetry(
+    domains: DomainsType, symmetry: Symmetry
+) -> List[Any]:
+    """Checks a symmetry's variables and values fit the domains,
+       returning the values in the order of the domains for value symmetries."""
+    if isinstance(symmetry, InterchangeableVariables):
+        groups = _groups_of(symmetry)
+        names = [var for group in groups for var in group]
+        if len(set(names)) != len(names):
+            raise ValueError(f"Groups can't share variables. {symmetry}")
+        if len({len(group) for group in groups}) > 1:
+            raise ValueError(f"Groups must be the same size. {symmetry}")
+        for var in names:
+            if var not in domains:
+                raise ValueError(f"{var} is not a known variable.")
+        for group in groups[1:]:
+            for a, b in zip(groups[0], group):
+                if domains[a] != domains[b]:
+                    raise ValueError(
+                        f"{a} and {b} can't be interchangeable, their domains differ."
+                    )
+        return []
+    if not symmetry.variables:
+        return []
+    for var in symmetry.variables:
+        if var not in domains:
+            raise ValueError(f"{var} is not a known variable.")
+    orders = {
+        tuple(value for value in domains[var] if value in symmetry.values)
+        for var in symmetry.variables
+    }
+    values = list(orders.pop())
+    if orders or len(values) != len(set(symmetry.values)):
+        raise ValueError(
+            f"Interchangeable values must be in every domain in the same order. {symmetry}"
+        )
+    return values
+
+
+def symmetry_breakers(
+    domains: DomainsType,
+    symmetries: List[Symmetry],
+    *,
+    sorted_function=sorted,
+) -> List[Constraint]:
+    """Builds constraints that only a representative of each orbit of solutions satisfies.
+
+       The representative is the first solution of the orbit when solutions are compared
+       variable by variable in the order given by ``sorted_function``, and values by their
+       position in their domains. Interchangeable groups of variables are kept in order,
+       and interchangeable values are used in order. The breakers are partial constraints,
+       so they prune the search once the variables they compare have been assigned, which is
+       soonest when variables are assigned in the order given by ``sorted_function``.
+
+       :param domains: A dict of variable names to lists of possible assignments, :py:class:`amp_constraint_solver.constraint_solver.DomainsType`.
+       :param symmetries: The :py:class:`InterchangeableVariables` and :py:class:`InterchangeableValues` of the problem.
+       :param sorted_function: As for :py:func:`amp_constraint_solver.constraint_solver.solve`.
+       :returns: The constraints to add to the problem's.
+       :raise ValueError: A symmetry of unknown variables, or that doesn't fit the domains.
+    """
+    position = {var: i for i, var in enumerate(sorted_function(domains))}
+    ranks = {
+        var: {value: i for i, value in enumerate(domain)}
+        for var, domain in domains.items()
+    }
+    breakers: List[Constraint] = []
+    for symmetry in symmetries:
+        values = _validate_symmetry(domains, symmetry)
+        if isinstance(symmetry, InterchangeableVariables):
+            groups = sorted(
+                _groups_of(symmetry),
+                key=lambda group: min(map(position.__getitem__, group)),
+            )
+            breakers.extend(
+                _lex_breaker(first, second, position, ranks)
+                for first, second in zip(groups, groups[1:])
+            )
+        elif len(values) > 1:
+            variables = sorted(symmetry.variables, key=position.__getitem__)
+            breakers.append(_precedence_breaker(variables, values))
+    return breakers
+
+
+def _swaps(
+    domains: DomainsType, symmetries: List[Symmetry], variables: List[str]
+) -> List[Callable[[Tuple], Tuple]]:
+    """Functions that swap two groups or two values of a solution tuple,
+       which between them make every permutation the symmetries allow."""
+    position = {var: i for i, var in enumerate(variables)}
+    swaps: List[Callable[[Tuple], Tuple]] = []
+    for symmetry in symmetries:
+        values = _validate_symmetry(domains, symmetry)
+        if isinstance(symmetry, InterchangeableVariables):
+            groups = _groups_of(symmetry)
+            for first, second in zip(groups, groups[1:]):
+                order = list(range(len(variables)))
+                for a, b in zip(first, second):
+                    order[position[a]] = position[b]
+                    order[position[b]] = position[a]
+                swaps.append(_reorder(order))
+        else:
+            changed = {position[var] for var in symmetry.variables}
+            for a, b in zip(values, values[1:]):
+                mapping = {a: b, b: a}
+                swaps.append(_replace_values(mapping, changed))
+    return swaps
+
+
+def _reorder(order: List[int]) -> Callable[[Tuple], Tuple]:
+    """A function that puts the values of a solution tuple in a new order."""
+    return lambda solution: tuple(solution[i] for i in order)
+
+
+def _replace_values(
+    mapping: Dict[Any, Any], changed: Set[int]
+) -> Callable[[Tuple], Tuple]:
+    """A function that replaces the values of a solution tuple at some positions."""
+    return lambda solution: tuple(
+        mapping.get(value, value) if i in changed else value
+        for i, value in enumerate(solution)
+    )
+
+
+def expand_solutions(
+    solutions: Iterable[Any],
+    domains: DomainsType,
+    symmetries: List[Symmetry],
+    *,
+    sorted_function=sorted,
+    as_tuples: bool = False,
+) -> Iterator[Any]:
+    """Yields every solution in the orbits of the representatives found with :py:func:`symmetry_breakers`.
+
+       Each orbit is yielded in order, straight after its representative. If the breakers leave
+       more than one representative of an orbit, it's only expanded from its first, so no
+       solution is yielded twice. Orbits can be large, up to the factorial of the number of
+       interchangeable groups or values.
+
+       :param solutions: The representatives, as dicts or as tuples in the order given by ``sorted_function``.
+       :param domains: A dict of variable names to lists of possible assignments, :py:class:`amp_constraint_solver.constraint_solver.DomainsType`.
+       :param symmetries: The symmetries the representatives were found with.
+       :param sorted_function: As for :py:func:`amp_constraint_solver.constraint_solver.solve`.
+       :param as_tuples: Whether the representatives are tuples, and to yield tuples.
+       :returns: An iterator of solutions.
+       :raise ValueError: A symmetry of unknown variables, or that doesn't fit the domains.
+    """
+    variables = list(sorted_function(domains))
+    swaps = _swaps(domains, symmetries, variables)
+    ranks = [
+        {value: i for i, value in enumerate(domains[var])} for var in variables
+    ]
+
+    def order(solution: Tuple) -> Tuple[int, ...]:
+        return tuple(rank[value] for rank, value in zip(ranks, solution))
+
+    for solution in solutions:
+        start = (
+            tuple(solution)
+            if as_tuples
+            else tuple(solution[var] for var in variables)
+        )
+        orbit = {start}
+        frontier = [start]
+        while frontier:
+            current = frontier.pop()
+            for swap in swaps:
+                image = swap(current)
+                if image not in orbit:
+                    orbit.add(image)
+                    frontier.append(image)
+        ordered = sorted(orbit, key=order)
+        if ordered[0] != start:
+            # The orbit's first solution satisfies the breakers too, it's expanded from that.
+            continue
+        for values in ordered:
+            yield values if as_tuples else dict(zip(variables, values))
+
+
+def solve_up_to_symmetry(
+    domains: DomainsType,
+    constraints: List[Constraint] = [],
+    symmetries: Optional[List[Symmetry]] = None,
+    *,
+    expand: bool = False,
+    **options,
+) -> SolutionGenerator:
+    """
+        A generator function that yields a solution of each orbit of solutions to a problem,
+        searching with :py:func:`symmetry_breakers` added to its constraints.
+
+        :param domains: A dict of variable names to lists of possible assignments, :py:class:`amp_constraint_solver.constraint_solver.DomainsType`.
+        :param constraints: A list of :py:class:`amp_constraint_solver.constraint_solver.Constraint` functions to check possible solutions.
+        :param symmetries: The symmetries of the problem, or None to use :py:func:`detect_symmetries`.
+        :param expand: Whether to yield every solution, each orbit after its representative, see :py:func:`expand_solutions`.
+        :param options: Keyword arguments as for :py:func:`amp_constraint_solver.constraint_solver.solve`.
+        :returns: A generator of solutions. :py:data:`amp_constraint_solver.constraint_solver.SolutionGenerator`
+        :raise ValueError: Invalid domains, constraints or symmetries.
+    """
+    if symmetries is None:
+        symmetries = detect_symmetries(domains, constraints)
+    sorted_function = options.get("sorted_function", sorted)
+    breakers = symmetry_breakers(
+        domains, symmetries, sorted_function=sorted_function
+    )
+    solutions = solve(domains, list(constraints) + breakers, **options)
+    if not expand:
+        yield from solutions
+        return
+    yield from expand_solutions(
+        solutions,
+        domains,
+        symmetries,
+        sorted_function=sorted_function,
+        as_tuples=options.get("as_tuples", False),
+    )
@@ -0,0 +1,262 @@
+"""Contains tests for solving from an asyncio event loop."""
+
+import unittest
+import asyncio
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from amp_constraint_solver.constraint_solver import *
+from amp_constraint_solver.builtin_constraints import *
+from amp_constraint_solver.asynchronous import *
+from amp_constraint_solver.test_constraint_solver import (
+    make_4_queens_problem,
+    make_map_colouring_problem,
+)
+
+
+async def collect(solutions):
+    """Reads every solution of an asynchronous generator into a list."""
+    return [solution async for solution in solutions]
+
+
+def make_queens_problem(n):
+    """Builds an n queens problem with queen i in column i, so only rows are searched for."""
+    domains = {}
+    constraints = []
+    for i in range(n):
+        domains[f"x{i}"] = [i]
+        domains[f"y{i}"] = list(range(n))
+        for j in range(i):
+            constraints.append(
+                make_vars_not_equal_constraint(f"y{i}", f"y{j}")
+            )
+            constraints.append(
+                make_vars_not_diagonal_on_grid_constraint(
+                    f"x{i}", f"y{i}", f"x{j}", f"y{j}"
+                )
+            )
+    return domains, constraints
+
+
+class AsyncSolveTests(unittest.TestCase):
+    def test_matches_solve(self):
+        """A test that solving in the event loop's thread yields the same solutions as solve."""
+        domains, constraints = make_4_queens_problem()
+        for options in [
+            {},
+            {"propagation": "forward_checking", "as_tuples": True},
+            {"backjumping": True, "yield_nodes": 1},
+        ]:
+            expected = list(
+                solve(
+                    domains,
+                    constraints,
+                    **{
+                        name: value
+                        for name, value in options.items()
+                        if name != "yield_nodes"
+                    },
+                )
+            )
+            solutions = asyncio.run(
+                collect(async_solve(domains, constraints, **options))
+            )
+            assert solutions == expected, options
+
+    def test_yields_to_event_loop(self):
+        """A test that other tasks run while a long search is in progress."""
+        domains, constraints = make_map_colouring_problem()
+        domains = dict(domains, **{f"x{i}": [0, 1, 2] for i in range(6)})
+        ticks = []
+
+        async def tick():
+            while True:
+                ticks.append(None)
+                await asyncio.sleep(0)
+
+        async def main():
+            ticker = asyncio.ensure_future(tick())
+            solutions = await collect(
+                async_solve(domains, constraints, yield_nodes=50)
+            )
+            ticker.cancel()
+            return solutions
+
+        solutions = asyncio.run(main())
+        assert len(solutions) == 18 * 3 ** 6
+        assert len(ticks) > 100, f"The loop only ran {len(ticks)} times."
+
+    def test_yields_while_values_fail(self):
+        """A test that other tasks run, and the task can be cancelled, while every value fails."""
+        domains = {"a": list(range(20000)), "b": [0, 1]}
+        constraints = [lambda a: a < 0]
+        for options in [{}, {"backjumping": True}]:
+            ticks = []
+
+            async def tick():
+                while True:
+                    ticks.append(None)
+                    await asyncio.sleep(0)
+
+            async def main():
+                ticker = asyncio.ensure_future(tick())
+                solutions = await collect(
+                    async_solve(
+                        domains, constraints, yield_nodes=100, **options
+                    )
+                )
+                ticker.cancel()
+                task = asyncio.ensure_future(
+                    collect(async_solve(domains, constraints, **options))
+                )
+                await asyncio.sleep(0)
+                task.cancel()
+                try:
+                    await task
+                except asyncio.CancelledError:
+                    return solutions, True
+                return solutions, False
+
+            solutions, cancelled = asyncio.run(main())
+            assert solutions == [], options
+            assert len(ticks) > 100, f"The loop only ran {len(ticks)} times."
+            assert cancelled, "The task should have been cancelled."
+
+    def test_cancel(self):
+        """A test that cancelling the task reading solutions stops the search."""
+        domains, constraints = make_map_colouring_problem()
+        # Two colours can't colour a triangle, so no solution is ever found.
+        domains = {var: ["red", "green"] for var in domains}
+        domains.update({f"x{i}": list(range(10)) for i in range(8)})
+        statistics = SearchStatistics()
+
+        async def main():
+            task = asyncio.ensure_future(
+                collect(
+                    async_solve(
+                        domains,
+                        constraints,
+                        statistics=statistics,
+                        sorted_function=lambda variables: sorted(
+                            variables, reverse=True
+                        ),
+                        yield_nodes=10,
+                    )
+                )
+            )
+            await asyncio.sleep(0.05)
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                return True
+            return False
+
+        assert asyncio.run(main()), "The task should have been cancelled."
+        nodes = statistics.nodes
+        assert nodes > 0, statistics
+        time.sleep(0.05)
+        assert statistics.nodes == nodes, "The search should have stopped."
+
+    def test_thread_executor(self):
+        """A test that solutions stream from a worker thread in order, and that the thread stops
+           once the generator is closed."""
+        domains, constraints = make_queens_problem(8)
+        full = SearchStatistics()
+        expected = list(solve(domains, constraints, statistics=full))
+        statistics = SearchStatistics()
+
+        async def first(count):
+            solutions = async_solve(
+                domains,
+                constraints,
+                executor=executor,
+                queue_size=1,
+                statistics=statistics,
+            )
+            found = []
+            async for solution in solutions:
+                found.append(solution)
+                if len(found) == count:
+                    break
+            await solutions.aclose()
+            return found
+
+        with ThreadPoolExecutor(1) as executor:
+            solutions = asyncio.run(
+                collect(async_solve(domains, constraints, executor=executor))
+            )
+            assert solutions == expected
+            assert asyncio.run(first(2)) == expected[:2]
+        nodes = statistics.nodes
+        assert (
+            nodes < full.nodes / 4
+        ), "The queue should hold the thread back."
+
+        async def invalid():
+            return await collect(
+                async_solve({"x": [1]}, [lambda z: True], executor=executor)
+            )
+
+        with ThreadPoolExecutor(1) as executor:
+            self.assertRaises(ValueError, lambda: asyncio.run(invalid()))
+
+    def test_process_executor(self):
+        """A test that a search split into chunks across worker processes finds every solution in order."""
+        # A 3 by 3 magic square, built from constraints that can be pickled.
+        cells = [f"r{row}c{column}" for row in range(3) for column in range(3)]
+        domains = {var: list(range(1, 10)) for var in cells}
+        lines = [cells[i : i + 3] for i in (0, 3, 6)]
+        lines += [cells[i::3] for i in range(3)]
+        lines += [cells[::4], cells[2:7:2]]
+        constraints = [AllDifferent(cells)]
+        constraints += [Sum(line, "==", 15) for line in lines]
+        expected = list(
+            solve(
+                domains,
+                constraints,
+                as_tuples=True,
+                propagation="forward_checking",
+            )
+        )
+        assert len(expected) == 8, expected
+        with ProcessPoolExecutor(2) as executor:
+            solutions = asyncio.run(
+                collect(
+                    async_solve(
+                        domains,
+                        constraints,
+                        executor=executor,
+                        chunk_nodes=40,
+                        as_tuples=True,
+                        propagation="forward_checking",
+                    )
+                )
+            )
+            assert solutions == expected
+
+            async def with_statistics():
+                return await collect(
+                    async_solve(
+                        domains,
+                        constraints,
+                        executor=executor,
+                        statistics=SearchStatistics(),
+                    )
+                )
+
+            self.assertRaises(
+                ValueError, lambda: asyncio.run(with_statistics())
+            )
+
+    def test_decompose_not_supported(self):
+        """A test that asking to decompose a problem raises an error."""
+        self.assertRaises(
+            ValueError,
+            lambda: asyncio.run(
+                collect(async_solve({"x": [1]}, decompose=True))
+            ),
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
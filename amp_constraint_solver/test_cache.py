@@ -0,0 +1,178 @@
+"""Contains tests for caching the solutions of problems."""
+
+import unittest
+import os
+import sqlite3
+import tempfile
+from contextlib import closing
+from amp_constraint_solver.constraint_solver import *
+from amp_constraint_solver.builtin_constraints import *
+from amp_constraint_solver.heuristics import *
+from amp_constraint_solver.cache import *
+from amp_constraint_solver.test_constraint_solver import (
+    make_4_queens_problem,
+    make_map_colouring_problem,
+)
+
+
+class SolutionCacheTests(unittest.TestCase):
+    def test_fingerprint(self):
+        """A test that fingerprints identify problems by their domains and constraint keys,
+           and refuse constraints that can't be identified."""
+        domains, constraints = make_map_colouring_problem()
+        key = fingerprint(domains, constraints)
+        assert key == fingerprint(dict(domains), list(reversed(constraints)))
+        assert key != fingerprint(dict(domains, t=["red"]), constraints)
+        assert key != fingerprint(domains, constraints[1:])
+        assert fingerprint(
+            {"a": [1, 2, 3], "b": [1, 2, 3]},
+            [TableConstraint(["a", "b"], [(1, 2), (2, 3)])],
+        ) != fingerprint(
+            {"a": [1, 2, 3], "b": [1, 2, 3]},
+            [TableConstraint(["a", "b"], [(1, 2), (3, 3)])],
+        )
+        assert fingerprint(
+            {"a": [1, 2], "b": [1, 2]}, [Sum(["a", "b"], "==", 3)]
+        ) == fingerprint(
+            {"a": [1, 2], "b": [1, 2]}, [Linear([1, 1], ["a", "b"], "==", 3)]
+        )
+        less = keyed("less")(lambda a, b: a < b)
+        other_less = keyed("less")(lambda b, c: b < c)
+        domains = {"a": [1, 2], "b": [1, 2], "c": [1, 2]}
+        assert fingerprint(domains, [less]) != fingerprint(
+            domains, [other_less]
+        ), "Keyed constraints are told apart by the variables they read."
+        assert fingerprint(domains, [no_duplicate_values_constraint])
+        self.assertRaises(
+            ValueError, lambda: fingerprint(domains, [lambda a, b: a < b])
+        )
+
+    def test_fingerprint_objects(self):
+        """A test that bound methods and callable objects, which depend on their object,
+           need a key, so differently made ones aren't mistaken for each other."""
+
+        class Offset:
+            def __init__(self, offset):
+                self.offset = offset
+
+            def __call__(self, a, b):
+                return a + self.offset < b
+
+            def less(self, a, b):
+                return self(a, b)
+
+        domains = {"a": [1, 2], "b": [1, 2]}
+        for constraint in (Offset(0).less, Offset(1).less, Offset(0)):
+            self.assertRaises(
+                ValueError, lambda: fingerprint(domains, [constraint])
+            )
+        first, second = [
+            keyed(("offset", offset))(Offset(offset)) for offset in (0, 1)
+        ]
+        assert fingerprint(domains, [first]) != fingerprint(domains, [second])
+        cache = SolutionCache()
+        assert cache.count_solutions(domains, [first]) == 1
+        assert cache.count_solutions(domains, [second]) == 0
+
+    def test_reuses_solutions(self):
+        """A test that solving a problem again yields the same solutions without searching."""
+        domains, constraints = make_4_queens_problem()
+        expected = list(solve(domains, constraints))
+        cache = SolutionCache()
+        assert list(cache.solve(domains, constraints)) == expected
+        statistics = SearchStatistics()
+        assert (
+            list(cache.solve(domains, constraints, statistics=statistics))
+            == expected
+        )
+        assert statistics.nodes == 0, statistics
+        assert list(cache.solve(domains, constraints, as_tuples=True)) == list(
+            solve(domains, constraints, as_tuples=True)
+        )
+        assert (cache.hits, cache.misses) == (2, 1)
+        assert cache.count_solutions(domains, constraints) == len(expected)
+        assert cache.is_satisfiable(domains, constraints)
+        assert cache.misses == 1, "The count was known from solving."
+
+        # A different order of solutions can't reuse them, but still knows the count.
+        options = {
+            "propagation": "forward_checking",
+            "variable_ordering": minimum_remaining_values,
+        }
+        solutions = list(cache.solve(domains, constraints, **options))
+        assert solutions == list(solve(domains, constraints, **options))
+        assert cache.misses == 2
+        assert list(cache.solve(domains, constraints, **options)) == solutions
+        assert cache.misses == 2
+
+    def test_keeps_first_solutions(self):
+        """A test that only the first solutions are kept, and the rest are searched for again."""
+        domains, constraints = make_4_queens_problem()
+        expected = list(solve(domains, constraints))
+        cache = SolutionCache(keep=5)
+        solutions = cache.solve(domains, constraints)
+        assert [next(solutions) for _ in range(3)] == expected[:3]
+        solutions.close()
+        assert cache.count_solutions(domains, constraints) == len(expected)
+        statistics = SearchStatistics()
+        solutions = cache.solve(domains, constraints, statistics=statistics)
+        assert [next(solutions) for _ in range(3)] == expected[:3]
+        assert statistics.nodes == 0, "The first solutions were kept."
+        assert list(solutions) == expected[3:]
+        assert statistics.nodes > 0, "The rest were searched for."
+        statistics = SearchStatistics()
+        solutions = cache.solve(domains, constraints, statistics=statistics)
+        assert [next(solutions) for _ in range(5)] == expected[:5]
+        assert statistics.nodes == 0, "More solutions were kept."
+
+    def test_unsatisfiable(self):
+        """A test that a problem without solutions isn't searched again."""
+        cache = SolutionCache()
+        domains = {"a": [1, 2], "b": [1, 2]}
+        constraints = [
+            make_vars_not_equal_constraint("a", "b"),
+            Sum(["a", "b"], "==", 2),
+        ]
+        assert not cache.is_satisfiable(domains, constraints)
+        assert list(cache.solve(domains, constraints)) == []
+        assert cache.count_solutions(domains, constraints) == 0
+        assert (cache.hits, cache.misses) == (2, 1)
+
+    def test_database(self):
+        """A test that entries stored in a database are reused by another cache,
+           and that the least recently used are removed once it's full."""
+        domains, constraints = make_map_colouring_problem()
+        expected = list(solve(domains, constraints))
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "cache.sqlite")
+            cache = SolutionCache(path=path)
+            assert list(cache.solve(domains, constraints)) == expected
+            cache.close()
+            cache = SolutionCache(path=path)
+            statistics = SearchStatistics()
+            assert (
+                list(cache.solve(domains, constraints, statistics=statistics))
+                == expected
+            )
+            assert statistics.nodes == 0 and cache.hits == 1
+            cache.close()
+
+            cache = SolutionCache(path=path, max_bytes=300)
+            for size in range(2, 8):
+                cache.count_solutions({"a": list(range(size))})
+            cache.close()
+            with closing(sqlite3.connect(path)) as database:
+                total, entries = database.execute(
+                    "SELECT SUM(size), COUNT(*) FROM entries"
+                ).fetchone()
+            assert total <= 300 and 1 < entries < 7, (total, entries)
+            cache = SolutionCache(path=path)
+            assert cache.count_solutions({"a": list(range(7))}) == 7
+            assert cache.hits == 1, "The last entry should be kept."
+            assert list(cache.solve(domains, constraints)) == expected
+            assert cache.misses == 1, "The first entry should be removed."
+            cache.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,9 +1,19 @@
 """Contains tests that demonstrate usage and assumptions."""
 
 import unittest
+import functools
 import itertools
+import json
+import operator
+import sys
 from amp_constraint_solver.constraint_solver import *
 from amp_constraint_solver.builtin_constraints import *
+from amp_constraint_solver.heuristics import *
+
+try:
+    import numpy
+except ImportError:
+    numpy = None  # type: ignore
 
 reference_4_queens_solution = {
     "x1": 0,
@@ -23,6 +33,57 @@ reference_cartesian_product_solution = [
     {"x": 2, "y": 4},
 ]
 
+australia_borders = [
+    ("wa", "nt"),
+    ("wa", "sa"),
+    ("nt", "sa"),
+    ("nt", "q"),
+    ("sa", "q"),
+    ("sa", "nsw"),
+    ("sa", "v"),
+    ("q", "nsw"),
+    ("nsw", "v"),
+]
+
+
+def make_map_colouring_problem():
+    """Builds the domains and constraints for colouring the states of Australia with 3 colours."""
+    states = ["wa", "nt", "sa", "q", "nsw", "v", "t"]
+    domains = {state: ["red", "green", "blue"] for state in states}
+    constraints = [
+        make_vars_not_equal_constraint(a, b) for a, b in australia_borders
+    ]
+    return domains, constraints
+
+
+def make_4_queens_problem():
+    """Builds the domains and constraints of the 4 queens problem used by the tests."""
+    domain = list(range(0, 4))
+
+    x_coords = ["x1", "x2", "x3", "x4"]
+    y_coords = ["y1", "y2", "y3", "y4"]
+    pieces = list(zip(x_coords, y_coords))
+
+    domains = {var: domain for var in x_coords + y_coords}
+    constraints = (
+        [
+            make_vars_not_equal_constraint(a, b)
+            for a, b in itertools.permutations(x_coords, 2)
+            if a != b
+        ]
+        + [
+            make_vars_not_equal_constraint(a, b)
+            for a, b in itertools.permutations(y_coords, 2)
+            if a != b
+        ]
+        + [
+            make_vars_not_diagonal_on_grid_constraint(*a, *b)
+            for a, b in itertools.permutations(pieces, 2)
+            if a != b
+        ]
+    )
+    return domains, constraints
+
 
 class ConstraintSolverTests(unittest.TestCase):
     def test_cartesian_product(self):
@@ -75,49 +136,710 @@ class ConstraintSolverTests(unittest.TestCase):
            work with the solver.
         """
         print("Solving for 2d coordinates that solve the 4 queens problem:")
-        domain = list(range(0, 4))
+        solutions = list(solve(*make_4_queens_problem()))
+
+        print(solutions[0])
+        assert (
+            len(solutions) == 48
+        ), "There are 2 solutions and 4! ways of arranging the variables for a solution."
+        assert (
+            reference_4_queens_solution in solutions
+        ), "Handchecked solution was not found in solutions."
+
+    def test_propagation_modes_agree(self):
+        """A test that forward checking and arc consistency find the same solutions,
+           in the same order, as plain backtracking."""
+        domains, constraints = make_4_queens_problem()
+        expected = list(solve(domains, constraints))
+        for mode in ("forward_checking", "arc_consistency"):
+            print(f"Solving 4 queens with {mode}:")
+            solutions = list(solve(domains, constraints, propagation=mode))
+            assert (
+                solutions == expected
+            ), f"{mode} should not change the solutions."
 
-        x_coords = ["x1", "x2", "x3", "x4"]
-        y_coords = ["y1", "y2", "y3", "y4"]
-        pieces = zip(x_coords, y_coords)
+    def test_propagation_detects_wipeout(self):
+        """A test that propagation rejects a partial solution as soon as a domain is emptied,
+           before the emptied variable is reached."""
+        calls = []
+
+        def constraint(a, c):
+            calls.append((a, c))
+            return a != c
+
+        domains = {"a": [1, 2], "b": [1, 2, 3], "c": [1]}
+        solutions = list(
+            solve(domains, [constraint], propagation="forward_checking")
+        )
+        assert solutions == [{"a": 2, "b": b, "c": 1} for b in [1, 2, 3]]
+        assert calls == [(1, 1), (2, 1)], f"c is pruned once per a, {calls}"
+        self.assertRaises(
+            ValueError, lambda: list(solve(domains, propagation="unknown"))
+        )
+
+    def test_ordering_heuristics(self):
+        """A test that dynamic variable and value orderings find the same solutions as the static order,
+           and that solutions keep their variables in sorted order."""
+        domains, constraints = make_map_colouring_problem()
+        expected = list(solve(domains, constraints))
+        assert len(expected) == 18, "There are 6 colourings of the mainland and 3 for t."
+        for variable_ordering in (
+            minimum_remaining_values,
+            maximum_degree,
+            minimum_remaining_values_then_degree,
+            domain_over_weighted_degree,
+        ):
+            for value_ordering in (None, least_constraining_value):
+                solutions = list(
+                    solve(
+                        domains,
+                        constraints,
+                        propagation="forward_checking",
+                        variable_ordering=variable_ordering,
+                        value_ordering=value_ordering,
+                    )
+                )
+                assert sorted(map(repr, solutions)) == sorted(
+                    map(repr, expected)
+                ), f"{variable_ordering.__name__} should find every colouring."
+
+    def test_variable_ordering_is_dynamic(self):
+        """A test that the variable ordering is consulted at each step with the unassigned variables."""
+        calls = []
+
+        def last_variable(state, variables):
+            calls.append(list(variables))
+            return variables[-1]
 
         solutions = list(
             solve(
-                {
-                    "x1": domain,
-                    "y1": domain,
-                    "x2": domain,
-                    "y2": domain,
-                    "x3": domain,
-                    "y3": domain,
-                    "x4": domain,
-                    "y4": domain,
-                },
+                {"a": [1], "b": [2], "c": [3]},
+                [lambda a, c: a < c],
+                variable_ordering=last_variable,
+            )
+        )
+        assert solutions == [{"a": 1, "b": 2, "c": 3}]
+        assert calls == [["a", "b", "c"], ["a", "b"], ["a"]], calls
+
+    def test_deeper_than_recursion_limit(self):
+        """A test that the search doesn't recurse, so it can assign more variables than the recursion limit."""
+        names = [f"v{i:04}" for i in range(sys.getrecursionlimit() + 500)]
+        solution = next(
+            solve(
+                {name: [0, 1] for name in names},
                 [
                     make_vars_not_equal_constraint(a, b)
-                    for a, b in itertools.permutations(x_coords, 2)
-                    if a != b
-                ]
-                + [
-                    make_vars_not_equal_constraint(a, b)
-                    for a, b in itertools.permutations(y_coords, 2)
-                    if a != b
-                ]
-                + [
-                    make_vars_not_diagonal_on_grid_constraint(*a, *b)
-                    for a, b in itertools.permutations(pieces, 2)
-                    if a != b
+                    for a, b in zip(names, names[1:])
                 ],
             )
         )
+        assert list(solution) == names, "Solutions keep the sorted order."
+        assert list(solution.values())[:4] == [0, 1, 0, 1]
 
-        print(solutions[0])
+    def test_all_different(self):
+        """A test that :py:class:`amp_constraint_solver.builtin_constraints.AllDifferent` finds the
+           same 4 queens solutions as pairwise not equal constraints in every propagation mode."""
+        domains, constraints = make_4_queens_problem()
+        expected = list(solve(domains, constraints))
+        diagonals = constraints[24:]
+        for mode in (None, "forward_checking", "arc_consistency"):
+            solutions = list(
+                solve(
+                    domains,
+                    [
+                        AllDifferent(["x1", "x2", "x3", "x4"]),
+                        AllDifferent(["y1", "y2", "y3", "y4"]),
+                    ]
+                    + diagonals,
+                    propagation=mode,
+                )
+            )
+            assert solutions == expected, f"{mode} should match, {solutions}"
+
+    def test_all_different_matching(self):
+        """A test that arc consistency on :py:class:`amp_constraint_solver.builtin_constraints.AllDifferent`
+           removes values no matching can use before the search starts."""
+        domains_seen = []
+
+        def first(state, variables):
+            domains_seen.append(
+                {var: state.domain(var) for var in state.variables}
+            )
+            return variables[0]
+
+        solutions = list(
+            solve(
+                {"a": [1, 2], "b": [1, 2], "c": [1, 2, 3], "d": [1, 2, 3, 4]},
+                [AllDifferent(["a", "b", "c", "d"])],
+                propagation="arc_consistency",
+                variable_ordering=first,
+            )
+        )
+        assert domains_seen[0] == {
+            "a": [1, 2],
+            "b": [1, 2],
+            "c": [3],
+            "d": [4],
+        }, domains_seen[0]
+        assert len(solutions) == 2, solutions
+        assert list(
+            solve({"a": [1], "b": [1]}, [AllDifferent(["a", "b"])])
+        ) == [], "Duplicate values should be rejected."
+
+    def test_callable_object_constraint(self):
+        """A test that callable objects are called with variables, not with self as a variable."""
+
+        class LessThan:
+            def __call__(self, x, y):
+                return x < y
+
+        solutions = list(solve({"x": [1, 2], "y": [1, 2]}, [LessThan()]))
+        assert solutions == [{"x": 1, "y": 2}], solutions
+
+    def test_partial_constraint(self):
+        """A test that :py:func:`functools.partial` constraints are called with the variables
+           they don't bind, of functions, builtins and methods."""
+
+        class Offset:
+            def less(self, x, y, offset):
+                return x + offset < y
+
+        domains = {"x": [0, 1, 2], "y": [0, 1, 2]}
+        expected = [{"x": 0, "y": 2}]
+        for constraint in [
+            functools.partial(lambda x, y, offset: x + offset < y, offset=1),
+            functools.partial(Offset().less, offset=1),
+        ]:
+            assert list(solve(domains, [constraint])) == expected
+        # operator.lt(a, b) with a bound reads b.
+        assert list(
+            solve({"b": [0, 1, 2]}, [functools.partial(operator.lt, 1)])
+        ) == [{"b": 2}]
+
+    def test_table_constraint(self):
+        """A test that :py:class:`amp_constraint_solver.builtin_constraints.TableConstraint`
+           allows the same solutions as checking the table with a lambda, in every propagation mode."""
+        domains = {var: list(range(24)) for var in ["a", "b", "c", "d"]}
+        # Enough rows are left after assigning a, and few enough after assigning a and b,
+        # to reduce domains with both masks and the values of rows.
+        table = [
+            (a, b, c)
+            for a, b, c in itertools.product(range(24), repeat=3)
+            if (a * 7 + b * 3 + c) % 5 == 1 and a != c
+        ]
+        table += [(5, 5, 5)] * 3 + [(a, 0, 0) for a in range(6)]
+        others = [scoped("c", "d")(lambda c, d: c < d)]
+        allowed = set(table)
+        expected = list(
+            solve(domains, [lambda a, b, c: (a, b, c) in allowed] + others)
+        )
+        assert expected, "The problem should have solutions."
+        for propagation in [None, "forward_checking", "arc_consistency"]:
+            solutions = list(
+                solve(
+                    domains,
+                    [TableConstraint(["a", "b", "c"], table)] + others,
+                    propagation=propagation,
+                )
+            )
+            assert solutions == expected, f"{propagation}\n{solutions}"
+
+        assert list(solve(domains, [TableConstraint(["a", "b"], [])])) == []
+        assert list(
+            solve(
+                {"x": ["red", 1], "y": [None, 2]},
+                [TableConstraint(["x", "y"], [("red", None), (1, 2)])],
+                propagation="arc_consistency",
+            )
+        ) == [{"x": "red", "y": None}, {"x": 1, "y": 2}], "Unsortable values."
+        self.assertRaises(
+            ValueError, lambda: TableConstraint(["a", "b"], [(1, 2), (1,)])
+        )
+
+    def test_linear_constraints(self):
+        """A test that :py:class:`amp_constraint_solver.builtin_constraints.Linear` allows the same
+           solutions as checking the sum with a lambda in every propagation mode, and that its
+           bounds rule out partial solutions early."""
+        domains = {var: list(range(-3, 6)) for var in ["a", "b", "c", "d"]}
+        # b is named twice, so has a coefficient of -1.
+        coefficients, variables = [2, -3, 1, 2], ["a", "b", "c", "b"]
+        others = [scoped("c", "d")(lambda c, d: c != d)]
+        comparisons = {
+            "==": operator.eq,
+            "!=": operator.ne,
+            "<=": operator.le,
+            "<": operator.lt,
+            ">=": operator.ge,
+            ">": operator.gt,
+        }
+
+        def make_check(compare):
+            return lambda a, b, c: compare(2 * a - b + c, 4)
+
+        for op, compare in comparisons.items():
+            expected = list(solve(domains, [make_check(compare)] + others))
+            assert expected, f"{op} should have solutions."
+            for propagation in [None, "forward_checking", "arc_consistency"]:
+                solutions = list(
+                    solve(
+                        domains,
+                        [Linear(coefficients, variables, op, 4)] + others,
+                        propagation=propagation,
+                    )
+                )
+                assert solutions == expected, f"{op} {propagation}"
+
+        cells = ["a", "b", "c", "d"]
+        domains = {var: list(range(1, 10)) for var in cells}
+        full = SearchStatistics()
+        bounded = SearchStatistics()
+        expected = count_solutions(
+            domains, [lambda a, b, c, d: a + b + c + d == 33], statistics=full
+        )
+        assert expected == count_solutions(
+            domains,
+            [Sum(cells, "==", 33)],
+            propagation="forward_checking",
+            statistics=bounded,
+        )
+        assert bounded.nodes < full.nodes / 10, (bounded, full)
+        assert not is_satisfiable(
+            domains, [Sum(cells, ">", 36)], propagation="forward_checking"
+        )
+        self.assertRaises(ValueError, lambda: Linear([1], ["a"], "=", 1))
+        self.assertRaises(ValueError, lambda: Linear([1, 2], ["a"], "<", 1))
+
+    @unittest.skipIf(numpy is None, "NumPy isn't installed.")
+    def test_batch_constraints_with_other_values(self):
+        """A test that domains NumPy can't hold as numbers, like mixes of strings and ints,
+           tuples and ragged values, are checked a value at a time instead of in a batch."""
+        for other in [
+            ["x", 1, 2, 3, 4, 5, 6, 7, 8],
+            [(i, i + 1) for i in range(9)],
+            ["x", (1,), (1, 2), 1, 2, 3, 4, 5, 6],
+        ]:
+            domains = {"a": [other[1], None], "b": other}
+            expected = [
+                {"a": a, "b": b}
+                for a in domains["a"]
+                for b in other
+                if a != b
+            ]
+            for options in [{}, {"propagation": "forward_checking"}]:
+                assert (
+                    list(
+                        solve(
+                            domains,
+                            [make_vars_not_equal_constraint("a", "b")],
+                            **options,
+                        )
+                    )
+                    == expected
+                ), (other, options)
+
+    @unittest.skipIf(numpy is None, "NumPy isn't installed.")
+    def test_batch_constraints(self):
+        """A test that constraints with batch forms filter whole domains at once,
+           giving the same solutions as checking each value, with and without propagation."""
+        domains = {"a": list(range(20)), "b": list(range(20)), "c": [3, 5]}
+        calls = []
+
+        @scoped(
+            "a",
+            "b",
+            batch=lambda assignment, var, values: (
+                values + assignment["b" if var == "a" else "a"]
+            )
+            % 7
+            == 0,
+        )
+        def sum_divisible_by_7(**variables):
+            calls.append(variables)
+            return (variables["a"] + variables["b"]) % 7 == 0
+
+        expected = [
+            {"a": a, "b": b, "c": c}
+            for a in range(20)
+            for b in range(20)
+            for c in [3, 5]
+            if (a + b) % 7 == 0 and b != c
+        ]
+        constraints = [
+            sum_divisible_by_7,
+            make_vars_not_equal_constraint("b", "c"),
+        ]
+        for options in [
+            {},
+            {"propagation": "forward_checking"},
+            {"backjumping": True},
+            {"variable_ordering": maximum_degree},
+        ]:
+            del calls[:]
+            solutions = list(solve(domains, constraints, **options))
+            key = lambda solution: sorted(solution.items())
+            assert sorted(solutions, key=key) == sorted(
+                expected, key=key
+            ), options
+            assert (
+                calls == []
+            ), f"Only the batch form should be called, {options}"
+
+        # Queen i is in column i, so only the rows of the 8 queens are searched for.
+        queens_domains = {f"x{i}": [i] for i in range(8)}
+        queens_domains.update({f"y{i}": list(range(8)) for i in range(8)})
+        queens_constraints = []
+        for i, j in itertools.combinations(range(8), 2):
+            queens_constraints.append(
+                make_vars_not_equal_constraint(f"y{i}", f"y{j}")
+            )
+            queens_constraints.append(
+                make_vars_not_diagonal_on_grid_constraint(
+                    f"x{i}", f"y{i}", f"x{j}", f"y{j}"
+                )
+            )
+        for propagation in [None, "forward_checking"]:
+            assert (
+                count_solutions(
+                    queens_domains,
+                    queens_constraints,
+                    propagation=propagation,
+                )
+                == 92
+            )
+
+    def test_count_solutions(self):
+        """A test that :py:func:`amp_constraint_solver.constraint_solver.count_solutions` agrees with
+           :py:func:`amp_constraint_solver.constraint_solver.solve`, including when it multiplies out
+           variables no constraint reads."""
+        domains, constraints = make_4_queens_problem()
+        assert count_solutions(domains, constraints) == len(
+            list(solve(domains, constraints))
+        )
+        for propagation in ("forward_checking", "arc_consistency"):
+            assert count_solutions(
+                domains, constraints, propagation=propagation
+            ) == len(list(solve(domains, constraints)))
+
+        domains = {"a": [1, 2, 3], "b": [1, 2, 3], "c": list(range(10))}
+        constraints = [scoped("a", "b")(lambda a, b: a < b)]
+        assert count_solutions(domains, constraints) == 30
+        assert count_solutions(domains) == 90
+        assert count_solutions(domains, [lambda a, b: a < b]) == 30
+        assert count_solutions({"a": [1], "b": [1]}, [lambda a, b: a != b]) == 0
+        assert count_solutions(domains, as_tuples=True) == 90
+        self.assertRaises(
+            ValueError,
+            lambda: count_solutions(
+                domains, resume=SearchCheckpoint((), (), (), ())
+            ),
+        )
+
+    def test_is_satisfiable(self):
+        """A test that :py:func:`amp_constraint_solver.constraint_solver.is_satisfiable`
+           finds whether there are solutions."""
+        domains, constraints = make_4_queens_problem()
+        assert is_satisfiable(domains, constraints)
+        assert not is_satisfiable(
+            {"a": [1, 2], "b": [1, 2], "c": [1, 2]},
+            [AllDifferent(["a", "b", "c"])],
+        )
+        assert not is_satisfiable(
+            {"a": [1, 2], "b": [1, 2], "c": [1, 2]},
+            [AllDifferent(["a", "b", "c"])],
+            propagation="arc_consistency",
+        )
+        assert is_satisfiable(domains, constraints, as_tuples=True)
+        self.assertRaises(
+            ValueError,
+            lambda: is_satisfiable(
+                domains, resume=SearchCheckpoint((), (), (), ())
+            ),
+        )
+
+    def test_solutions_as_tuples(self):
+        """A test that solutions can be yielded as tuples of values in variable order."""
+        domains = {"b": [1, 2], "a": [1, 2]}
+        constraints = [lambda a, b: a > b]
+        assert list(solve(domains, constraints, as_tuples=True)) == [(2, 1)]
+        assert list(
+            solve(
+                domains,
+                constraints,
+                as_tuples=True,
+                propagation="forward_checking",
+                variable_ordering=minimum_remaining_values,
+            )
+        ) == [(2, 1)]
+
+    def test_search_statistics(self):
+        """A test that a :py:class:`amp_constraint_solver.constraint_solver.SearchStatistics`
+           counts the work done by a search without changing its solutions."""
+        domains, constraints = make_4_queens_problem()
+        statistics = SearchStatistics()
+        solutions = list(solve(domains, constraints, statistics=statistics))
+        assert solutions == list(solve(domains, constraints))
+        assert statistics.max_depth == len(domains), statistics
         assert (
-            len(solutions) == 48
-        ), "There are 2 solutions and 4! ways of arranging the variables for a solution."
+            statistics.nodes > statistics.failures > 0
+            and statistics.backtracks > 0
+        ), statistics
+        assert statistics.constraint_checks >= statistics.failures, statistics
+
+        checks = statistics.constraint_checks
+        assert count_solutions(
+            domains, constraints, statistics=statistics
+        ) == len(solutions)
         assert (
-            reference_4_queens_solution in solutions
-        ), "Handchecked solution was not found in solutions."
+            statistics.constraint_checks == 2 * checks
+        ), "Counts should add up across searches."
+
+    def test_search_hooks(self):
+        """A test that :py:class:`amp_constraint_solver.constraint_solver.SearchHooks` are called
+           as the search runs, and that statistics find the constraint that fails most."""
+        events = []
+
+        class RecordEvents(SearchHooks):
+            def on_assign(self, state, var, value):
+                events.append(("assign", var, value))
+
+            def on_backtrack(self, state, var):
+                events.append(("backtrack", var))
+
+            def on_solution(self, state, count):
+                events.append(("solution", dict(state.assignment), count))
+
+            def on_constraint_fail(self, state, constraint):
+                events.append(("fail", constraint))
+
+        greater = lambda a, b: a > b
+        statistics = SearchStatistics()
+        solutions = list(
+            solve(
+                {"a": [1, 2], "b": [1, 2]},
+                [greater],
+                hooks=RecordEvents(),
+                statistics=statistics,
+            )
+        )
+        assert solutions == [{"a": 2, "b": 1}], solutions
+        assert events == [
+            ("assign", "a", 1),
+            ("assign", "b", 1),
+            ("fail", greater),
+            ("assign", "b", 2),
+            ("fail", greater),
+            ("backtrack", "b"),
+            ("assign", "a", 2),
+            ("assign", "b", 1),
+            ("solution", {"a": 2, "b": 1}, 1),
+            ("assign", "b", 2),
+            ("fail", greater),
+            ("backtrack", "b"),
+            ("backtrack", "a"),
+        ], events
+
+        domains, constraints = make_4_queens_problem()
+        statistics = SearchStatistics()
+        list(solve(domains, constraints, statistics=statistics))
+        assert len(statistics.constraints) == len(constraints)
+        assert statistics.failures == sum(
+            record.failures for record in statistics.constraints
+        )
+        (slowest,) = statistics.slowest(1)
+        assert slowest.seconds == max(
+            record.seconds for record in statistics.constraints
+        )
+        assert statistics.solutions == 2 * 24, statistics
+
+    def test_backjumping(self):
+        """A test that conflict-directed backjumping finds the same solutions, and jumps back over
+           variables that can't resolve a failure."""
+        for domains, constraints in (
+            make_4_queens_problem(),
+            make_map_colouring_problem(),
+        ):
+            expected = list(solve(domains, constraints))
+            for propagation in (None, "forward_checking", "arc_consistency"):
+                for nogood_limit in (0, 10):
+                    assert (
+                        list(
+                            solve(
+                                domains,
+                                constraints,
+                                propagation=propagation,
+                                backjumping=True,
+                                nogood_limit=nogood_limit,
+                            )
+                        )
+                        == expected
+                    ), (propagation, nogood_limit)
+
+        # z can never differ from a when a is 1, and b to e can't help.
+        domains = {var: [1, 2, 3] for var in "abcde"}
+        domains["a"] = [1, 2]
+        domains["z"] = [1]
+        constraints = [lambda a, z: a != z]
+        chronological = SearchStatistics()
+        backjumping = SearchStatistics()
+        count = count_solutions(
+            domains, constraints, statistics=chronological, decompose=False
+        )
+        assert count == count_solutions(
+            domains,
+            constraints,
+            statistics=backjumping,
+            backjumping=True,
+            decompose=False,
+        )
+        assert count == 3 ** 4
+        assert (
+            backjumping.nodes < chronological.nodes
+        ), f"Backjumping should skip b to e when a is 1, {backjumping} {chronological}"
+
+    def test_decompose(self):
+        """A test that independent parts of a problem are solved separately,
+           giving the same solutions as searching them together."""
+        queens_domains, queens_constraints = make_4_queens_problem()
+        colouring_domains, colouring_constraints = make_map_colouring_problem()
+        domains = dict(queens_domains, **colouring_domains)
+        constraints = queens_constraints + colouring_constraints
+
+        def key(solution):
+            return sorted(solution.items())
+
+        queens = list(solve(queens_domains, queens_constraints))
+        colourings = list(solve(colouring_domains, colouring_constraints))
+        solutions = list(solve(domains, constraints, decompose=True))
+        assert sorted(solutions, key=key) == sorted(
+            (dict(a, **b) for a in queens for b in colourings), key=key
+        )
+        assert list(
+            solve(domains, constraints, decompose=True, as_tuples=True)
+        ) == [
+            tuple(solution[var] for var in sorted(domains))
+            for solution in solutions
+        ]
+        assert count_solutions(domains, constraints) == len(queens) * len(
+            colourings
+        )
+
+        calls = []
+
+        def unsatisfiable(x):
+            calls.append(x)
+            return False
+
+        domains["x"] = [1, 2]
+        assert (
+            list(solve(domains, constraints + [unsatisfiable], decompose=True))
+            == []
+        )
+        assert calls == [1, 2], "The empty component should only be searched once."
+        assert not is_satisfiable(domains, constraints + [unsatisfiable])
+        assert count_solutions(domains, constraints + [unsatisfiable]) == 0
+
+    def test_decompose_statistics(self):
+        """A test that each constraint of a decomposed problem is timed in its own record."""
+        equal = lambda c, d: c == d
+        less = lambda a, b: a < b
+        domains = {"a": [1, 2], "b": [1, 2], "c": [1, 2, 3], "d": [1, 2, 3]}
+        expected = []
+        for constraint, variables in ((equal, "cd"), (less, "ab")):
+            statistics = SearchStatistics()
+            list(
+                solve(
+                    {var: domains[var] for var in variables},
+                    [constraint],
+                    statistics=statistics,
+                )
+            )
+            (record,) = statistics.constraints
+            expected.append((record.constraint, record.calls, record.failures))
+        for search in (
+            lambda **options: list(solve(decompose=True, **options)),
+            count_solutions,
+            is_satisfiable,
+        ):
+            statistics = SearchStatistics()
+            search(
+                domains=domains,
+                constraints=[equal, less],
+                statistics=statistics,
+            )
+            records = [
+                (record.constraint, record.calls, record.failures)
+                for record in statistics.constraints
+            ]
+            assert [record[0] for record in records] == [equal, less]
+            if search is not is_satisfiable:
+                assert records == expected, records
+
+    def test_search_limits(self):
+        """A test that searches stop once they go over a limit, and raise unless the limits are quiet."""
+        domains, constraints = make_4_queens_problem()
+        for limit, limits in [
+            ("max_nodes", SearchLimits(max_nodes=10)),
+            ("max_checks", SearchLimits(max_checks=10)),
+            ("timeout", SearchLimits(timeout=0)),
+        ]:
+            with self.assertRaises(SearchLimitExceeded) as raised:
+                list(solve(domains, constraints, limits=limits))
+            assert raised.exception.limit == limit
+            assert raised.exception.checkpoint is not None
+        with self.assertRaises(SearchLimitExceeded):
+            count_solutions(
+                domains, constraints, limits=SearchLimits(max_nodes=10)
+            )
+
+        limits = SearchLimits(max_nodes=10, quiet=True)
+        assert list(solve(domains, constraints, limits=limits)) == []
+        assert limits.exceeded.limit == "max_nodes"
+        assert limits.nodes == 11, "The node that went over isn't assigned."
+
+    def test_resume_from_checkpoint(self):
+        """A test that a search can be sliced into windows, each resuming from the checkpoint
+           of the last saved as JSON, and give the same solutions as searching all at once."""
+        domains, constraints = make_4_queens_problem()
+        for options in [
+            {},
+            {"propagation": "forward_checking"},
+            {"backjumping": True},
+            {
+                "propagation": "arc_consistency",
+                "variable_ordering": domain_over_weighted_degree,
+                "value_ordering": least_constraining_value,
+            },
+        ]:
+            expected = list(solve(domains, constraints, **options))
+            solutions = []
+            checkpoint = None
+            windows = 0
+            while True:
+                limits = SearchLimits(max_nodes=50)
+                try:
+                    for solution in solve(
+                        domains,
+                        constraints,
+                        limits=limits,
+                        resume=checkpoint,
+                        **options,
+                    ):
+                        solutions.append(solution)
+                    break
+                except SearchLimitExceeded as exceeded:
+                    checkpoint = SearchCheckpoint.from_dict(
+                        json.loads(json.dumps(exceeded.checkpoint.as_dict()))
+                    )
+                    windows += 1
+            assert (
+                windows > 1
+            ), f"The search should need several windows, {options}"
+            assert solutions == expected, f"{options}\n{solutions}\n{expected}"
+
+        self.assertRaises(
+            ValueError,
+            lambda: list(solve({"x": [1, 2, 3]}, [], resume=checkpoint)),
+        )
 
     def test_kwargs_not_passed_twice(self):
         r"""A test that the solver can correctly call functions with both globbed kwargs and named args."""
@@ -131,6 +853,48 @@ class ConstraintSolverTests(unittest.TestCase):
         ):
             assert solution == {"a": 1, "b": 3}
 
+    def test_constraints_checked_once_bound(self):
+        """A test that constraints are only called when the last of their variables is assigned,
+           rather than against every partial solution after that."""
+        calls = []
+
+        def constraint(x, y):
+            calls.append((x, y))
+            return True
+
+        solutions = list(
+            solve({"x": [1, 2], "y": [1, 2], "z": [1, 2]}, [constraint])
+        )
+        assert len(solutions) == 8, "Every combination is a solution."
+        assert calls == [
+            (1, 1),
+            (1, 2),
+            (2, 1),
+            (2, 2),
+        ], f"Constraint should be checked once per (x, y), \n{calls}\n"
+
+    def test_scoped_kwargs_constraint(self):
+        """A test that a :py:func:`amp_constraint_solver.constraint_solver.scoped` constraint
+           is only passed the variables in its scope."""
+        seen = []
+
+        @scoped("x", "z")
+        def constraint(**variables):
+            seen.append(sorted(variables))
+            return variables["x"] != variables["z"]
+
+        solutions = list(
+            solve({"x": [1, 2], "y": [1, 2], "z": [1, 2]}, [constraint])
+        )
+        assert len(solutions) == 4, f"x != z halves the solutions, {solutions}"
+        assert all(
+            keys == ["x", "z"] for keys in seen
+        ), "Only the scope should be passed as kwargs."
+        self.assertRaises(
+            ValueError,
+            lambda: list(solve({"x": [1]}, [scoped("w")(lambda **v: True)])),
+        )
+
     def test_no_domains(self):
         """Test that the solver raises an error if provided with an empty dict for variables and domains.
 
@@ -154,7 +918,7 @@ class ConstraintSolverTests(unittest.TestCase):
         ... except ValueError as e:
         ...     print(e)
         ...
-        Domain must be a list, not <class 'int'>.
+        Domain must be a list, range or Intervals, not <class 'int'>.
         """
         test_invalid = lambda: list(solve({"x": None}))
         self.assertRaises(ValueError, test_invalid)
@@ -0,0 +1,189 @@
+"""Contains tests for the domain representations used during a search."""
+
+import unittest
+from amp_constraint_solver.domains import *
+from amp_constraint_solver.constraint_solver import *
+from amp_constraint_solver.builtin_constraints import *
+
+
+class BitsetDomainTests(unittest.TestCase):
+    def test_masks_keep_domain_order(self):
+        """A test that values decoded from a mask keep the order of the domain."""
+        domain = BitsetDomain([5, 3, 9, 1])
+        mask = domain.mask_of([1, 5, 9])
+        assert domain.values_of(mask) == [5, 9, 1], domain.values_of(mask)
+        assert domain.items_of(mask) == [(0, 5), (2, 9), (3, 1)]
+        assert domain.size(mask) == 3
+        assert domain.values_of(domain.full) == [5, 3, 9, 1]
+
+    def test_remove_and_contains(self):
+        """A test that removing values clears their bits, and unknown values are ignored."""
+        domain = BitsetDomain(["a", "b", "c"])
+        mask = domain.remove(domain.full, "b")
+        assert not domain.contains(mask, "b")
+        assert domain.contains(mask, "c")
+        assert domain.remove(mask, "z") == mask
+        assert domain.remove(domain.remove(mask, "a"), "c") == 0
+
+    def test_large_domain(self):
+        """A test that masks work past the size of a machine word."""
+        domain = BitsetDomain(list(range(1000)))
+        mask = domain.full
+        for value in range(0, 1000, 2):
+            mask = domain.remove(mask, value)
+        assert domain.size(mask) == 500
+        assert domain.values_of(mask)[:3] == [1, 3, 5]
+
+
+class IntervalsTests(unittest.TestCase):
+    def test_sequence(self):
+        """A test that intervals behave like the list of their values, without building it."""
+        intervals = Intervals(
+            part for part in [range(0, 3), (10, 20, 4), range(5, 5), (30, 31)]
+        )
+        values = [0, 1, 2, 10, 14, 18, 30]
+        assert list(intervals) == values
+        assert len(intervals) == len(values)
+        assert [intervals[i] for i in range(-7, 7)] == values + values
+        assert [intervals.index(value) for value in values] == list(range(7))
+        assert all(value in intervals for value in values)
+        assert not any(value in intervals for value in [-1, 3, 12, 31, "a"])
+        assert list(intervals[2:5]) == [2, 10, 14]
+        assert intervals == Intervals([(0, 3), range(10, 22, 4), (30, 31)])
+        huge = Intervals([range(10 ** 12), range(10 ** 13, 10 ** 14)])
+        assert len(huge) == 10 ** 12 + 9 * 10 ** 13
+        assert huge[10 ** 12] == 10 ** 13
+        self.assertRaises(IndexError, lambda: intervals[7])
+        self.assertRaises(ValueError, lambda: intervals.index(3))
+        self.assertRaises(ValueError, lambda: Intervals([(0, 5), (4, 8)]))
+        self.assertRaises(ValueError, lambda: Intervals([range(5, 0, -1)]))
+
+
+class IntervalDomainTests(unittest.TestCase):
+    def test_matches_bitset_domain(self):
+        """A test that interval masks hold the same values as bitsets after the same reductions."""
+        values = Intervals([range(0, 10), range(20, 40, 3)])
+        domain = IntervalDomain(values)
+        bitset = BitsetDomain(list(values))
+        mask, bits = domain.full, bitset.full
+        for value in [3, 4, 9, 26, 0, 100]:
+            mask, bits = domain.remove(mask, value), bitset.remove(bits, value)
+            assert list(domain.values_of(mask)) == bitset.values_of(bits)
+            assert list(domain.items_of(mask)) == bitset.items_of(bits)
+        assert domain.size(mask) == bitset.size(bits) == 12
+        assert domain.bounds(mask) == bitset.bounds(bits) == (1, 38)
+        for low, high in [(2, 30), (None, 7.5), (25, None), (40, None)]:
+            assert list(
+                domain.values_of(domain.between(mask, low, high))
+            ) == bitset.values_of(bitset.between(bits, low, high))
+        other = domain.mask_of([1, 2, 5, 29, 32])
+        kept = domain.intersect(mask, other)
+        assert list(domain.values_of(kept)) == [1, 2, 5, 29, 32]
+        assert domain.contains(mask, 29) and not domain.contains(mask, 26)
+        assert domain.without(mask, [1, 2]) == domain.remove(
+            domain.remove(mask, 1), 2
+        )
+
+    def test_large_domain(self):
+        """A test that a domain too big to list is reduced by splitting intervals."""
+        domain = IntervalDomain(range(10 ** 15))
+        mask = domain.between(domain.full, 10, 10 ** 14)
+        mask = domain.remove(domain.remove(mask, 500), 10 ** 14)
+        assert mask == ((10, 500), (501, 10 ** 14))
+        assert domain.size(mask) == 10 ** 14 - 11
+        assert list(domain.values_of(mask)[489:492]) == [499, 501, 502]
+        assert domain.bounds(mask) == (10, 10 ** 14 - 1)
+
+
+    def test_arrays_and_chunks(self):
+        """A test that masks are split into chunks and turned into arrays without listing the values."""
+        domain = IntervalDomain(Intervals([range(0, 10), range(20, 40, 3)]))
+        mask = domain.without(domain.full, [2, 3, 12])
+        chunks = list(domain.chunks_of(mask, 4))
+        assert [domain.size(chunk) for chunk in chunks] == [4, 4, 4, 2]
+        assert [
+            value for chunk in chunks for value in domain.values_of(chunk)
+        ] == list(domain.values_of(mask))
+        positions, values = domain.arrays_of(mask)
+        assert list(zip(positions.tolist(), values.tolist())) == list(
+            domain.items_of(mask)
+        )
+        huge = IntervalDomain(range(2 ** 70, 2 ** 70 + 3))
+        assert huge.arrays_of(huge.full)[1].tolist() == list(huge.values)
+
+
+class LazyDomainTests(unittest.TestCase):
+    def test_solve_with_ranges(self):
+        """A test that range and interval domains get the solutions their lists would."""
+        domains = {
+            "a": range(12),
+            "b": Intervals([range(0, 4), range(6, 12, 2)]),
+            "c": range(1, 9, 3),
+        }
+        constraints = [
+            lambda a, b: a != b,
+            Sum(["a", "b", "c"], "<=", 12),
+            Linear([1, -2], ["a", "c"], ">=", -3),
+            AllDifferent(["a", "b", "c"]),
+        ]
+        lists = {var: list(values) for var, values in domains.items()}
+        for propagation in [None, "forward_checking", "arc_consistency"]:
+            expected = list(solve(lists, constraints, propagation=propagation))
+            assert expected
+            assert (
+                list(solve(domains, constraints, propagation=propagation))
+                == expected
+            )
+            assert count_solutions(
+                domains, constraints, propagation=propagation
+            ) == len(expected)
+        self.assertRaises(ValueError, lambda: list(solve({"a": range(0)})))
+
+    def test_huge_ranges_are_not_listed(self):
+        """A test that bounds propagation solves problems over ranges far too big to list."""
+        domains = {
+            "a": range(10 ** 12),
+            "b": range(10 ** 12),
+            "c": range(5, 10 ** 12, 5),
+        }
+        constraints = [
+            Sum(["a", "b", "c"], "==", 30),
+            Linear([2, -1], ["a", "b"], ">", 7),
+            Linear([1], ["c"], "!=", 10),
+        ]
+        small = {var: list(values[:40]) for var, values in domains.items()}
+        solutions = list(
+            solve(domains, constraints, propagation="forward_checking")
+        )
+        assert solutions == list(
+            solve(small, constraints, propagation="forward_checking")
+        )
+        assert solutions[0] == {"a": 5, "b": 0, "c": 25}
+
+    def test_huge_ranges_with_builtin_constraints(self):
+        """A test that not-equal and all-different don't list huge ranges in any propagation mode."""
+        domains = {"a": range(10 ** 7), "b": range(10 ** 7)}
+        for propagation in [None, "forward_checking", "arc_consistency"]:
+            solutions = solve(
+                domains,
+                [make_vars_not_equal_constraint("a", "b")],
+                propagation=propagation,
+            )
+            assert [next(solutions), next(solutions)] == [
+                {"a": 0, "b": 1},
+                {"a": 0, "b": 2},
+            ], propagation
+            solutions = solve(
+                dict(domains, c=range(10 ** 7)),
+                [AllDifferent(["a", "b", "c"])],
+                propagation=propagation,
+            )
+            assert next(solutions) == {"a": 0, "b": 1, "c": 2}
+        huge = {"a": range(2 ** 70, 2 ** 70 + 9), "b": [2 ** 70]}
+        assert count_solutions(
+            huge, [make_vars_not_equal_constraint("a", "b")]
+        ) == 8
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,142 @@
+"""Contains tests for solving a problem again after edits."""
+
+import unittest
+from amp_constraint_solver.constraint_solver import *
+from amp_constraint_solver.builtin_constraints import *
+from amp_constraint_solver.incremental import *
+from amp_constraint_solver.domains import Intervals
+from amp_constraint_solver.test_constraint_solver import (
+    make_4_queens_problem,
+    make_map_colouring_problem,
+)
+
+
+def same_solutions(first, second):
+    """Whether two lists of solutions have the same solutions, in any order."""
+    return sorted(map(repr, first)) == sorted(map(repr, second))
+
+
+class SolverTests(unittest.TestCase):
+    def test_edits_match_solve(self):
+        """A test that after each kind of edit, the solver finds the solutions solve would."""
+        domains, constraints = make_map_colouring_problem()
+        for options in [{}, {"propagation": "arc_consistency"}]:
+            solver = Solver(domains, constraints, **options)
+            assert list(solver.solve()) == list(
+                solve(domains, constraints, **options)
+            )
+
+            solver.restrict("wa", ["red", "green"])
+            solver.restrict("t", ["blue"])
+            assert list(solver.solve()) == list(
+                solve(solver.domains, constraints, **options)
+            ), "Restricting keeps the order of solve."
+
+            not_red = scoped("q")(lambda **values: values["q"] != "red")
+            solver.add_constraint(not_red)
+            solutions = list(solver.solve())
+            assert solutions == list(
+                solve(solver.domains, constraints + [not_red], **options)
+            )
+            assert solutions, "The problem should still have solutions."
+
+            solver.remove_constraint(constraints[0])
+            expected = list(
+                solve(solver.domains, solver.constraints, **options)
+            )
+            assert len(solver.constraints) == len(constraints)
+            assert same_solutions(solver.solve(), expected)
+            assert solver.count_solutions() == len(expected)
+
+            solver.set_domain("t", ["red", "green", "blue"])
+            expected = list(
+                solve(solver.domains, solver.constraints, **options)
+            )
+            assert same_solutions(solver.solve(), expected)
+            assert solver.is_satisfiable()
+
+    def test_reuses_solutions(self):
+        """A test that solutions are reused after edits that can only remove solutions."""
+        domains, constraints = make_4_queens_problem()
+        statistics = SearchStatistics()
+        solver = Solver(
+            domains,
+            constraints,
+            propagation="forward_checking",
+            statistics=statistics,
+        )
+        expected = list(solver.solve())
+        nodes = statistics.nodes
+        solver.restrict("x1", [0, 1])
+        solver.add_constraint(lambda y1, y2: y1 < y2)
+        solutions = list(solver.solve())
+        assert solutions == [
+            solution
+            for solution in expected
+            if solution["x1"] in [0, 1] and solution["y1"] < solution["y2"]
+        ]
+        assert solver.count_solutions() == len(solutions)
+        assert statistics.nodes == nodes, "No search should be needed."
+
+        # The first solution stopped the search, so the rest must be searched for.
+        solver = Solver(domains, constraints, statistics=statistics)
+        first = next(solver.solve())
+        nodes = statistics.nodes
+        solver.restrict("x2", [first["x2"]])
+        solutions = solver.solve()
+        assert next(solutions) == first
+        assert statistics.nodes == nodes, "The first solution is still valid."
+        rest = list(solutions)
+        assert statistics.nodes > nodes
+        assert [first] + rest == list(solve(solver.domains, constraints))
+
+    def test_unsatisfiable_edits(self):
+        """A test that edits ruling out every solution, or emptying a domain, are handled."""
+        solver = Solver({"a": [1, 2], "b": [1, 2]}, [lambda a, b: a < b])
+        assert solver.is_satisfiable()
+        solver.restrict("b", [1])
+        assert list(solver.solve()) == []
+        assert not solver.is_satisfiable()
+        solver.restrict("a", [])
+        assert solver.count_solutions() == 0
+        solver.set_domain("a", [0])
+        assert list(solver.solve()) == [{"a": 0, "b": 1}]
+        self.assertRaises(ValueError, lambda: solver.restrict("c", [1]))
+        self.assertRaises(
+            ValueError, lambda: solver.remove_constraint(lambda a: True)
+        )
+        self.assertRaises(
+            ValueError, lambda: solver.add_constraint(lambda c: True)
+        )
+        self.assertRaises(
+            ValueError, lambda: Solver({"a": [1]}, decompose=True)
+        )
+
+    def test_range_domains_are_kept(self):
+        """A test that range and interval domains aren't listed, unless an edit removes values."""
+        slots = Intervals([range(0, 10 ** 7), range(2 * 10 ** 7, 3 * 10 ** 7)])
+        solver = Solver(
+            {"a": range(10 ** 7), "b": slots},
+            [Linear([1, -1], ["a", "b"], ">", 10 ** 7 - 3)],
+            propagation="forward_checking",
+        )
+        assert solver.domains == {"a": range(10 ** 7), "b": slots}
+        expected = [
+            {"a": 10 ** 7 - 2, "b": 0},
+            {"a": 10 ** 7 - 1, "b": 0},
+            {"a": 10 ** 7 - 1, "b": 1},
+        ]
+        assert list(solver.solve()) == expected
+        solver.set_domain("a", range(10 ** 7))
+        assert solver.is_satisfiable()
+        solver.restrict("b", [1, 2, -5, "x"])
+        assert solver.domains["b"] == [1, 2]
+        assert list(solver.solve()) == expected[2:]
+        solver.set_domain("b", range(0, 10 ** 7, 2))
+        assert list(solver.solve()) == expected[:2]
+        solver.restrict("a", [10 ** 7 - 2])
+        assert list(solver.solve()) == expected[:1]
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,161 @@
+"""Contains tests for solving many problems with the same constraints."""
+
+import unittest
+import time
+from amp_constraint_solver.constraint_solver import *
+from amp_constraint_solver.builtin_constraints import *
+from amp_constraint_solver.many import *
+from amp_constraint_solver.test_constraint_solver import (
+    make_map_colouring_problem,
+)
+
+
+def make_availability_problems():
+    """Builds colouring problems where each state can only take some colours."""
+    domains, constraints = make_map_colouring_problem()
+    colours = ["red", "green", "blue"]
+    problems = {}
+    for i in range(20):
+        problems[f"p{i}"] = {
+            state: [
+                colour
+                for j, colour in enumerate(colours)
+                if (i + j + k) % 4 != 0
+            ]
+            for k, state in enumerate(domains)
+        }
+    return problems, constraints
+
+
+class CountingScope:
+    """A constraint that counts how many times its scope is read, as it is to compile it."""
+
+    partial = False
+
+    def __init__(self):
+        self.reads = 0
+
+    @property
+    def scope(self):
+        self.reads += 1
+        return ("sa", "wa")
+
+    def __call__(self, **variables):
+        return variables["sa"] != variables["wa"]
+
+
+class SolveManyTests(unittest.TestCase):
+    def test_matches_solve(self):
+        """A test that each problem's solutions are those solve finds."""
+        problems, constraints = make_availability_problems()
+        for options in [
+            {},
+            {"propagation": "forward_checking", "as_tuples": True},
+        ]:
+            expected = [
+                (problem_id, list(solve(domains, constraints, **options)))
+                for problem_id, domains in problems.items()
+            ]
+            assert any(solutions for _, solutions in expected)
+            assert not all(solutions for _, solutions in expected)
+            assert (
+                list(solve_many(problems, constraints, **options)) == expected
+            )
+            pairs = list(problems.items())
+            assert (
+                list(solve_many(pairs, constraints, **options)) == expected
+            ), "Problems can be pairs of ids and domains."
+            assert list(
+                solve_many(problems, constraints, limit=1, **options)
+            ) == [
+                (problem_id, solutions[:1])
+                for problem_id, solutions in expected
+            ]
+
+    def test_compiles_once(self):
+        """A test that the constraints are only compiled once per set of variables."""
+        problems, constraints = make_availability_problems()
+        counting = CountingScope()
+        results = solve_many(problems, constraints + [counting])
+        next(results)
+        reads = counting.reads
+        assert len(list(results)) == len(problems) - 1
+        assert counting.reads == reads, "The plan should be reused."
+        results = solve_many(
+            {1: {"sa": [1, 2], "wa": [1, 2]}, 2: {"sa": [1], "wa": [1, 2]}},
+            [counting],
+        )
+        assert list(results) == [
+            (1, [{"sa": 1, "wa": 2}, {"sa": 2, "wa": 1}]),
+            (2, [{"sa": 1, "wa": 2}]),
+        ]
+        assert counting.reads > reads, "New variables need a new plan."
+        self.assertRaises(
+            ValueError,
+            lambda: list(
+                solve_many(
+                    {1: {"sa": [1], "wa": [1]}, 2: {"sa": [1]}}, [counting]
+                )
+            ),
+        )
+
+    def test_workers(self):
+        """A test that problems solved by worker processes in chunks get the same solutions."""
+        problems, constraints = make_availability_problems()
+        expected = list(
+            solve_many(problems, constraints, propagation="forward_checking")
+        )
+        results = solve_many(
+            problems,
+            constraints,
+            propagation="forward_checking",
+            workers=2,
+            chunk_size=3,
+        )
+        assert sorted(results) == sorted(expected)
+        results = solve_many(
+            problems, constraints, workers=2, chunk_size=7, ordered=True
+        )
+        assert list(results) == expected
+        self.assertRaises(
+            ValueError,
+            lambda: list(
+                solve_many(
+                    problems,
+                    constraints,
+                    workers=2,
+                    statistics=SearchStatistics(),
+                )
+            ),
+        )
+        self.assertRaises(
+            ValueError,
+            lambda: list(solve_many(problems, constraints, decompose=True)),
+        )
+
+
+    def test_close_early(self):
+        """A test that closing the results early doesn't wait for the chunks still being solved."""
+
+        def slow(a):
+            if a:
+                time.sleep(1)
+            return True
+
+        results = solve_many(
+            [("fast", {"a": [0]}), ("slow", {"a": [1]})],
+            [slow],
+            workers=2,
+            chunk_size=1,
+            ordered=True,
+        )
+        assert next(results) == ("fast", [{"a": 0}])
+        # Give the slow chunk time to start.
+        time.sleep(0.2)
+        start = time.perf_counter()
+        results.close()
+        assert time.perf_counter() - start < 0.5
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,90 @@
+"""Contains tests for finding optimal solutions by branch and bound."""
+
+import unittest
+from amp_constraint_solver.constraint_solver import *
+from amp_constraint_solver.builtin_constraints import *
+from amp_constraint_solver.optimisation import *
+from amp_constraint_solver.test_constraint_solver import (
+    make_map_colouring_problem,
+)
+
+
+def make_knapsack_problem():
+    """Builds a 0/1 knapsack: which items to take without going over a weight of 10."""
+    weights = {"a": 5, "b": 4, "c": 6, "d": 3, "e": 2}
+    values = {"a": 10, "b": 40, "c": 30, "d": 50, "e": 15}
+    domains = {item: [0, 1] for item in weights}
+
+    def within_capacity(**taken):
+        return sum(weights[item] * taken[item] for item in taken) <= 10
+
+    def value(**taken):
+        return sum(values[item] * taken[item] for item in taken)
+
+    return domains, [within_capacity], value, values
+
+
+class OptimisationTests(unittest.TestCase):
+    def test_minimize_matches_enumeration(self):
+        """A test that the last solution from :py:func:`amp_constraint_solver.optimisation.minimize`
+           has the lowest objective of all solutions, and that each solution improves on the last."""
+        domains, constraints = make_map_colouring_problem()
+        colours = {"red": 3, "green": 2, "blue": 1}
+        objective = lambda **states: sum(colours[c] for c in states.values())
+        best = min(objective(**s) for s in solve(domains, constraints))
+        for propagation in (None, "forward_checking", "arc_consistency"):
+            solutions = list(
+                minimize(
+                    domains, constraints, objective, propagation=propagation
+                )
+            )
+            costs = [objective(**solution) for solution in solutions]
+            assert costs[-1] == best, (propagation, costs)
+            assert all(a > b for a, b in zip(costs, costs[1:])), costs
+
+    def test_maximize_with_bound(self):
+        """A test that :py:func:`amp_constraint_solver.optimisation.maximize` finds the best knapsack,
+           and that an upper bound prunes the search."""
+        domains, constraints, value, values = make_knapsack_problem()
+
+        def optimistic(**taken):
+            # Everything not yet decided could still be taken.
+            return sum(
+                values[item] * taken.get(item, 1) for item in values
+            )
+
+        unbounded = SearchStatistics()
+        bounded = SearchStatistics()
+        without_bound = list(
+            maximize(domains, constraints, value, statistics=unbounded)
+        )
+        with_bound = list(
+            maximize(
+                domains,
+                constraints,
+                value,
+                bound=optimistic,
+                statistics=bounded,
+            )
+        )
+        assert value(**with_bound[-1]) == value(**without_bound[-1]) == 105
+        assert with_bound[-1] == {"a": 0, "b": 1, "c": 0, "d": 1, "e": 1}
+        assert bounded.nodes < unbounded.nodes, (bounded, unbounded)
+
+    def test_objective_checked_once_bound(self):
+        """A test that an objective naming its variables prunes as soon as they're assigned."""
+        domains = {"a": [1, 2, 3], "b": [1, 2, 3], "c": [1, 2, 3]}
+        solutions = list(
+            minimize(domains, [], lambda a: a, as_tuples=True)
+        )
+        assert solutions == [(1, 1, 1)], solutions
+
+    def test_invalid_objective(self):
+        """A test that objectives must read known variables."""
+        self.assertRaises(
+            ValueError, lambda: list(minimize({"a": [1]}, [], lambda z: z))
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
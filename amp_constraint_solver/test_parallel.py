@@ -0,0 +1,109 @@
+"""Contains tests for solving in parallel worker processes."""
+
+import unittest
+import time
+from amp_constraint_solver.constraint_solver import *
+from amp_constraint_solver.builtin_constraints import *
+from amp_constraint_solver.parallel import *
+from amp_constraint_solver.test_constraint_solver import (
+    make_4_queens_problem,
+    make_map_colouring_problem,
+)
+
+
+class ParallelSolveTests(unittest.TestCase):
+    def test_parallel_matches_solve(self):
+        """A test that splitting the 4 queens problem across workers finds every solution,
+           in the same order as :py:func:`amp_constraint_solver.constraint_solver.solve` when ordered."""
+        domains, constraints = make_4_queens_problem()
+        expected = list(solve(domains, constraints))
+        solutions = list(
+            parallel_solve(domains, constraints, workers=2, ordered=True)
+        )
+        assert solutions == expected, "Ordered solutions should match solve."
+        solutions = list(
+            parallel_solve(
+                domains,
+                constraints,
+                workers=2,
+                split_depth=3,
+                propagation="forward_checking",
+            )
+        )
+        assert sorted(map(repr, solutions)) == sorted(
+            map(repr, expected)
+        ), "Unordered solutions should be the same set."
+
+    def test_split_respects_constraints(self):
+        """A test that constraints on the split variables are checked before tasks are sent out."""
+        solutions = list(
+            parallel_solve(
+                {"a": [1, 2], "b": [1, 2], "c": [1, 2]},
+                [lambda a, b: a == b],
+                workers=2,
+                split_depth=2,
+                ordered=True,
+            )
+        )
+        assert solutions == [
+            {"a": a, "b": a, "c": c} for a in [1, 2] for c in [1, 2]
+        ], solutions
+
+    def test_parallel_decompose(self):
+        """A test that independent components solved as separate tasks
+           combine into the same solutions as solving them together."""
+        queens_domains, queens_constraints = make_4_queens_problem()
+        colouring_domains, colouring_constraints = make_map_colouring_problem()
+        domains = dict(queens_domains, **colouring_domains)
+        constraints = queens_constraints + colouring_constraints
+        expected = list(solve(domains, constraints, decompose=True))
+        solutions = list(
+            parallel_solve(domains, constraints, workers=2, decompose=True)
+        )
+        assert solutions == expected, "Components should combine in order."
+        assert list(
+            parallel_solve(
+                domains, constraints, workers=2, decompose=True, as_tuples=True
+            )
+        ) == list(solve(domains, constraints, decompose=True, as_tuples=True))
+
+    def test_close_early(self):
+        """A test that closing the generator early doesn't wait for the tasks still running."""
+
+        def slow(a, b):
+            if a:
+                time.sleep(1)
+            return True
+
+        solutions = parallel_solve(
+            {"a": [0, 1], "b": [0]},
+            [slow],
+            workers=2,
+            split_depth=1,
+            ordered=True,
+        )
+        assert next(solutions) == {"a": 0, "b": 0}
+        # Give the slow task time to start.
+        time.sleep(0.2)
+        start = time.perf_counter()
+        solutions.close()
+        assert time.perf_counter() - start < 0.5
+
+    def test_invalid_problem(self):
+        """A test that invalid problems raise the same errors as solve."""
+        self.assertRaises(
+            ValueError, lambda: list(parallel_solve({"x": [1]}, [lambda z: True]))
+        )
+        for name, value in [
+            ("statistics", SearchStatistics()),
+            ("hooks", SearchHooks()),
+            ("limits", SearchLimits(max_nodes=10)),
+        ]:
+            self.assertRaises(
+                ValueError,
+                lambda: list(parallel_solve({"x": [1]}, **{name: value})),
+            )
+
+
+if __name__ == "__main__":
+    unittest.main()
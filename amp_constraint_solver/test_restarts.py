@@ -0,0 +1,149 @@
+"""Contains tests for restarting searches and racing them in a portfolio."""
+
+import unittest
+from itertools import islice
+from amp_constraint_solver.constraint_solver import *
+from amp_constraint_solver.builtin_constraints import *
+from amp_constraint_solver.heuristics import *
+from amp_constraint_solver.restarts import *
+from amp_constraint_solver.test_constraint_solver import (
+    make_4_queens_problem,
+    make_map_colouring_problem,
+)
+
+
+class RecordStates(SearchHooks):
+    """Hooks that keep the state of each search started."""
+
+    def __init__(self):
+        self.states = []
+
+    def on_start(self, state):
+        self.states.append(state)
+
+
+class RestartTests(unittest.TestCase):
+    def test_schedules(self):
+        """A test of the numbers of failures restart schedules allow."""
+        assert list(islice(Luby(1), 15)) == [
+            1, 1, 2, 1, 1, 2, 4, 1, 1, 2, 1, 1, 2, 4, 8
+        ]
+        assert list(islice(Geometric(10, 2), 4)) == [10, 20, 40, 80]
+
+    def test_every_solution_once(self):
+        """A test that restarted searches yield every solution once, in the same order for a seed."""
+        domains, constraints = make_4_queens_problem()
+        expected = sorted(solve(domains, constraints, as_tuples=True))
+        for options in [
+            {},
+            {"seed": None},
+            {
+                "propagation": "forward_checking",
+                "variable_ordering": domain_over_weighted_degree,
+                "backjumping": True,
+            },
+        ]:
+            hooks = RecordStates()
+            solutions = list(
+                solve_with_restarts(
+                    domains,
+                    constraints,
+                    schedule=Luby(1),
+                    as_tuples=True,
+                    hooks=hooks,
+                    **options,
+                )
+            )
+            assert sorted(solutions) == expected
+            assert len(hooks.states) > 1, "The search should have restarted."
+            assert solutions == list(
+                solve_with_restarts(
+                    domains,
+                    constraints,
+                    schedule=Luby(1),
+                    as_tuples=True,
+                    **options,
+                )
+            )
+        assert list(
+            solve_with_restarts(domains, constraints, seed=1, schedule=[])
+        ) != list(solve(domains, constraints)), "Ties are broken at random."
+
+    def test_carries_over(self):
+        """A test that constraint weights and nogoods are kept from one search to the next."""
+        domains, constraints = make_4_queens_problem()
+        hooks = RecordStates()
+        solutions = solve_with_restarts(
+            domains,
+            constraints,
+            schedule=Geometric(2, 2),
+            hooks=hooks,
+            backjumping=True,
+            variable_ordering=domain_over_weighted_degree,
+        )
+        next(solutions)
+        first, last = hooks.states[0], hooks.states[-1]
+        assert last is not first
+        assert last._nogoods is first._nogoods
+        assert len(last._nogoods) > 0
+        assert sum(last.weights) >= sum(first.weights) > len(constraints)
+
+    def test_limits(self):
+        """A test that limits apply to all the searches, and unsupported options are refused."""
+        domains, constraints = make_map_colouring_problem()
+        limits = SearchLimits(max_nodes=20, quiet=True)
+        solutions = list(
+            solve_with_restarts(
+                domains, constraints, schedule=Luby(1), limits=limits
+            )
+        )
+        assert len(solutions) < len(list(solve(domains, constraints)))
+        assert limits.exceeded is not None
+        assert limits.exceeded.checkpoint is None
+        self.assertRaises(
+            ValueError,
+            lambda: list(
+                solve_with_restarts(domains, constraints, decompose=True)
+            ),
+        )
+
+
+class PortfolioTests(unittest.TestCase):
+    def test_reproducible(self):
+        """A test that a portfolio returns the same solution each time for a seed."""
+        domains, constraints = make_4_queens_problem()
+        expected = list(solve(domains, constraints, as_tuples=True))
+        solution = portfolio_solve(
+            domains, constraints, node_budget=4, as_tuples=True
+        )
+        assert solution in expected
+        for _ in range(3):
+            assert solution == portfolio_solve(
+                domains, constraints, node_budget=4, as_tuples=True
+            )
+        configurations = [{"schedule": Luby(1)}, {"seed": None}]
+        solution = portfolio_solve(
+            domains, constraints, configurations, seed=5, deterministic=False
+        )
+        assert tuple(solution[var] for var in sorted(domains)) in expected
+
+    def test_unsatisfiable(self):
+        """A test that a portfolio returns None for a problem without solutions,
+           and refuses options it can't support."""
+        domains = {"a": [1, 2], "b": [1, 2], "c": [1, 2]}
+        constraints = [AllDifferent(["a", "b", "c"])]
+        assert portfolio_solve(domains, constraints) is None
+        assert portfolio_solve(domains, [], deterministic=False) is not None
+        self.assertRaises(
+            ValueError,
+            lambda: portfolio_solve(
+                domains, constraints, statistics=SearchStatistics()
+            ),
+        )
+        self.assertRaises(
+            ValueError, lambda: portfolio_solve(domains, [lambda d: True])
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,137 @@
+"""Contains tests for breaking the symmetries of problems."""
+
+import unittest
+from amp_constraint_solver.constraint_solver import *
+from amp_constraint_solver.builtin_constraints import *
+from amp_constraint_solver.heuristics import *
+from amp_constraint_solver.symmetry import *
+from amp_constraint_solver.test_constraint_solver import (
+    make_4_queens_problem,
+    make_map_colouring_problem,
+)
+
+
+def same_solutions(first, second):
+    """Whether two lists of solutions have the same solutions, in any order."""
+    return sorted(map(repr, first)) == sorted(map(repr, second))
+
+
+class SymmetryTests(unittest.TestCase):
+    def test_interchangeable_pieces(self):
+        """A test that the 4 queens, as interchangeable pieces, have one solution per orbit,
+           and that expanding the orbits gives every solution."""
+        domains, constraints = make_4_queens_problem()
+        pieces = InterchangeableVariables(
+            [("x1", "y1"), ("x2", "y2"), ("x3", "y3"), ("x4", "y4")]
+        )
+        assert detect_symmetries(domains, constraints) == [pieces]
+        expected = list(solve(domains, constraints))
+        assert len(expected) == 48
+        for options in [
+            {},
+            {"propagation": "forward_checking"},
+            {
+                "propagation": "arc_consistency",
+                "variable_ordering": minimum_remaining_values,
+            },
+        ]:
+            solutions = list(
+                solve_up_to_symmetry(domains, constraints, [pieces], **options)
+            )
+            assert len(solutions) == 2, solutions
+            assert all(
+                [s["x1"], s["x2"], s["x3"], s["x4"]] == [0, 1, 2, 3]
+                for s in solutions
+            )
+            assert same_solutions(
+                solve_up_to_symmetry(
+                    domains, constraints, [pieces], expand=True, **options
+                ),
+                expected,
+            )
+
+    def test_interchangeable_values(self):
+        """A test that the colours of a map are found to be interchangeable."""
+        domains, constraints = make_map_colouring_problem()
+        symmetries = detect_symmetries(domains, constraints)
+        assert symmetries == [
+            InterchangeableValues(sorted(domains), ["red", "green", "blue"])
+        ]
+        solutions = list(solve_up_to_symmetry(domains, constraints))
+        assert len(solutions) == 3
+        expected = list(solve(domains, constraints, as_tuples=True))
+        expanded = list(
+            expand_solutions(
+                solve_up_to_symmetry(domains, constraints, as_tuples=True),
+                domains,
+                symmetries,
+                as_tuples=True,
+            )
+        )
+        assert sorted(expanded) == sorted(expected)
+        assert len(set(expanded)) == len(expanded)
+
+        # Each symmetry swaps the values of its own variables.
+        expanded = expand_solutions(
+            [(1, 3)],
+            {"a": [1, 2], "b": [3, 4]},
+            [
+                InterchangeableValues(["a"], [1, 2]),
+                InterchangeableValues(["b"], [3, 4]),
+            ],
+            as_tuples=True,
+        )
+        assert sorted(expanded) == [(1, 3), (1, 4), (2, 3), (2, 4)]
+
+    def test_detection(self):
+        """A test that both kinds of symmetry are found together, and only for builtin constraints."""
+        domains = {var: list(range(5)) for var in "abcd"}
+        constraints = [AllDifferent("abcd")]
+        assert detect_symmetries(domains, constraints) == [
+            InterchangeableVariables([("a",), ("b",), ("c",), ("d",)]),
+            InterchangeableValues(list("abcd"), list(range(5))),
+        ]
+        assert list(solve_up_to_symmetry(domains, constraints)) == [
+            {"a": 0, "b": 1, "c": 2, "d": 3}
+        ]
+        assert (
+            len(list(solve_up_to_symmetry(domains, constraints, expand=True)))
+            == 120
+        )
+
+        domains = {var: list(range(4)) for var in "abcd"}
+        constraints = [Linear([2, 1, 1, 2], list("abcd"), "==", 6)]
+        assert detect_symmetries(domains, constraints) == [
+            InterchangeableVariables([("a",), ("d",)]),
+            InterchangeableVariables([("b",), ("c",)]),
+        ], "Only variables with the same coefficient are interchangeable."
+        assert same_solutions(
+            solve_up_to_symmetry(domains, constraints, expand=True),
+            solve(domains, constraints),
+        )
+        constraints.append(lambda a: a != 3)
+        assert detect_symmetries(domains, constraints) == [
+            InterchangeableVariables([("b",), ("c",)])
+        ]
+        assert detect_symmetries(domains, [no_duplicate_values_constraint])
+        assert detect_symmetries(domains, [lambda **values: True]) == []
+
+    def test_invalid_symmetries(self):
+        """A test that symmetries that don't fit the domains are refused."""
+        domains = {"a": [1, 2], "b": [1, 2, 3], "c": [2, 1]}
+        for symmetry in [
+            InterchangeableVariables(["a", "b"]),
+            InterchangeableVariables(["a", "d"]),
+            InterchangeableVariables([("a", "b"), ("b", "c")]),
+            InterchangeableValues(["a", "b"], [3]),
+            InterchangeableValues(["a", "c"], [1, 2]),
+        ]:
+            self.assertRaises(
+                ValueError, lambda: symmetry_breakers(domains, [symmetry])
+            )
+        symmetries = [InterchangeableValues(["a"], [1])]
+        assert symmetry_breakers(domains, symmetries) == []
+
+
+if __name__ == "__main__":
+    unittest.main()
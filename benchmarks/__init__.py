@@ -0,0 +1,17 @@
+"""
+Performance benchmarks of :py:mod:`amp_constraint_solver` on standard constraint satisfaction workloads.
+
+Run every workload and print a summary:
+
+    python -m benchmarks
+
+Each workload reports the solutions found, the nodes explored and constraint checks made
+(see :py:class:`amp_constraint_solver.constraint_solver.SearchStatistics`), the wall time
+and the peak memory allocated. Results can be written as JSON and compared to a stored baseline,
+exiting with an error if a workload got slower or did more work:
+
+    python -m benchmarks --output results.json --baseline benchmarks/baseline.json
+
+Node and check counts are deterministic, so any increase is reported. Times vary between
+machines, so they're only reported when they increase by more than ``--tolerance``.
+"""
@@ -0,0 +1,76 @@
+"""Command line interface of :py:mod:`benchmarks`, see ``python -m benchmarks --help``."""
+from .runner import compare, run_workload
+from .workloads import WORKLOADS
+import argparse
+import json
+import platform
+import sys
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="python -m benchmarks",
+        description="Benchmarks amp_constraint_solver on standard workloads.",
+    )
+    parser.add_argument(
+        "workloads",
+        nargs="*",
+        metavar="workload",
+        help=f"Workloads to run, defaults to all of them: {', '.join(WORKLOADS)}.",
+    )
+    parser.add_argument("--output", help="Write the results as JSON here.")
+    parser.add_argument(
+        "--baseline", help="Compare the results to JSON written by --output."
+    )
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=0.25,
+        help="The fraction times and memory may go up by, defaults to 0.25.",
+    )
+    parser.add_argument(
+        "--repeat",
+        type=int,
+        default=3,
+        help="How many times to time each workload, defaults to 3.",
+    )
+    args = parser.parse_args(argv)
+    for name in args.workloads:
+        if name not in WORKLOADS:
+            parser.error(f"{name} is not a known workload.")
+
+    results = {}
+    for name in args.workloads or WORKLOADS:
+        result = run_workload(WORKLOADS[name](), args.repeat)
+        results[name] = result
+        print(
+            f"{name:40} {result['solutions']:>6} solutions {result['nodes']:>9} nodes "
+            f"{result['constraint_checks']:>10} checks {result['seconds']:>9.4f}s "
+            f"{result['peak_memory_bytes'] / 1024:>9.0f}KiB",
+            flush=True,
+        )
+
+    if args.output:
+        with open(args.output, "w") as output:
+            json.dump(
+                {"python": platform.python_version(), "results": results},
+                output,
+                indent=2,
+                sort_keys=True,
+            )
+            output.write("\n")
+
+    if args.baseline:
+        with open(args.baseline) as baseline:
+            regressions = compare(
+                results, json.load(baseline)["results"], args.tolerance
+            )
+        for regression in regressions:
+            print(regression, file=sys.stderr)
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
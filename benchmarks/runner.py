@@ -0,0 +1,99 @@
+"""
+Runs :py:mod:`benchmarks.workloads` and compares the results to a baseline.
+"""
+from amp_constraint_solver import SearchStatistics, solve
+from .workloads import Workload
+from typing import Any, Dict, List
+import time
+import tracemalloc
+
+
+__all__ = ["run_workload", "compare"]
+
+
+# Counts that should never go up without a reason, as they don't depend on the machine.
+_WORK_COUNTS = ("nodes", "constraint_checks")
+
+# Times shorter than this are too noisy to compare.
+_MIN_COMPARED_SECONDS = 0.05
+
+
+def _solve(workload: Workload, statistics: SearchStatistics = None) -> int:
+    """Solves a workload, returning the number of solutions found."""
+    solutions = 0
+    for _ in solve(
+        workload.domains,
+        workload.constraints,
+        statistics=statistics,
+        **workload.options,
+    ):
+        solutions += 1
+        if workload.first_only:
+            break
+    return solutions
+
+
+def run_workload(workload: Workload, repeat: int = 3) -> Dict[str, Any]:
+    """Benchmarks a workload.
+
+       :param workload: The :py:class:`benchmarks.workloads.Workload` to solve.
+       :param repeat: How many times to time the search, the fastest time is reported.
+       :returns: A dict of the solutions found, the counts of a
+           :py:class:`amp_constraint_solver.constraint_solver.SearchStatistics`,
+           the wall time in seconds and the peak memory allocated in bytes.
+    """
+    statistics = SearchStatistics()
+    result: Dict[str, Any] = {"solutions": _solve(workload, statistics)}
+    result.update(statistics.as_dict())
+
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        _solve(workload)
+        timings.append(time.perf_counter() - start)
+    result["seconds"] = min(timings)
+
+    # Tracing allocations slows the search down, so memory is measured on a separate run.
+    tracemalloc.start()
+    try:
+        _solve(workload)
+        result["peak_memory_bytes"] = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return result
+
+
+def compare(
+    results: Dict[str, Dict[str, Any]],
+    baseline: Dict[str, Dict[str, Any]],
+    tolerance: float = 0.25,
+) -> List[str]:
+    """Finds the workloads that regressed against a baseline.
+
+       :param results: Results by workload name, as returned by :py:func:`run_workload`.
+       :param baseline: Stored results by workload name. Workloads missing from either are skipped.
+       :param tolerance: The fraction that times and memory may increase by before being reported.
+       :returns: A description of each regression.
+    """
+    regressions = []
+    for name, result in results.items():
+        expected = baseline.get(name)
+        if expected is None:
+            continue
+        if result["solutions"] != expected["solutions"]:
+            regressions.append(
+                f"{name}: found {result['solutions']} solutions, expected {expected['solutions']}."
+            )
+        for key in _WORK_COUNTS:
+            if result[key] > expected[key]:
+                regressions.append(
+                    f"{name}: {key} went up from {expected[key]} to {result[key]}."
+                )
+        for key in ("seconds", "peak_memory_bytes"):
+            if key == "seconds" and expected[key] < _MIN_COMPARED_SECONDS:
+                continue
+            if result[key] > expected[key] * (1 + tolerance):
+                regressions.append(
+                    f"{name}: {key} went up from {expected[key]:.4g} to {result[key]:.4g}."
+                )
+    return regressions
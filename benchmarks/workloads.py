@@ -0,0 +1,343 @@
+"""
+The problems benchmarked, each built by a function returning a :py:class:`Workload`.
+
+Random problems are generated from a fixed seed, so every run solves the same instances.
+"""
+from amp_constraint_solver import (
+    AllDifferent,
+    Constraint,
+    TableConstraint,
+    DomainsType,
+    Linear,
+    Sum,
+    make_vars_not_diagonal_on_grid_constraint,
+    make_vars_not_equal_constraint,
+    minimum_remaining_values,
+    scoped,
+)
+from typing import Any, Callable, Dict, List, NamedTuple
+import itertools
+import random
+
+
+__all__ = ["Workload", "WORKLOADS"]
+
+
+class Workload(NamedTuple):
+    """A problem to benchmark and how to solve it.
+
+       :param domains: The domains passed to :py:func:`amp_constraint_solver.constraint_solver.solve`.
+       :param constraints: The constraints passed to :py:func:`amp_constraint_solver.constraint_solver.solve`.
+       :param options: Keyword arguments passed to :py:func:`amp_constraint_solver.constraint_solver.solve`.
+       :param first_only: Whether to stop at the first solution rather than find them all.
+    """
+
+    domains: DomainsType
+    constraints: List[Constraint]
+    options: Dict[str, Any]
+    first_only: bool = False
+
+
+def n_queens(n: int, first_only: bool = False, **options) -> Workload:
+    """Places n queens on an n by n board so none attack each other.
+
+       Queen i is placed in column i, so only the rows are searched for.
+    """
+    domains: DomainsType = {}
+    pieces = []
+    for i in range(n):
+        x, y = f"x{i:02}", f"y{i:02}"
+        domains[x] = [i]
+        domains[y] = list(range(n))
+        pieces.append((x, y))
+    constraints = []
+    for (x1, y1), (x2, y2) in itertools.combinations(pieces, 2):
+        constraints.append(make_vars_not_equal_constraint(y1, y2))
+        constraints.append(
+            make_vars_not_diagonal_on_grid_constraint(x1, y1, x2, y2)
+        )
+    return Workload(domains, constraints, options, first_only)
+
+
+def graph_colouring(
+    nodes: int, density: float, colours: int, seed: int = 0, **options
+) -> Workload:
+    """Colours a random graph so no edge joins two nodes of the same colour."""
+    generator = random.Random(seed)
+    domains = {f"n{i:02}": list(range(colours)) for i in range(nodes)}
+    constraints = [
+        make_vars_not_equal_constraint(f"n{a:02}", f"n{b:02}")
+        for a, b in itertools.combinations(range(nodes), 2)
+        if generator.random() < density
+    ]
+    return Workload(domains, constraints, options)
+
+
+# A puzzle with a single solution, 0 marks an empty cell.
+_SUDOKU_PUZZLE = (
+    "530070000"
+    "600195000"
+    "098000060"
+    "800060003"
+    "400803001"
+    "700020006"
+    "060000280"
+    "000419005"
+    "000080079"
+)
+
+
+def sudoku(puzzle: str = _SUDOKU_PUZZLE, **options) -> Workload:
+    """Fills in a 9 by 9 sudoku, with an :py:class:`AllDifferent` per row, column and box."""
+    cells = [[f"r{row}c{column}" for column in range(9)] for row in range(9)]
+    domains = {}
+    for row, column in itertools.product(range(9), repeat=2):
+        given = int(puzzle[row * 9 + column])
+        domains[cells[row][column]] = [given] if given else list(range(1, 10))
+    groups = [list(row) for row in cells]
+    groups += [list(column) for column in zip(*cells)]
+    groups += [
+        [
+            cells[row][column]
+            for row in range(top, top + 3)
+            for column in range(left, left + 3)
+        ]
+        for top, left in itertools.product((0, 3, 6), repeat=2)
+    ]
+    return Workload(
+        domains, [AllDifferent(group) for group in groups], options
+    )
+
+
+def _make_sum_constraint(variables: List[str], total: int) -> Constraint:
+    """Creates a constraint that the values of some variables add up to a total."""
+
+    @scoped(*variables)
+    def sums_to(**values) -> bool:
+        return sum(values.values()) == total
+
+    return sums_to
+
+
+def magic_square(n: int, linear: bool = False, **options) -> Workload:
+    """Places 1 to n squared on an n by n grid so every row, column and diagonal has the same sum.
+
+       The sums are :py:class:`Sum` constraints if ``linear`` is set, otherwise they're only checked
+       once a line is full.
+    """
+    cells = [[f"r{row}c{column}" for column in range(n)] for row in range(n)]
+    total = n * (n * n + 1) // 2
+    domains = {
+        var: list(range(1, n * n + 1)) for row in cells for var in row
+    }
+    lines = [list(row) for row in cells]
+    lines += [list(column) for column in zip(*cells)]
+    lines.append([cells[i][i] for i in range(n)])
+    lines.append([cells[i][n - 1 - i] for i in range(n)])
+    constraints: List[Constraint] = [AllDifferent(list(domains))]
+    if linear:
+        constraints += [Sum(line, "==", total) for line in lines]
+    else:
+        constraints += [_make_sum_constraint(line, total) for line in lines]
+    return Workload(domains, constraints, options)
+
+
+def _make_allowed_pairs_constraint(
+    var1: str, var2: str, allowed: frozenset
+) -> Constraint:
+    """Creates a constraint that two variables take one of some pairs of values."""
+
+    @scoped(var1, var2)
+    def allowed_pair(**values) -> bool:
+        return (values[var1], values[var2]) in allowed
+
+    return allowed_pair
+
+
+def random_binary(
+    variables: int,
+    values: int,
+    density: float,
+    tightness: float,
+    seed: int = 0,
+    **options,
+) -> Workload:
+    """A random binary problem, model B: ``density`` of the pairs of variables are constrained,
+       each forbidding ``tightness`` of the pairs of values.
+
+       Problems are hardest near the phase transition, where tightness is about
+       ``1 - values ** (-2 / (density * (variables - 1))))``.
+    """
+    generator = random.Random(seed)
+    names = [f"v{i:02}" for i in range(variables)]
+    domains = {var: list(range(values)) for var in names}
+    pairs = list(itertools.combinations(names, 2))
+    value_pairs = list(itertools.product(range(values), repeat=2))
+    forbidden = round(tightness * len(value_pairs))
+    constraints = []
+    for var1, var2 in generator.sample(pairs, round(density * len(pairs))):
+        allowed = frozenset(value_pairs) - frozenset(
+            generator.sample(value_pairs, forbidden)
+        )
+        constraints.append(
+            _make_allowed_pairs_constraint(var1, var2, allowed)
+        )
+    return Workload(domains, constraints, options)
+
+
+def _make_precedence_constraint(
+    before: str, after: str, duration: int
+) -> Constraint:
+    """Creates a constraint that a task finishes before another starts."""
+
+    @scoped(before, after)
+    def precedes(**starts) -> bool:
+        return starts[before] + duration <= starts[after]
+
+    return precedes
+
+
+def _make_no_overlap_constraint(
+    task1: str, duration1: int, task2: str, duration2: int
+) -> Constraint:
+    """Creates a constraint that two tasks sharing a resource don't run at the same time."""
+
+    @scoped(task1, task2)
+    def no_overlap(**starts) -> bool:
+        return (
+            starts[task1] + duration1 <= starts[task2]
+            or starts[task2] + duration2 <= starts[task1]
+        )
+
+    return no_overlap
+
+
+def scheduling(
+    jobs: int, machines: int, horizon: int, seed: int = 0, **options
+) -> Workload:
+    """A job shop: each job runs a task on every machine in a random order with a random duration.
+       Tasks of a job run in order, tasks on a machine don't overlap and everything ends by the horizon.
+    """
+    generator = random.Random(seed)
+    domains: DomainsType = {}
+    constraints: List[Constraint] = []
+    on_machine: Dict[int, List] = {machine: [] for machine in range(machines)}
+    for job in range(jobs):
+        order = list(range(machines))
+        generator.shuffle(order)
+        previous = None
+        for machine in order:
+            task = f"j{job}m{machine}"
+            duration = generator.randint(1, 4)
+            domains[task] = list(range(horizon - duration + 1))
+            on_machine[machine].append((task, duration))
+            if previous is not None:
+                constraints.append(
+                    _make_precedence_constraint(previous[0], task, previous[1])
+                )
+            previous = (task, duration)
+    for tasks in on_machine.values():
+        for (task1, duration1), (task2, duration2) in itertools.combinations(
+            tasks, 2
+        ):
+            constraints.append(
+                _make_no_overlap_constraint(
+                    task1, duration1, task2, duration2
+                )
+            )
+    return Workload(domains, constraints, options, first_only=True)
+
+
+def random_tables(
+    variables: int,
+    values: int,
+    tables: int,
+    arity: int,
+    rows: int,
+    seed: int = 0,
+    **options,
+) -> Workload:
+    """Random :py:class:`TableConstraint` tables of ``rows`` allowed tuples on random groups of variables."""
+    generator = random.Random(seed)
+    names = [f"v{i:02}" for i in range(variables)]
+    domains = {var: list(range(values)) for var in names}
+    constraints: List[Constraint] = []
+    for _ in range(tables):
+        scope = generator.sample(names, arity)
+        allowed = set()
+        while len(allowed) < rows:
+            allowed.add(
+                tuple(generator.randrange(values) for _ in range(arity))
+            )
+        constraints.append(TableConstraint(scope, allowed))
+    return Workload(domains, constraints, options)
+
+
+def linear_ranges(size: int, **options) -> Workload:
+    """Four variables over ``range(size)``, too big to list, linked by :py:class:`Linear` constraints
+       so that bounds propagation leaves few values to try.
+    """
+    domains: DomainsType = {var: range(size) for var in ["a", "b", "c", "d"]}
+    constraints: List[Constraint] = [
+        Sum(["a", "b", "c", "d"], "==", size + 6),
+        Linear([3, -2], ["a", "b"], "==", size // 2),
+        Linear([1, -1], ["c", "d"], ">", size // 3),
+        Linear([1, 1], ["b", "d"], "<=", size // 4),
+        Linear([1], ["a"], "!=", size // 2),
+    ]
+    return Workload(domains, constraints, options, first_only=True)
+
+
+WORKLOADS: Dict[str, Callable[[], Workload]] = {
+    "queens_8_all": lambda: n_queens(8),
+    "queens_8_all_forward_checking": lambda: n_queens(
+        8, propagation="forward_checking"
+    ),
+    "queens_10_all_forward_checking": lambda: n_queens(
+        10, propagation="forward_checking"
+    ),
+    "queens_12_first": lambda: n_queens(12, first_only=True),
+    "queens_12_first_mrv": lambda: n_queens(
+        12,
+        first_only=True,
+        propagation="forward_checking",
+        variable_ordering=minimum_remaining_values,
+    ),
+    "colouring_30_3_unsatisfiable": lambda: graph_colouring(
+        30, 0.16, 3, propagation="forward_checking"
+    ),
+    "colouring_30_3_unsatisfiable_backjumping": lambda: graph_colouring(
+        30, 0.16, 3, propagation="forward_checking", backjumping=True
+    ),
+    "sudoku_forward_checking": lambda: sudoku(
+        propagation="forward_checking"
+    ),
+    "sudoku_arc_consistency": lambda: sudoku(propagation="arc_consistency"),
+    "magic_square_3": lambda: magic_square(3, propagation="forward_checking"),
+    "magic_square_3_linear": lambda: magic_square(
+        3, linear=True, propagation="forward_checking"
+    ),
+    "linear_ranges_10_million": lambda: linear_ranges(
+        10 ** 7, propagation="forward_checking"
+    ),
+    "random_binary_phase_transition": lambda: random_binary(
+        15, 10, 0.5, 0.45, propagation="forward_checking"
+    ),
+    "tables_10_10_forward_checking": lambda: random_tables(
+        10, 10, 6, 4, 600, propagation="forward_checking"
+    ),
+    "scheduling_5x3_horizon_15": lambda: scheduling(
+        5,
+        3,
+        15,
+        propagation="forward_checking",
+        variable_ordering=minimum_remaining_values,
+    ),
+    "scheduling_5x3_horizon_14_infeasible": lambda: scheduling(
+        5,
+        3,
+        14,
+        propagation="forward_checking",
+        variable_ordering=minimum_remaining_values,
+    ),
+}